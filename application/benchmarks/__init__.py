@@ -0,0 +1,11 @@
+# benchmarks — reproducible timing suite over synthetic NIfTI cases
+#
+#   cd application
+#   python -m benchmarks.run                      # default matrix, report to stdout
+#   python -m benchmarks.run --sizes 128,256,512 --out bench.json
+#   python -m benchmarks.run --baseline benchmarks/baseline.json   # exit 1 on regression
+#   python -m benchmarks.run --save-baseline benchmarks/baseline.json
+#
+# Runs against a throw-away HOME so USER_DATA (workspace, indexes, config) is never touched.
+#
+#   python -m benchmarks.loadtest --students 80 --duration 60   # simulated classroom on one share folder
@@ -0,0 +1,294 @@
+# benchmarks/loadtest.py — simulated classroom: N student processes + a teacher against one shared folder
+#
+#   cd application
+#   python -m benchmarks.loadtest --students 80 --duration 60 --rate 6
+#   python -m benchmarks.loadtest --students 20 --collide      # all clients write the same user folder
+#   python -m benchmarks.loadtest --share /mnt/test-share --out load.json
+#
+# Each client is its own process with its own HOME (so its own USER_DATA) and talks to the
+# share directory only through the app modules, like a real install on a lab machine.
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+CODE = "LOADTEST"
+_APP_DIR = str(Path(__file__).resolve().parents[1])
+
+
+def _isolate(home: Path) -> None:
+    """Point Path.home() (and so USER_DATA) at `home` before any lt_* import."""
+    home.mkdir(parents=True, exist_ok=True)
+    os.environ["HOME"] = os.environ["USERPROFILE"] = str(home)
+    if _APP_DIR not in sys.path:
+        sys.path.insert(0, _APP_DIR)
+
+
+def _pct(xs: List[float], q: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    pos = q * (len(xs) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
+
+
+def prepare_share(share_dir: Path, work: Path, n_cases: int, size: int, seed: int, bundle: bool) -> Path:
+    """Classroom with `n_cases` synthetic cases; scratch files (teacher home, generated cases) go under `work`."""
+    _isolate(work / "teacher_home")
+    import lt_share as share
+    from benchmarks.synth import make_case
+
+    root = share.resolve_share_root(share_dir)
+    share.ensure_classroom(root, CODE)
+    existing = set(share.list_class_cases(root, CODE))
+    gen = work / "gen"
+    for k in range(n_cases):
+        cid = f"load_case_{k:03d}"
+        if cid in existing:
+            continue
+        t1, gold, _student = make_case(gen / cid, size, load=0.01, noise=0.05, seed=seed + k)
+        share.upload_case(root, CODE, cid, t1, gold, {"t1_shape": [size] * 3})
+    if bundle:
+        share.publish_bundle(root, CODE)
+    return root
+
+
+def student_client(idx: int, root: str, home: str, user: str, args: Dict[str, Any], go, out_q) -> None:
+    _isolate(Path(home))
+    import numpy as np
+    import nibabel as nib
+    import lt_core as core
+    import lt_share as share
+    import lt_maskcodec as maskcodec
+    from lt_eval import evaluate_masks, write_attempt
+
+    core.ensure_dirs()
+    rng = random.Random(args["seed"] * 1000 + idx)
+    nrng = np.random.default_rng(args["seed"] * 1000 + idx)
+    root_p = Path(root)
+    lat: Dict[str, List[float]] = {"sync": [], "evaluate": [], "archive_mask": [], "write_attempt": []}
+    errors: List[str] = []
+    rids: List[str] = []
+
+    def sync() -> List[Path]:
+        t0 = time.perf_counter()
+        idx_b = share.bundle_index(root_p, CODE)
+        if idx_b:
+            share.extract_bundle(root_p, CODE, idx_b, core.WORKSPACE)
+        else:
+            for cid in share.list_class_cases(root_p, CODE):
+                dest = core.WORKSPACE / cid
+                if not dest.exists():
+                    share.fetch_case(root_p, CODE, cid, dest)
+        lat["sync"].append(time.perf_counter() - t0)
+        return sorted(p for p in core.WORKSPACE.iterdir() if p.is_dir())
+
+    go.wait()
+    try:
+        cases = sync()
+    except Exception as e:
+        out_q.put({"kind": "student", "idx": idx, "user": user, "lat": lat, "errors": [f"sync: {e}"], "rids": []})
+        return
+    end = time.time() + args["duration"]
+    last_sync = time.time()
+    n = 0
+    while time.time() < end and cases:
+        time.sleep(rng.expovariate(args["rate"] / 60.0) if args["rate"] > 0 else 0)
+        if time.time() >= end:
+            break
+        if args["sync_every"] and time.time() - last_sync > args["sync_every"]:
+            try:
+                cases = sync()
+            except Exception as e:
+                errors.append(f"sync: {e}")
+            last_sync = time.time()
+        c = rng.choice(cases)
+        try:
+            g = nib.load(str(c / "gold.nii.gz"))
+            gm = np.asanyarray(g.dataobj) > 0.5
+            sm = np.roll(gm, rng.choice([-1, 0, 1]), axis=rng.randrange(3)) ^ (nrng.random(gm.shape) < 0.0005)
+            student = c / "student_mask.nii.gz"
+            nib.save(nib.Nifti1Image(sm.astype(np.uint8), g.affine), str(student))
+
+            t0 = time.perf_counter()
+            ok, msg, metrics = evaluate_masks(c / "gold.nii.gz", student)
+            lat["evaluate"].append(time.perf_counter() - t0)
+            if not ok:
+                errors.append(f"evaluate: {msg}")
+                continue
+            out_dir = share.attempts_root(root_p, CODE) / user
+            attempt = {"timestamp": time.strftime("%Y-%m-%d_%H%M%S"), "case_id": c.name, "mode": "student",
+                       "class_code": CODE, "user": user, "session": "exam", "min_voxels": 10, "tolerance": 150,
+                       "passed": int(metrics.get("mismatch_voxels", 0)) <= 150, "editor": "loadtest", **metrics}
+            t0 = time.perf_counter()
+            data = maskcodec.encode(sm, g.affine)
+            attempt["mask_sha256"], _new = maskcodec.archive(share.mask_store(root_p, CODE, user), data)
+            lat["archive_mask"].append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            if not write_attempt(out_dir, attempt):
+                errors.append("write_attempt: log record not written")
+                continue
+            lat["write_attempt"].append(time.perf_counter() - t0)
+            rids.append(attempt["_rid"])
+            n += 1
+        except Exception as e:
+            errors.append(f"attempt: {e}")
+    out_q.put({"kind": "student", "idx": idx, "user": user, "lat": lat, "errors": errors[:20], "n_errors": len(errors), "rids": rids})
+
+
+def teacher_client(root: str, home: str, args: Dict[str, Any], go, out_q) -> None:
+    _isolate(Path(home))
+    import lt_analytics as analytics
+    import lt_online as online
+    import lt_share as share
+
+    attempts = share.attempts_root(Path(root), CODE)
+    lat: Dict[str, List[float]] = {"dashboard_load": [], "dashboard_aggregate": [], "class_summary": []}
+    errors: List[str] = []
+    go.wait()
+    end = time.time() + args["duration"]
+    while time.time() < end:
+        try:
+            t0 = time.perf_counter()
+            tab = analytics.load_class(attempts)
+            lat["dashboard_load"].append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            analytics.group_stats(tab, "user")
+            analytics.group_stats(tab, "case")
+            lat["dashboard_aggregate"].append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            online.class_summary(attempts)
+            lat["class_summary"].append(time.perf_counter() - t0)
+        except Exception as e:
+            errors.append(str(e))
+        time.sleep(args["teacher_interval"])
+    out_q.put({"kind": "teacher", "lat": lat, "errors": errors[:20], "n_errors": len(errors)})
+
+
+def audit(root: Path, expected: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Compare what clients say they wrote with what is on the share."""
+    import lt_attemptlog as attemptlog
+    import lt_online as online
+    import lt_share as share
+
+    attempts = share.attempts_root(root, CODE)
+    found: Dict[str, set] = {}
+    skipped = 0
+    segs = 0
+    csv_rows = 0
+    json_files = 0
+    summary_n = 0
+    files = 0
+    for d in [p for p in attempts.iterdir() if p.is_dir()] if attempts.exists() else []:
+        files += sum(1 for p in d.rglob("*") if p.is_file())
+        found[d.name] = {str(a.get("_rid")) for a in attemptlog.read_records(d)}
+        h = attemptlog.health(d)
+        skipped += h["skipped_bytes"]
+        segs += h["segments"]
+        cp = d / "attempts.csv"
+        if cp.exists():
+            csv_rows += max(0, len(cp.read_text(encoding="utf-8", errors="replace").splitlines()) - 1)
+        json_files += len([p for p in d.glob("*.json") if p.name != online.SUMMARY_NAME])
+        summary_n += int((online.load_summary(d) or {}).get("n", 0))
+    exp_total = sum(len(v) for v in expected.values())
+    lost = sum(len(set(v) - found.get(u, set())) for u, v in expected.items())
+    return {"expected_attempts": exp_total, "log_records": sum(len(v) for v in found.values()), "lost": lost,
+            "skipped_bytes": skipped, "segments": segs, "csv_rows": csv_rows, "attempt_json_files": json_files,
+            "summary_n": summary_n, "summary_drift": summary_n - exp_total, "files_on_share": files}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description="Simulated classroom load test")
+    ap.add_argument("--students", type=int, default=20)
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    ap.add_argument("--rate", type=float, default=6.0, help="attempts per student per minute (Poisson)")
+    ap.add_argument("--sync-every", type=float, default=0.0, help="re-sync interval in seconds (0 = once at start)")
+    ap.add_argument("--teacher-interval", type=float, default=2.0, help="seconds between dashboard refreshes")
+    ap.add_argument("--cases", type=int, default=8)
+    ap.add_argument("--size", type=int, default=64, help="synthetic volume edge length")
+    ap.add_argument("--bundle", action="store_true", help="publish a case bundle and sync from it")
+    ap.add_argument("--collide", action="store_true", help="all students write the same user folder")
+    ap.add_argument("--share", default="", help="share directory (default: temp dir, removed afterwards)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="", help="write the JSON report here")
+    args = ap.parse_args(argv)
+
+    import multiprocessing as mp
+
+    work = Path(tempfile.mkdtemp(prefix="seglab_load_"))
+    share_dir = Path(args.share) if args.share else work / "share"
+    share_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        t0 = time.perf_counter()
+        root = prepare_share(share_dir, work, args.cases, args.size, args.seed, args.bundle)
+        print(f"share ready in {time.perf_counter() - t0:.1f}s: {root}", flush=True)
+
+        ctx = mp.get_context("spawn")
+        go = ctx.Event()
+        q = ctx.Queue()
+        cfg = {"duration": args.duration, "rate": args.rate, "sync_every": args.sync_every,
+               "teacher_interval": args.teacher_interval, "seed": args.seed}
+        procs = []
+        for i in range(args.students):
+            user = "shared_user" if args.collide else f"student{i:03d}"
+            procs.append(ctx.Process(target=student_client, args=(i, str(root), str(work / f"home{i:03d}"), user, cfg, go, q)))
+        procs.append(ctx.Process(target=teacher_client, args=(str(root), str(work / "home_teacher"), cfg, go, q)))
+        for p in procs:
+            p.start()
+        time.sleep(2.0)  # let interpreters finish importing before the clock starts
+        print(f"running {args.students} students + teacher for {args.duration:.0f}s", flush=True)
+        go.set()
+        results = []
+        deadline = time.time() + args.duration + 120
+        while len(results) < len(procs) and time.time() < deadline:
+            try:
+                results.append(q.get(timeout=5))
+            except Exception:
+                if not any(p.is_alive() for p in procs):
+                    break
+        for p in procs:
+            p.join(timeout=10)
+
+        lat: Dict[str, List[float]] = {}
+        expected: Dict[str, List[str]] = {}
+        n_errors = 0
+        samples: List[str] = []
+        for r in results:
+            for k, xs in r["lat"].items():
+                lat.setdefault(k, []).extend(xs)
+            if r["kind"] == "student":
+                expected.setdefault(r["user"], []).extend(r["rids"])
+            n_errors += int(r.get("n_errors", 0))
+            samples += r.get("errors") or []
+        ops = {k: {"n": len(xs), "p50_ms": _pct(xs, 0.5) * 1000, "p95_ms": _pct(xs, 0.95) * 1000,
+                   "p99_ms": _pct(xs, 0.99) * 1000, "max_ms": max(xs) * 1000 if xs else 0.0,
+                   "mean_ms": statistics.fmean(xs) * 1000 if xs else 0.0} for k, xs in sorted(lat.items())}
+        report = {"params": vars(args), "clients_reported": len(results), "clients_started": len(procs),
+                  "ops": ops, "integrity": audit(root, expected), "errors": n_errors, "error_samples": samples[:10]}
+        total = report["integrity"]["expected_attempts"]
+        report["throughput_attempts_per_s"] = round(total / args.duration, 2) if args.duration else None
+
+        for k, o in ops.items():
+            print(f"  {k:<20} n={o['n']:<6} p50 {o['p50_ms']:8.1f}  p95 {o['p95_ms']:8.1f}  p99 {o['p99_ms']:8.1f}  max {o['max_ms']:8.1f} ms")
+        print("  integrity:", json.dumps(report["integrity"]))
+        if args.out:
+            Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        bad = report["integrity"]["lost"] or report["integrity"]["skipped_bytes"] or len(results) < len(procs)
+        return 1 if bad else 0
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# benchmarks/run.py — time the hot paths on synthetic data, report JSON, compare against a baseline
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+_NOISE_FLOOR_S = 0.005  # ignore regressions smaller than this in absolute terms
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(kb / (1024 * 1024) if sys.platform == "darwin" else kb / 1024, 1)
+    except Exception:
+        return None
+
+
+def bench(name: str, params: Dict[str, Any], fn: Callable[[], Any], repeat: int = 3,
+          setup: Optional[Callable[[], Any]] = None, units: float = 1.0, unit: str = "op") -> Dict[str, Any]:
+    """Median wall time over `repeat` timed runs, then one traced run for peak Python/NumPy allocation."""
+    import tracemalloc
+
+    times: List[float] = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    wall = statistics.median(times)
+    r = {"name": name, "params": params, "repeat": repeat, "wall_s": round(wall, 6), "min_s": round(min(times), 6),
+         "max_s": round(max(times), 6), "throughput": round(units / wall, 3) if wall > 0 else None, "unit": f"{unit}/s",
+         "peak_traced_mb": round(peak / 1e6, 2)}
+    print(f"  {name:<22} {json.dumps(params, sort_keys=True):<44} {wall * 1000:10.2f} ms  {r['peak_traced_mb']:8.1f} MB", flush=True)
+    return r
+
+
+def _fake_attempt(rng: random.Random, user: str, case: str, i: int) -> Dict[str, Any]:
+    d = rng.random()
+    return {"timestamp": f"2026-01-{1 + i % 28:02d}_{i % 24:02d}{i % 60:02d}00", "user": user, "case_id": case,
+            "session": rng.choice(["practice", "exam"]), "dice": d, "jaccard": d / (2 - d), "passed": d > 0.7,
+            "mismatch_voxels": int((1 - d) * 400), "vol_abs_err_ml": (1 - d) * 3, "min_voxels": 10, "tolerance": 150,
+            "_rid": f"{i:06x}"}
+
+
+def run(args) -> Dict[str, Any]:
+    import lt_core as core
+    import lt_analytics as analytics
+    import lt_case
+    import lt_eval
+    import lt_online as online
+    from benchmarks.synth import make_case
+
+    core.ensure_dirs()
+    data = Path(args.data)
+    results: List[Dict[str, Any]] = []
+    sizes = [int(x) for x in args.sizes.split(",") if x]
+    loads = [float(x) for x in args.loads.split(",") if x]
+    noises = [float(x) for x in args.noise.split(",") if x]
+
+    print("volumes", flush=True)
+    for size in sizes:
+        for load in loads:
+            for noise in noises:
+                t1, gold, student = make_case(data / f"s{size}_l{load}_n{noise}", size, load, noise, seed=args.seed)
+                p = {"size": size, "load": load, "noise": noise}
+                results.append(bench("evaluate_masks", p, lambda: lt_eval.evaluate_masks(gold, student), args.repeat,
+                                     setup=lt_eval._GOLD_CACHE.clear, units=size ** 3 / 1e6, unit="Mvox"))
+        t1, gold, student = make_case(data / f"s{size}_l{loads[0]}_n{noises[0]}", size, loads[0], noises[0], seed=args.seed)
+        p = {"size": size}
+        results.append(bench("validate_pair", p, lambda: lt_eval.validate_pair(t1, gold), args.repeat))
+        blank = data / f"blank_{size}.nii.gz"
+        results.append(bench("make_blank_mask", p, lambda: lt_eval.make_blank_student_mask(t1, blank), args.repeat,
+                             units=size ** 3 / 1e6, unit="Mvox"))
+
+    print("attempt logs", flush=True)
+    rng = random.Random(args.seed)
+    out_dir = data / "write_attempt"
+
+    def _reset_out():
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    n_w = args.attempts
+    results.append(bench("write_attempt", {"n": n_w},
+                         lambda: [lt_eval.write_attempt(out_dir, _fake_attempt(rng, "bench", f"c{i % 20}", i)) for i in range(n_w)],
+                         args.repeat, setup=_reset_out, units=n_w, unit="attempt"))
+
+    root = data / "class_attempts"
+    if not root.exists():
+        for u in range(args.users):
+            ud = root / f"user{u:03d}"
+            ud.mkdir(parents=True)
+            recs = [_fake_attempt(rng, ud.name, f"case{rng.randrange(args.cases):03d}", i) for i in range(args.per_user)]
+            (ud / "attempts.jsonl").write_text("".join(json.dumps(a) + "\n" for a in recs), encoding="utf-8")
+            online.save_summary(ud, online.rebuild_summary(recs))
+    n_att = args.users * args.per_user
+    p = {"users": args.users, "per_user": args.per_user}
+    results.append(bench("load_attempts", p, lambda: analytics.load_class(root), args.repeat, units=n_att, unit="attempt"))
+    tab = analytics.load_class(root)
+    results.append(bench("dashboard_aggregate", p, lambda: (analytics.group_stats(tab, "user"), analytics.group_stats(tab, "case"),
+                                                            online.class_summary(root)), args.repeat, units=n_att, unit="attempt"))
+
+    print("case listing", flush=True)
+    for k in range(args.list_cases):
+        d = core.WORKSPACE / f"bench_case_{k:05d}"
+        if not d.exists():
+            d.mkdir(parents=True)
+            (d / "t1.nii.gz").write_bytes(b"")
+            (d / "gold.nii.gz").write_bytes(b"")
+            (d / "case.json").write_text(json.dumps({"case_id": d.name}), encoding="utf-8")
+    p = {"cases": args.list_cases}
+    results.append(bench("list_cases_cold", p, lt_case.list_cases, args.repeat,
+                         setup=lambda: lt_case.INDEX_PATH.unlink(missing_ok=True), units=args.list_cases, unit="case"))
+    results.append(bench("list_cases_warm", p, lt_case.list_cases, args.repeat, units=args.list_cases, unit="case"))
+
+    meta = {"app_version": core.APP_VERSION, "python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%d_%H%M%S"),
+            "argv": sys.argv[1:]}
+    try:
+        import numpy, nibabel
+        meta.update(numpy=numpy.__version__, nibabel=nibabel.__version__)
+    except Exception:
+        pass
+    return {"meta": meta, "results": results, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _key(r: Dict[str, Any]) -> str:
+    return f"{r['name']}|{json.dumps(r['params'], sort_keys=True)}"
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Results slower than baseline by more than `tolerance` (fraction) and the noise floor."""
+    base = {_key(r): r for r in baseline.get("results") or []}
+    out = []
+    for r in report.get("results") or []:
+        b = base.get(_key(r))
+        if not b:
+            continue
+        ratio = r["wall_s"] / b["wall_s"] if b["wall_s"] else 1.0
+        r["baseline_s"] = b["wall_s"]
+        r["ratio"] = round(ratio, 3)
+        if ratio > 1.0 + tolerance and r["wall_s"] - b["wall_s"] > _NOISE_FLOOR_S:
+            out.append(r)
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.run", description="SegLab performance benchmarks")
+    ap.add_argument("--sizes", default="128,256", help="volume edge lengths, e.g. 128,256,512")
+    ap.add_argument("--loads", default="0.002,0.02", help="lesion volume fractions")
+    ap.add_argument("--noise", default="0.0,0.05", help="student flip-noise rates inside the lesion bbox")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--attempts", type=int, default=200, help="write_attempt calls per run")
+    ap.add_argument("--users", type=int, default=80)
+    ap.add_argument("--per-user", type=int, default=60)
+    ap.add_argument("--cases", type=int, default=40)
+    ap.add_argument("--list-cases", type=int, default=500)
+    ap.add_argument("--data", default="", help="where synthetic volumes are cached (default: temp dir)")
+    ap.add_argument("--out", default="", help="write the JSON report here")
+    ap.add_argument("--baseline", default="", help="compare against this report; exit 1 on regression")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    ap.add_argument("--save-baseline", default="", help="write the report as the new baseline")
+    args = ap.parse_args(argv)
+
+    # isolate USER_DATA before any lt_* import resolves Path.home()
+    home = Path(tempfile.mkdtemp(prefix="seglab_bench_home_"))
+    os.environ["HOME"] = os.environ["USERPROFILE"] = str(home)
+    args.data = args.data or str(home / "data")
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    try:
+        report = run(args)
+        if args.baseline:
+            base = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+            report["regressions"] = [_key(r) for r in compare(report, base, args.tolerance)]
+        text = json.dumps(report, indent=2)
+        if args.out:
+            Path(args.out).write_text(text, encoding="utf-8")
+        if args.save_baseline:
+            Path(args.save_baseline).write_text(text, encoding="utf-8")
+        if not args.out and not args.save_baseline:
+            print(text)
+        if report.get("regressions"):
+            print("\nREGRESSIONS (> {:.0f}% slower than baseline):".format(args.tolerance * 100))
+            for r in report["results"]:
+                if _key(r) in report["regressions"]:
+                    print(f"  {_key(r)}: {r['baseline_s'] * 1000:.2f} -> {r['wall_s'] * 1000:.2f} ms (x{r['ratio']})")
+            return 1
+        return 0
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
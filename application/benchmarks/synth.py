@@ -0,0 +1,54 @@
+# benchmarks/synth.py — synthetic T1 / gold / student NIfTI triples (seeded, cached on disk)
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Tuple
+
+
+def _ellipsoids(shape, load: float, rng):
+    """Bool mask of random ellipsoid lesions covering ~`load` of the volume."""
+    import numpy as np
+
+    m = np.zeros(shape, dtype=bool)
+    target = max(1, int(load * m.size))
+    n = max(1, int(round(load * 400)))
+    mean_r = (target / n / 4.19) ** (1 / 3)
+    while int(m.sum()) < target:
+        r = np.clip(rng.normal(mean_r, 1.0, size=3), 2.0, min(shape) / 4)
+        c = np.array([rng.uniform(r[i] + 1, shape[i] - r[i] - 1) for i in range(3)])
+        lo = np.maximum(0, (c - r - 1).astype(int))
+        hi = np.minimum(shape, (c + r + 2).astype(int))
+        x, y, z = np.ogrid[lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]]
+        d = ((x - c[0]) / r[0]) ** 2 + ((y - c[1]) / r[1]) ** 2 + ((z - c[2]) / r[2]) ** 2
+        m[lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]] |= d <= 1.0
+    return m
+
+
+def make_case(out_dir: Path, size: int, load: float = 0.002, noise: float = 0.02, seed: int = 0) -> Tuple[Path, Path, Path]:
+    """Write t1/gold/student for a `size`³ volume; reuses files already generated for these params."""
+    import numpy as np
+    import nibabel as nib
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    t1p, gp, sp = out_dir / "t1.nii.gz", out_dir / "gold.nii.gz", out_dir / "student.nii.gz"
+    if t1p.exists() and gp.exists() and sp.exists():
+        return t1p, gp, sp
+
+    rng = np.random.default_rng(seed)
+    shape = (size, size, size)
+    affine = np.diag([256.0 / size, 256.0 / size, 256.0 / size, 1.0])
+    gold = _ellipsoids(shape, load, rng)
+
+    # student: gold shifted by a voxel plus boundary-ish flips at rate `noise` inside the lesion bbox
+    student = np.roll(gold, 1, axis=int(rng.integers(0, 3)))
+    nz = np.argwhere(gold)
+    if nz.size and noise > 0:
+        lo, hi = np.maximum(nz.min(axis=0) - 3, 0), np.minimum(nz.max(axis=0) + 4, size)
+        sl = tuple(slice(int(lo[i]), int(hi[i])) for i in range(3))
+        student[sl] ^= rng.random(student[sl].shape) < noise
+
+    t1 = (rng.normal(100.0, 15.0, size=shape).astype(np.float32) + gold * 60.0).astype(np.int16)
+    nib.save(nib.Nifti1Image(t1, affine), str(t1p))
+    nib.save(nib.Nifti1Image(gold.astype(np.uint8), affine), str(gp))
+    nib.save(nib.Nifti1Image(student.astype(np.uint8), affine), str(sp))
+    return t1p, gp, sp
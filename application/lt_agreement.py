@@ -0,0 +1,179 @@
+# lt_agreement.py — pairwise Dice agreement among a case's submissions (and gold) as one matrix product
+from __future__ import annotations
+
+import csv
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import lt_maskcodec as maskcodec
+import lt_share as share
+import lt_store as store
+from lt_consensus import heatmap_dir, latest_submissions
+
+CACHE_NAME = "agreement.npz"
+GOLD = "(gold)"
+_CHUNK_BYTES = 64 << 20  # float32 working set per GEMM chunk
+
+Item = Tuple[Any, Any, Any]  # (lo, hi, bool crop)
+
+
+def _item_from_bytes(data: bytes) -> Item:
+    import numpy as np
+    h, crop = maskcodec.decode_crop(data)
+    return np.array([b[0] for b in h["bbox"]]), np.array([b[1] for b in h["bbox"]]), crop
+
+
+def _item_from_mask(mask) -> Item:
+    import numpy as np
+    nz = np.argwhere(mask)
+    if not nz.size:
+        z = np.zeros(3, dtype=np.int64)
+        return z, z, np.zeros((0, 0, 0), dtype=bool)
+    lo, hi = nz.min(axis=0), nz.max(axis=0) + 1
+    return lo, hi, mask[lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]]
+
+
+def _bounds(items: List[Item]):
+    import numpy as np
+    live = [it for it in items if it[2].size]
+    if not live:
+        return None
+    return np.min([it[0] for it in live], axis=0), np.max([it[1] for it in live], axis=0)
+
+
+def _fill(X, items: List[Item], lo, hi) -> None:
+    """Scatter each item's overlap with the box [lo, hi) into row i of X (N x box)."""
+    import numpy as np
+    X[:] = 0
+    box = tuple(int(x) for x in (hi - lo))
+    for i, (a, b, crop) in enumerate(items):
+        if not crop.size:
+            continue
+        s = np.maximum(a, lo)
+        e = np.minimum(b, hi)
+        if (e <= s).any():
+            continue
+        dst = X[i].reshape(box)
+        dst[s[0] - lo[0]:e[0] - lo[0], s[1] - lo[1]:e[1] - lo[1], s[2] - lo[2]:e[2] - lo[2]] = \
+            crop[s[0] - a[0]:e[0] - a[0], s[1] - a[1]:e[1] - a[1], s[2] - a[2]:e[2] - a[2]]
+
+
+def cross_counts(rows: List[Item], cols: List[Item]):
+    """Intersection voxel counts |rows_i & cols_j| via float32 GEMM over ROI-cropped masks.
+
+    The ROI is the union bbox of `cols` (no intersection can lie outside it) and
+    is processed in slabs along the first axis to bound memory; each slab
+    product is exact in float32 and accumulated in int64.
+    """
+    import numpy as np
+    out = np.zeros((len(rows), len(cols)), dtype=np.int64)
+    bb = _bounds(cols)
+    if bb is None or not rows:
+        return out
+    lo, hi = bb
+    plane = int((hi[1] - lo[1]) * (hi[2] - lo[2]))
+    step = max(1, min(int(hi[0] - lo[0]), _CHUNK_BYTES // max(1, 4 * plane * (len(rows) + len(cols)))))
+    for x0 in range(int(lo[0]), int(hi[0]), step):
+        clo = np.array([x0, lo[1], lo[2]])
+        chi = np.array([min(x0 + step, int(hi[0])), hi[1], hi[2]])
+        n = int(np.prod(chi - clo))
+        R = np.empty((len(rows), n), dtype=np.float32)
+        C = np.empty((len(cols), n), dtype=np.float32)
+        _fill(R, rows, clo, chi)
+        _fill(C, cols, clo, chi)
+        out += np.rint(R @ C.T).astype(np.int64)
+    return out
+
+
+def dice_matrix(inter) -> Any:
+    import numpy as np
+    s = np.diag(inter).astype(np.float64)
+    den = s[:, None] + s[None, :]
+    return np.divide(2.0 * inter, den, out=np.ones_like(den), where=den > 0)
+
+
+def _load_cache(path: Path) -> Optional[Dict[str, Any]]:
+    import numpy as np
+    try:
+        if path.exists():
+            with np.load(path, allow_pickle=False) as z:
+                return {"keys": json.loads(str(z["keys"])), "inter": z["inter"], "gold_sha": str(z["gold_sha"])}
+    except Exception:
+        pass
+    return None
+
+
+def _save_cache(path: Path, keys: List[List[str]], inter, gold_sha: str) -> None:
+    import numpy as np
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp.npz")
+    np.savez_compressed(tmp, keys=np.array(json.dumps(keys)), inter=inter, gold_sha=np.array(gold_sha))
+    os.replace(tmp, path)
+
+
+def build(root: Path, code: str, case_id: str, force: bool = False) -> Dict[str, Any]:
+    """Dice agreement among each student's newest submission for a case; row/col 0 is gold.
+
+    Intersections are cached per case; when submissions change only the new
+    rows/columns are computed (one GEMM of all masks against the new ones).
+    """
+    import numpy as np
+    from lt_eval import load_gold_mask
+
+    gold_path = share.class_dir(root, code) / "cases" / case_id / "gold.nii.gz"
+    gold, _affine, _header = load_gold_mask(gold_path)
+    gold_sha = store.sha256_file(gold_path)
+    attempts = share.attempts_root(root, code)
+    out = heatmap_dir(root, code, case_id)
+    out.mkdir(parents=True, exist_ok=True)
+
+    subs = latest_submissions(attempts, case_id)
+    cache = None if force else _load_cache(out / CACHE_NAME)
+    if cache is not None and cache["gold_sha"] != gold_sha:
+        cache = None
+
+    old = {u: i for i, (u, sha) in enumerate(cache["keys"]) if subs.get(u) == sha} if cache else {}
+    kept = sorted(old)
+    fresh = [u for u in sorted(subs) if u not in old]
+
+    items: Dict[str, Item] = {GOLD: _item_from_mask(gold)}
+    for u in sorted(subs):
+        data = maskcodec.load(attempts / u / maskcodec.STORE_DIR, subs[u])
+        if data is not None:
+            items[u] = _item_from_bytes(data)
+    kept = [u for u in kept if u in items]
+    fresh = [u for u in fresh if u in items]
+
+    keys = [GOLD] + kept + fresh
+    n = len(keys)
+    inter = np.zeros((n, n), dtype=np.int64)
+    if cache is not None:
+        idx = [0] + [old[u] for u in kept]
+        inter[:len(idx), :len(idx)] = cache["inter"][np.ix_(idx, idx)]
+    else:
+        fresh = [GOLD] + kept + fresh
+        kept = []
+    if fresh:
+        k0 = n - len(fresh)
+        c = cross_counts([items[u] for u in keys], [items[u] for u in fresh])
+        inter[:, k0:] = c
+        inter[k0:, :] = c.T
+    if fresh or cache is None or len(cache["keys"]) != n:
+        _save_cache(out / CACHE_NAME, [[u, subs.get(u, gold_sha)] for u in keys], inter, gold_sha)
+
+    d = dice_matrix(inter)
+    m = len(keys) - 1
+    pair = d[1:, 1:][np.triu_indices(m, 1)] if m > 1 else np.array([])
+    return {"keys": keys, "inter": inter, "dice": d, "computed": len(fresh),
+            "mean_pairwise": float(pair.mean()) if pair.size else 0.0,
+            "mean_vs_gold": float(d[0, 1:].mean()) if m else 0.0}
+
+
+def export_csv(result: Dict[str, Any], out_csv: Path) -> None:
+    keys = result["keys"]
+    with out_csv.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow([""] + keys)
+        for k, row in zip(keys, result["dice"]):
+            w.writerow([k] + [f"{float(x):.4f}" for x in row])
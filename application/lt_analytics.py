@@ -0,0 +1,235 @@
+# lt_analytics.py — vectorized cohort analytics over attempt logs (NumPy structured arrays)
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+import lt_attemptlog as attemptlog
+import lt_backend
+
+# One row per attempt. Categorical fields are int32 codes into AttemptTable.labels.
+ATTEMPT_DTYPE = np.dtype([
+    ("t", np.int64),          # timestamp as YYYYMMDDHHMMSS (sortable)
+    ("user", np.int32),
+    ("case", np.int32),
+    ("session", np.int32),
+    ("dice", np.float64),
+    ("jaccard", np.float64),
+    ("mismatch", np.float64),
+    ("vol_abs_err_ml", np.float64),
+    ("passed", np.bool_),
+])
+
+GROUP_KEYS = ("user", "case", "session")
+
+
+@dataclass
+class AttemptTable:
+    rec: np.ndarray
+    labels: Dict[str, List[str]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return int(self.rec.shape[0])
+
+
+def _ts_int(ts: str) -> int:
+    digits = "".join(ch for ch in str(ts or "") if ch.isdigit())
+    try:
+        return int(digits[:14].ljust(14, "0")) if digits else 0
+    except Exception:
+        return 0
+
+
+def _num(a: Dict[str, Any], k: str) -> float:
+    try:
+        v = a.get(k)
+        return float(v) if v not in (None, "") else 0.0
+    except Exception:
+        return 0.0
+
+
+def read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    try:
+        for line in path.read_text(encoding="utf-8", errors="ignore").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                d = json.loads(line)
+                if isinstance(d, dict):
+                    out.append(d)
+            except Exception:
+                continue
+    except Exception:
+        pass
+    return out
+
+
+def read_user_attempts(user_dir: Path) -> List[Dict[str, Any]]:
+    """Merged attempt log of one student (segments + legacy JSONL); falls back to the per-attempt JSON files."""
+    if attemptlog.has_log(user_dir):
+        return attemptlog.read_records(user_dir)
+    out: List[Dict[str, Any]] = []
+    b, rel = lt_backend.locate(user_dir)
+    for e in b.list(rel):
+        if not e.get("dir") and e["name"].endswith(".json"):
+            d = b.read_json(lt_backend.join(rel, e["name"]))
+            if isinstance(d, dict):
+                out.append(d)
+    return out
+
+
+def read_class_attempts(attempts_root: Path) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    b, rel = lt_backend.locate(attempts_root)
+    for e in b.list(rel):
+        if e.get("dir"):
+            out.extend(read_user_attempts(attempts_root / e["name"]))
+    return out
+
+
+def from_records(records: Iterable[Dict[str, Any]]) -> AttemptTable:
+    records = list(records)
+    rec = np.zeros(len(records), dtype=ATTEMPT_DTYPE)
+    labels: Dict[str, List[str]] = {}
+    for key, src in (("user", "user"), ("case", "case_id"), ("session", "session")):
+        raw = np.array([str(a.get(src) or "") for a in records], dtype=object)
+        uniq, inv = np.unique(raw.astype(str), return_inverse=True) if len(raw) else (np.array([], dtype=str), np.array([], dtype=np.int64))
+        rec[key] = inv
+        labels[key] = [str(x) for x in uniq]
+    rec["t"] = [_ts_int(a.get("timestamp")) for a in records]
+    rec["dice"] = [_num(a, "dice") for a in records]
+    rec["jaccard"] = [_num(a, "jaccard") for a in records]
+    rec["mismatch"] = [_num(a, "mismatch_voxels") for a in records]
+    rec["vol_abs_err_ml"] = [_num(a, "vol_abs_err_ml") for a in records]
+    rec["passed"] = [bool(a.get("passed")) for a in records]
+    return AttemptTable(rec, labels)
+
+
+def load_class(attempts_root: Path) -> AttemptTable:
+    return from_records(read_class_attempts(attempts_root))
+
+
+def _sorted_quantile(vals: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """Linear-interpolated quantile of each contiguous, already-sorted group."""
+    pos = starts + q * (counts - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, starts + counts - 1)
+    frac = pos - lo
+    return vals[lo] * (1.0 - frac) + vals[hi] * frac
+
+
+def _first_attempts(rec: np.ndarray, n_cases: int) -> np.ndarray:
+    """Row index of each student's first attempt at each case."""
+    of = np.lexsort((rec["t"], rec["case"], rec["user"]))
+    pair = rec["user"][of].astype(np.int64) * (n_cases + 1) + rec["case"][of]
+    return of[np.concatenate([[True], pair[1:] != pair[:-1]])]
+
+
+def ts_label(t: int) -> str:
+    s = f"{int(t):014d}"
+    return f"{s[:4]}-{s[4:6]}-{s[6:8]}_{s[8:14]}"
+
+
+def group_stats(tab: AttemptTable, by: str = "user", mask: np.ndarray | None = None) -> Dict[str, np.ndarray]:
+    """Per-group statistics in one pass of sorts and bincounts.
+
+    Returns arrays aligned on `key` (group label): n, mean, median, q25, q75,
+    iqr, p10, p90, best, pass_rate, first_pass_rate, slope (Dice per attempt,
+    least squares over attempt order), mean_mismatch, mean_jaccard.
+    """
+    if by not in GROUP_KEYS:
+        raise ValueError(f"Unknown group key: {by}")
+    rec = tab.rec if mask is None else tab.rec[mask]
+    names = tab.labels.get(by, [])
+    nk = len(names)
+    if len(rec) == 0 or nk == 0:
+        empty = np.array([], dtype=np.float64)
+        return {"key": np.array([], dtype=object), "n": np.array([], dtype=np.int64), **{k: empty for k in (
+            "mean", "median", "q25", "q75", "iqr", "p10", "p90", "best", "pass_rate", "first_pass_rate",
+            "slope", "mean_mismatch", "mean_jaccard")}}
+
+    key = rec[by].astype(np.int64)
+    dice = rec["dice"]
+    counts_all = np.bincount(key, minlength=nk)
+    present = np.flatnonzero(counts_all)
+    counts = counts_all[present].astype(np.float64)
+    starts_all = np.concatenate([[0], np.cumsum(counts_all)[:-1]])
+    starts = starts_all[present]
+
+    def gmean(w: np.ndarray) -> np.ndarray:
+        return np.bincount(key, weights=w.astype(np.float64), minlength=nk)[present] / counts
+
+    # quantiles: sort by (group, dice)
+    ds = dice[np.lexsort((dice, key))]
+    q = {name: _sorted_quantile(ds, starts, counts_all[present], p) for name, p in
+         (("p10", 0.10), ("q25", 0.25), ("median", 0.50), ("q75", 0.75), ("p90", 0.90))}
+    best = ds[starts + counts_all[present] - 1]
+
+    # learning-curve slope: sort by (group, time), x = attempt rank within group
+    ot = np.lexsort((rec["t"], key))
+    kt = key[ot]
+    x = (np.arange(len(ot)) - starts_all[kt]).astype(np.float64)
+    y = dice[ot]
+    sx = np.bincount(kt, weights=x, minlength=nk)[present]
+    sy = np.bincount(kt, weights=y, minlength=nk)[present]
+    sxy = np.bincount(kt, weights=x * y, minlength=nk)[present]
+    sxx = np.bincount(kt, weights=x * x, minlength=nk)[present]
+    den = counts * sxx - sx * sx
+    slope = np.divide(counts * sxy - sx * sy, den, out=np.zeros_like(den), where=den > 0)
+
+    head = _first_attempts(rec, len(tab.labels.get("case", [])))
+    fk = key[head]
+    fn = np.bincount(fk, minlength=nk)[present].astype(np.float64)
+    fp = np.bincount(fk, weights=rec["passed"][head].astype(np.float64), minlength=nk)[present]
+    first_pass = np.divide(fp, fn, out=np.zeros_like(fp), where=fn > 0)
+
+    return {
+        "key": np.array([names[i] for i in present], dtype=object),
+        "n": counts.astype(np.int64),
+        "mean": gmean(dice),
+        **q,
+        "iqr": q["q75"] - q["q25"],
+        "best": best,
+        "pass_rate": gmean(rec["passed"]),
+        "first_pass_rate": first_pass,
+        "slope": slope,
+        "mean_mismatch": gmean(rec["mismatch"]),
+        "mean_jaccard": gmean(rec["jaccard"]),
+    }
+
+
+def summary(tab: AttemptTable) -> Dict[str, float]:
+    """Whole-table headline numbers (e.g. one student's Progress page)."""
+    if len(tab) == 0:
+        return {}
+    d = tab.rec["dice"]
+    t_order = np.argsort(tab.rec["t"], kind="stable")
+    x = np.arange(len(d), dtype=np.float64)
+    slope = float(np.polyfit(x, d[t_order], 1)[0]) if len(d) >= 2 else 0.0
+    q25, med, q75 = np.percentile(d, [25, 50, 75])
+    head = _first_attempts(tab.rec, len(tab.labels.get("case", [])))
+    return {
+        "n": float(len(d)),
+        "mean": float(d.mean()),
+        "median": float(med),
+        "iqr": float(q75 - q25),
+        "best": float(d.max()),
+        "pass_rate": float(tab.rec["passed"].mean()),
+        "first_pass_rate": float(tab.rec["passed"][head].mean()),
+        "slope": slope,
+    }
+
+
+def select(tab: AttemptTable, by: str, label: str) -> np.ndarray:
+    """Row indices of one student/case/session, newest first."""
+    names: Sequence[str] = tab.labels.get(by, [])
+    if label not in names:
+        return np.array([], dtype=np.int64)
+    idx = np.flatnonzero(tab.rec[by] == names.index(label))
+    return idx[np.argsort(tab.rec["t"][idx], kind="stable")[::-1]]
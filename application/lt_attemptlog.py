@@ -0,0 +1,342 @@
+# lt_attemptlog.py — per-writer, checksum-framed attempt segments (no cross-client locks on the share)
+#
+# Every process appends only to its own segment under <user_dir>/log/, so two machines (or an SMB
+# reconnect replaying a write) can never interleave bytes inside one file. A process writes the
+# host's stable segment <host>.seg while it holds <host>.lock, and falls back to <host>-<pid>.seg
+# only when another process of the same host holds it; the next owner of the host segment folds
+# closed pid segments back into it (compact), so a folder keeps about one segment per machine. Each record is
+#   MAGIC | u32 length | u32 crc32(payload) | payload (UTF-8 JSON) | "\n"
+# Readers merge all segments plus the legacy attempts.jsonl, resync past torn/garbled frames and
+# drop duplicate record ids, so a retried write is harmless. All I/O goes through the folder's
+# ShareBackend (lt_backend.locate).
+from __future__ import annotations
+
+import json
+import os
+import re
+import socket
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import lt_backend
+
+LOG_DIR = "log"
+SEG_EXT = ".seg"
+LOCK_EXT = ".lock"
+LEGACY_JSONL = "attempts.jsonl"
+MAGIC = b"\x1eLR1"
+_HEAD = struct.Struct("<II")
+_FRAME_MIN = len(MAGIC) + _HEAD.size + 1
+MAX_RECORD = 4 * 1024 * 1024
+
+_lock = threading.Lock()
+# path -> (size, mtime, good_end, records, skipped_bytes); segments only ever grow
+_cache: Dict[str, Tuple[int, float, int, List[Dict[str, Any]], int]] = {}
+# path -> (records seen, their keys), grown with the segment so contains() is a set lookup
+_keys: Dict[str, Tuple[int, set]] = {}
+
+_writers_lock = threading.Lock()
+# user dir -> (writer name, lock handle kept open for the life of the process)
+_writers: Dict[str, Tuple[str, Any]] = {}
+
+
+def host_id() -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", socket.gethostname() or "host")[:40]
+
+
+def log_dir(user_dir: Path) -> Path:
+    return user_dir / LOG_DIR
+
+
+def writer_id(user_dir: Path) -> str:
+    """This process's writer name for a folder: the host's segment if its lock is free, else host-pid.
+
+    Taking over the host segment also compacts closed pid segments of this host into it.
+    """
+    key = str(user_dir)
+    with _writers_lock:
+        w = _writers.get(key)
+        if w is not None:
+            return w[0]
+        b, rel = lt_backend.locate(log_dir(user_dir))
+        host = host_id()
+        name, h = host, b.try_lock(lt_backend.join(rel, host + LOCK_EXT))
+        if h is None:
+            name = f"{host}-{os.getpid()}"
+            h = b.try_lock(lt_backend.join(rel, name + LOCK_EXT))
+        _writers[key] = (name, h)
+    if name == host:
+        try:
+            compact(user_dir)
+        except Exception:
+            pass
+    return name
+
+
+def writer_path(user_dir: Path, ext: str = SEG_EXT) -> Path:
+    return log_dir(user_dir) / f"{writer_id(user_dir)}{ext}"
+
+
+def new_rid() -> str:
+    """Time-ordered, collision-safe record id (ms clock + 48 random bits)."""
+    return f"{int(time.time() * 1000):011x}{os.urandom(6).hex()}"
+
+
+def record_key(rec: Dict[str, Any]) -> str:
+    return f"{rec.get('_rid') or ''}|{rec.get('timestamp') or ''}"
+
+
+def frame(rec: Dict[str, Any]) -> bytes:
+    payload = json.dumps(rec, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return MAGIC + _HEAD.pack(len(payload), zlib.crc32(payload) & 0xFFFFFFFF) + payload + b"\n"
+
+
+def parse(buf: bytes, start: int = 0) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Decode frames from buf[start:]. Returns (records, end of last good frame, bytes skipped).
+
+    A bad magic, length or checksum resyncs at the next MAGIC; an incomplete frame at the
+    end is left unconsumed (it may still be in flight) and reported via the returned offset.
+    """
+    out: List[Dict[str, Any]] = []
+    pos = start
+    good = start
+    skipped = 0
+    n = len(buf)
+    while pos < n:
+        if buf[pos:pos + len(MAGIC)] != MAGIC:
+            nxt = buf.find(MAGIC, pos + 1)
+            if nxt < 0:
+                break
+            skipped += nxt - pos
+            pos = good = nxt
+            continue
+        if n - pos < _FRAME_MIN:
+            break
+        length, crc = _HEAD.unpack_from(buf, pos + len(MAGIC))
+        body = pos + len(MAGIC) + _HEAD.size
+        if length > MAX_RECORD:
+            pos += 1
+            skipped += 1
+            continue
+        if body + length + 1 > n:
+            nxt = buf.find(MAGIC, pos + 1)
+            if nxt < 0:
+                break  # torn tail (or a write still landing)
+            skipped += nxt - pos
+            pos = good = nxt
+            continue
+        payload = buf[body:body + length]
+        if (zlib.crc32(payload) & 0xFFFFFFFF) != crc or buf[body + length:body + length + 1] != b"\n":
+            pos += 1
+            skipped += 1
+            continue
+        try:
+            d = json.loads(payload.decode("utf-8"))
+            if isinstance(d, dict):
+                out.append(d)
+        except Exception:
+            pass
+        pos = good = body + length + 1
+    return out, good, skipped
+
+
+def read_segment(path: Path) -> Tuple[List[Dict[str, Any]], int]:
+    """(records, bytes skipped) for one segment; re-reads only the newly appended tail."""
+    b, rel = lt_backend.locate(path)
+    st = b.stat(rel)
+    if st is None:
+        return [], 0
+    key = str(path)
+    with _lock:
+        c = _cache.get(key)
+    if c and c[0] == st["size"] and c[1] == st["mtime"]:
+        return c[3], c[4]
+    if c and st["size"] >= c[0]:
+        recs, skipped, start = list(c[3]), c[4], c[2]
+    else:
+        recs, skipped, start = [], 0, 0
+    try:
+        buf = b.read(rel, start)
+    except Exception:
+        return recs, skipped
+    new, good, sk = parse(buf)
+    recs += new
+    skipped += sk
+    with _lock:
+        _cache[key] = (start + len(buf), st["mtime"], start + good, recs, skipped)
+    return recs, skipped
+
+
+def segments(user_dir: Path) -> List[Path]:
+    b, rel = lt_backend.locate(log_dir(user_dir))
+    return [log_dir(user_dir) / e["name"] for e in b.list(rel) if not e.get("dir") and e["name"].endswith(SEG_EXT)]
+
+
+def _read_legacy(path: Path) -> List[Dict[str, Any]]:
+    """Records of the legacy attempts.jsonl, re-parsed only when the file changes."""
+    b, rel = lt_backend.locate(path)
+    st = b.stat(rel)
+    if st is None:
+        return []
+    key = str(path)
+    with _lock:
+        c = _cache.get(key)
+    if c and c[0] == st["size"] and c[1] == st["mtime"]:
+        return c[3]
+    out: List[Dict[str, Any]] = []
+    try:
+        for line in b.read(rel).decode("utf-8", errors="ignore").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                d = json.loads(line)
+                if isinstance(d, dict):
+                    out.append(d)
+            except Exception:
+                continue
+    except Exception:
+        pass
+    with _lock:
+        _cache[key] = (st["size"], st["mtime"], st["size"], out, 0)
+    return out
+
+
+def legacy_records(user_dir: Path) -> List[Dict[str, Any]]:
+    """Parsed attempts.jsonl of a user folder; the same list object until the file changes."""
+    return _read_legacy(user_dir / LEGACY_JSONL)
+
+
+def _sources(user_dir: Path) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """(name, records) for the legacy JSONL (first) and every segment, in a fixed order."""
+    out = [(LEGACY_JSONL, _read_legacy(user_dir / LEGACY_JSONL))]
+    out += [(p.name, read_segment(p)[0]) for p in segments(user_dir)]
+    return out
+
+
+def _keyset(path: str, recs: List[Dict[str, Any]]) -> set:
+    """Keys of a file's records, extended with the newly read tail only (files only grow)."""
+    with _lock:
+        n, ks = _keys.get(path) or (0, set())
+        if n > len(recs):
+            n, ks = 0, set()
+        if n < len(recs):
+            ks.update(record_key(r) for r in recs[n:])
+            _keys[path] = (len(recs), ks)
+        return ks
+
+
+def contains(user_dir: Path, key: str) -> bool:
+    """True if any writer (or the legacy log) already holds a record with this key."""
+    return any(key in _keyset(str(log_dir(user_dir) / name), recs) for name, recs in _sources(user_dir))
+
+
+def owned_records(user_dir: Path, seg: Path) -> List[Dict[str, Any]]:
+    """Records of one segment that count towards its writer's summary.
+
+    A record duplicated across files (two writers racing on the same retry) belongs
+    to the legacy log or to the first segment by name, so merged summaries count it once.
+    """
+    seen = set()
+    for name, recs in _sources(user_dir):
+        if name == seg.name:
+            out = []
+            for r in recs:
+                k = record_key(r)
+                if k == "|" or k not in seen:
+                    seen.add(k)
+                    out.append(r)
+            return out
+        seen.update(record_key(r) for r in recs)
+    return []
+
+
+def read_records(user_dir: Path) -> List[Dict[str, Any]]:
+    """Merged, de-duplicated attempts of one user folder (legacy JSONL + all segments), oldest first."""
+    out: List[Dict[str, Any]] = []
+    seen = set()
+    for _name, recs in _sources(user_dir):
+        for r in recs:
+            k = record_key(r)
+            if k != "|" and k in seen:
+                continue
+            seen.add(k)
+            out.append(r)
+    out.sort(key=lambda a: (str(a.get("timestamp") or ""), str(a.get("_rid") or "")))
+    return out
+
+
+def has_log(user_dir: Path) -> bool:
+    b, rel = lt_backend.locate(user_dir)
+    return b.exists(lt_backend.join(rel, LEGACY_JSONL)) or bool(segments(user_dir))
+
+
+def health(user_dir: Path) -> Dict[str, int]:
+    """Segment count and bytes skipped while reading (torn tails, garbled frames)."""
+    segs = segments(user_dir)
+    return {"segments": len(segs), "skipped_bytes": sum(read_segment(p)[1] for p in segs)}
+
+
+def compact(user_dir: Path) -> int:
+    """Fold closed <host>-<pid> segments of this host into the host segment. Returns segments folded.
+
+    Only the holder of the host lock calls this. A pid segment is closed when its lock can be
+    taken. Records are copied before anything is deleted, and the derived per-writer files
+    (summaries) are dropped before the segment goes, so a crash at any point leaves either a
+    duplicate record (readers drop it) or a missing summary (rebuilt from the log).
+    """
+    host = host_id()
+    ld = log_dir(user_dir)
+    b, rel = lt_backend.locate(ld)
+    pat = re.compile(re.escape(host) + r"-\d+")
+    entries = b.list(rel)
+    names = [e["name"][:-len(SEG_EXT)] for e in entries if not e.get("dir") and e["name"].endswith(SEG_EXT)]
+
+    def _derived(name: str) -> List[str]:
+        return [e["name"] for e in entries if e["name"].startswith(name + ".") and e["name"] not in (name + SEG_EXT, name + LOCK_EXT)]
+
+    # the host summary is rebuilt from the log on the next write: it then covers folded records,
+    # and one saved by a writer that crashed mid-update is corrected
+    for n in _derived(host):
+        b.remove(lt_backend.join(rel, n))
+    host_seg = ld / (host + SEG_EXT)
+    folded = 0
+    for name in names:
+        if not pat.fullmatch(name):
+            continue
+        h = b.try_lock(lt_backend.join(rel, name + LOCK_EXT))
+        if h is None:
+            continue  # still being written
+        try:
+            have = _keyset(str(host_seg), read_segment(host_seg)[0])
+            data = b"".join(frame(r) for r in read_segment(ld / (name + SEG_EXT))[0] if record_key(r) not in have)
+            if data:
+                b.append(lt_backend.join(rel, host_seg.name), data)
+            for n in _derived(name):
+                b.remove(lt_backend.join(rel, n))
+            b.remove(lt_backend.join(rel, name + SEG_EXT))
+            folded += 1
+        finally:
+            h.close()
+        try:
+            b.remove(lt_backend.join(rel, name + LOCK_EXT))
+        except Exception:
+            pass
+    return folded
+
+
+def append(user_dir: Path, rec: Dict[str, Any]) -> bool:
+    """Append one framed record to this process's segment.
+
+    False if any writer of the folder already logged its id, e.g. an attempt
+    re-delivered after a restart.
+    """
+    if contains(user_dir, record_key(rec)):
+        return False
+    b, rel = lt_backend.locate(writer_path(user_dir))
+    b.append(rel, frame(rec))
+    return True
@@ -0,0 +1,437 @@
+# lt_backend.py — ShareBackend: classroom storage as a mounted folder or an lt_classserver URL
+#
+# Paths are POSIX strings relative to the LTTrainer root ("classrooms/CODE/cases/x/t1.nii.gz").
+# lt_share keeps the classroom logic and picks a backend with lt_share.backend(root).
+from __future__ import annotations
+
+import abc
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import lt_perf as perf
+from lt_utils import tmp_sibling
+
+API = "v1"
+TIMEOUT_S = 20.0
+POOL_SIZE = 4      # idle keep-alive connections kept per server
+_CHUNK = 1024 * 1024
+
+
+def is_url(root: Any) -> bool:
+    return str(root or "").lower().startswith(("http://", "https://"))
+
+
+class BackendError(OSError):
+    pass
+
+
+def join(*parts: str) -> str:
+    """Join relative path parts, skipping empty ones ("" is the backend root)."""
+    return "/".join(p.strip("/") for p in parts if p and p.strip("/"))
+
+
+class ShareBackend(abc.ABC):
+    """Storage operations every share-touching code path goes through.
+
+    list/stat return dicts {name, dir, size, mtime}; missing paths give [] / None.
+    read(start, end) is a byte range (end exclusive, None = to EOF).
+    """
+
+    label = ""
+
+    @abc.abstractmethod
+    def list(self, rel: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abc.abstractmethod
+    def stat(self, rel: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abc.abstractmethod
+    def read(self, rel: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        ...
+
+    @abc.abstractmethod
+    def write_atomic(self, rel: str, data: bytes) -> None:
+        ...
+
+    @abc.abstractmethod
+    def append(self, rel: str, data: bytes) -> None:
+        """Append in one O_APPEND write where the storage allows it (attempt log frames)."""
+
+    @abc.abstractmethod
+    def makedirs(self, rel: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def put_file(self, rel: str, src: Path, readonly: bool = False) -> None:
+        """Copy a local file into place atomically (optionally marked read-only)."""
+
+    @abc.abstractmethod
+    def remove(self, rel: str) -> None:
+        """Delete a file; a missing file is not an error."""
+
+    def try_lock(self, rel: str) -> Any:
+        """Exclusive, non-blocking lock on a lock file. The returned handle holds it until
+        closed or the process exits; None if it is held elsewhere or locking is unsupported."""
+        return None
+
+    def download(self, rel: str, dest: Path) -> int:
+        """Copy a file to a local path (temp file + replace). Returns bytes written."""
+        data = self.read(rel)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = tmp_sibling(dest)
+        tmp.write_bytes(data)
+        os.replace(tmp, dest)
+        return len(data)
+
+    def exists(self, rel: str) -> bool:
+        return self.stat(rel) is not None
+
+    def read_json(self, rel: str) -> Any:
+        """Parsed JSON document, or None if missing/invalid."""
+        try:
+            return json.loads(self.read(rel).decode("utf-8"))
+        except Exception:
+            return None
+
+    def write_json(self, rel: str, obj: Any) -> None:
+        self.write_atomic(rel, json.dumps(obj, indent=2).encode("utf-8"))
+
+
+class LocalBackend(ShareBackend):
+    """Mounted share (SMB/NFS/local folder). path() gives native paths for tools that need real files."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.label = str(self.root)
+
+    def path(self, rel: str) -> Path:
+        return self.root.joinpath(*[p for p in rel.split("/") if p])
+
+    @staticmethod
+    def _entry(p: Path) -> Dict[str, Any]:
+        st = p.stat()
+        return {"name": p.name, "dir": p.is_dir(), "size": st.st_size, "mtime": st.st_mtime}
+
+    def list(self, rel: str) -> List[Dict[str, Any]]:
+        out = []
+        try:
+            for p in self.path(rel).iterdir():
+                try:
+                    out.append(self._entry(p))
+                except Exception:
+                    continue
+        except Exception:
+            pass
+        return sorted(out, key=lambda e: e["name"].lower())
+
+    def stat(self, rel: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._entry(self.path(rel))
+        except Exception:
+            return None
+
+    def read(self, rel: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        with open(self.path(rel), "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(max(0, end - start))
+
+    def download(self, rel: str, dest: Path) -> int:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = tmp_sibling(dest)
+        shutil.copyfile(self.path(rel), tmp)
+        os.replace(tmp, dest)
+        return dest.stat().st_size
+
+    def write_atomic(self, rel: str, data: bytes) -> None:
+        p = self.path(rel)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = tmp_sibling(p, ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, p)
+
+    def append(self, rel: str, data: bytes) -> None:
+        p = self.path(rel)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(p), os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            # a short write leaves a torn frame that log readers skip; a retry lands whole after it
+            view = memoryview(data)
+            while view:
+                n = os.write(fd, view)
+                view = view[n:]
+        finally:
+            os.close(fd)
+
+    def makedirs(self, rel: str) -> None:
+        self.path(rel).mkdir(parents=True, exist_ok=True)
+
+    def put_file(self, rel: str, src: Path, readonly: bool = False) -> None:
+        p = self.path(rel)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = tmp_sibling(p, ".tmp")
+        shutil.copy2(src, tmp)
+        if readonly:
+            try:
+                os.chmod(tmp, 0o444)
+            except Exception:
+                pass
+        if p.exists():
+            try:
+                os.chmod(p, 0o644)  # Windows cannot replace a read-only file
+            except Exception:
+                pass
+        os.replace(tmp, p)
+
+    def remove(self, rel: str) -> None:
+        self.path(rel).unlink(missing_ok=True)
+
+    def try_lock(self, rel: str) -> Any:
+        p = self.path(rel)
+        try:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            f = open(p, "a+b")
+        except Exception:
+            return None
+        try:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return f
+        except Exception:
+            f.close()
+            return None
+
+
+class _Pool:
+    """Idle keep-alive connections to one server, reused LIFO across threads."""
+
+    def __init__(self, url: str, size: int, timeout: float):
+        u = urllib.parse.urlsplit(url)
+        self.https = u.scheme == "https"
+        self.host = u.hostname or "localhost"
+        self.port = u.port
+        self.size = size
+        self.timeout = timeout
+        self._idle: List[Any] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> Tuple[Any, bool]:
+        """(connection, reused)."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        import http.client
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout), False
+
+    def put(self, conn) -> None:
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for c in idle:
+            c.close()
+
+
+class HttpBackend(ShareBackend):
+    """lt_classserver over pooled HTTP/1.1 keep-alive connections; JSON is revalidated with ETags."""
+
+    def __init__(self, url: str, timeout: float = TIMEOUT_S, pool_size: int = POOL_SIZE):
+        self.url = url.rstrip("/")
+        self.label = self.url
+        self._base = urllib.parse.urlsplit(self.url).path.rstrip("/")
+        self._pool = _Pool(self.url, pool_size, timeout)
+        self._etags: Dict[str, Tuple[str, bytes]] = {}
+
+    def _p(self, kind: str, rel: str = "") -> str:
+        return f"{self._base}/{API}/{kind}/" + urllib.parse.quote(rel.strip("/"))
+
+    def _send(self, method: str, path: str, body: Optional[bytes], headers: Optional[Dict[str, str]], sink=None):
+        """Run one request; retries once on a stale pooled connection. Returns (status, headers, body)."""
+        import http.client
+
+        for attempt in (0, 1):
+            conn, reused = self._pool.get()
+            t0 = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                r = conn.getresponse()
+                hdrs = {k: v for k, v in r.getheaders()}
+                if sink is not None and r.status in (200, 206):
+                    n = 0
+                    while True:
+                        chunk = r.read(_CHUNK)
+                        if not chunk:
+                            break
+                        sink(chunk)
+                        n += len(chunk)
+                    data = b""
+                else:
+                    data = r.read()
+                    n = len(data)
+                if r.will_close:
+                    conn.close()
+                else:
+                    self._pool.put(conn)
+                perf.record("share_http", (time.perf_counter() - t0) * 1000.0, n + len(body or b""), self.url, method=method)
+                return r.status, hdrs, data
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest, http.client.BadStatusLine,
+                    ConnectionResetError, BrokenPipeError) as e:
+                conn.close()
+                if reused and attempt == 0 and sink is None:
+                    continue  # server closed an idle keep-alive connection; retry on a fresh one
+                raise BackendError(f"{method} {self.url}{path}: {e}") from e
+            except Exception as e:
+                conn.close()
+                raise BackendError(f"{method} {self.url}{path}: {e}") from e
+        raise BackendError(f"{method} {self.url}{path}: connection failed")
+
+    def request(self, method: str, url: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """Request by absolute URL on this server (path + query are used)."""
+        u = urllib.parse.urlsplit(url)
+        return self._send(method, u.path + (f"?{u.query}" if u.query else ""), body, headers)
+
+    def close(self) -> None:
+        self._pool.close()
+
+    def get_json(self, kind: str, rel: str = "") -> Any:
+        path = self._p(kind, rel)
+        cached = self._etags.get(path)
+        status, h, body = self._send("GET", path, None, {"If-None-Match": cached[0]} if cached else None)
+        if status == 304 and cached:
+            body = cached[1]
+        elif status in (403, 404):
+            return None  # missing, or not served (e.g. the teacher config folder)
+        elif status != 200:
+            raise BackendError(f"GET {path}: HTTP {status}")
+        elif h.get("ETag"):
+            self._etags[path] = (h["ETag"], body)
+        return json.loads(body.decode("utf-8"))
+
+    def post_json(self, kind: str, rel: str, obj: Any) -> Any:
+        path = self._p(kind, rel)
+        status, _h, body = self._send("POST", path, json.dumps(obj).encode("utf-8"), {"Content-Type": "application/json"})
+        if status != 200:
+            raise BackendError(f"POST {path}: HTTP {status} {body[:200]!r}")
+        return json.loads(body.decode("utf-8"))
+
+    def list(self, rel: str) -> List[Dict[str, Any]]:
+        return self.get_json("list", rel) or []
+
+    def stat(self, rel: str) -> Optional[Dict[str, Any]]:
+        return self.get_json("stat", rel)
+
+    def read(self, rel: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        headers = {}
+        if start or end is not None:
+            headers["Range"] = f"bytes={start}-" + ("" if end is None else str(end - 1))
+        status, _h, body = self._send("GET", self._p("files", rel), None, headers)
+        if status == 416:
+            return b""
+        if status == 404:
+            raise FileNotFoundError(rel)
+        if status not in (200, 206):
+            raise BackendError(f"GET {rel}: HTTP {status}")
+        if status == 200 and (start or end is not None):
+            body = body[start:end]  # server ignored the range
+        return body
+
+    def read_json(self, rel: str) -> Any:
+        """JSON documents go through the ETag cache (a 304 costs no body transfer)."""
+        try:
+            path = self._p("files", rel)
+            cached = self._etags.get(path)
+            status, h, body = self._send("GET", path, None, {"If-None-Match": cached[0]} if cached else None)
+            if status == 304 and cached:
+                body = cached[1]
+            elif status != 200:
+                return None
+            elif h.get("ETag"):
+                self._etags[path] = (h["ETag"], body)
+            return json.loads(body.decode("utf-8"))
+        except Exception:
+            return None
+
+    def download(self, rel: str, dest: Path) -> int:
+        """Streamed to a temp file in 1 MB chunks, then moved into place."""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = tmp_sibling(dest)
+        try:
+            with open(tmp, "wb") as f:
+                status, _h, body = self._send("GET", self._p("files", rel), None, None, sink=f.write)
+            if status == 404:
+                raise FileNotFoundError(rel)
+            if status != 200:
+                raise BackendError(f"GET {rel}: HTTP {status} {body[:200]!r}")
+            os.replace(tmp, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return dest.stat().st_size
+
+    # The server is read-only for clients; attempts go through lt_share.upload_attempts.
+    def _read_only(self, rel: str):
+        raise BackendError(f"{self.url} is read-only (cannot write {rel})")
+
+    def write_atomic(self, rel: str, data: bytes) -> None:
+        self._read_only(rel)
+
+    def append(self, rel: str, data: bytes) -> None:
+        self._read_only(rel)
+
+    def makedirs(self, rel: str) -> None:
+        self._read_only(rel)
+
+    def put_file(self, rel: str, src: Path, readonly: bool = False) -> None:
+        self._read_only(rel)
+
+    def remove(self, rel: str) -> None:
+        self._read_only(rel)
+
+
+_backends: Dict[str, ShareBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get(root: Any) -> ShareBackend:
+    """LocalBackend for a share folder, HttpBackend for an http(s):// classroom server (one per root)."""
+    key = str(root)
+    with _backends_lock:
+        b = _backends.get(key)
+        if b is None:
+            b = _backends[key] = HttpBackend(key) if is_url(root) else LocalBackend(Path(root))
+    return b
+
+
+def locate(path: Path) -> Tuple[ShareBackend, str]:
+    """(backend, rel) for a native path: the known share folder containing it, else a
+    LocalBackend rooted at the path itself (e.g. the local progress mirror)."""
+    s = str(path)
+    best: Optional[LocalBackend] = None
+    with _backends_lock:
+        cands = [b for b in _backends.values() if isinstance(b, LocalBackend)]
+    for b in cands:
+        r = b.label.rstrip(os.sep)
+        if (s == r or s.startswith(r + os.sep)) and (best is None or len(r) > len(best.label)):
+            best = b
+    if best is None:
+        return LocalBackend(path), ""
+    rel = Path(s).relative_to(best.label).as_posix()
+    return best, "" if rel == "." else rel
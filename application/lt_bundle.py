@@ -0,0 +1,151 @@
+# lt_bundle.py — single-file classroom case bundles (uncompressed zip + JSON index)
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import lt_store as store
+from lt_utils import tmp_sibling
+
+BUNDLE_NAME = "cases.zip"
+INDEX_NAME = "cases.index.json"
+BUNDLE_FILES = ("t1.nii.gz", "gold.nii.gz", "case.json")
+
+_CHUNK = 1024 * 1024
+_REMOTE_CHUNK = 8 * 1024 * 1024  # bytes per range request when reading through read_at
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")  # zip local file header (30 bytes)
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _data_offset(f, header_offset: int) -> int:
+    f.seek(header_offset)
+    fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+    name_len, extra_len = fields[9], fields[10]
+    return header_offset + _LOCAL_HEADER.size + name_len + extra_len
+
+
+def build_bundle(cases_dir: Path, out_dir: Path) -> Dict[str, Any]:
+    """Pack every case folder into one stored (uncompressed) zip plus an index.
+
+    NIfTIs are already gzipped, so members are stored as-is; the index records
+    the byte offset of each member so clients can read only what they lack.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp_zip = out_dir / (BUNDLE_NAME + ".tmp")
+    members: List[Dict[str, Any]] = []
+
+    case_dirs = sorted([p for p in cases_dir.iterdir() if p.is_dir()], key=lambda x: x.name.lower()) if cases_dir.exists() else []
+    with zipfile.ZipFile(tmp_zip, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as z:
+        for cd in case_dirs:
+            if not (cd / "t1.nii.gz").exists() or not (cd / "gold.nii.gz").exists():
+                continue
+            for fn in BUNDLE_FILES:
+                src = cd / fn
+                if not src.exists():
+                    continue
+                arc = f"{cd.name}/{fn}"
+                z.write(src, arc)
+                members.append({"name": arc, "case": cd.name, "file": fn, "size": src.stat().st_size, "sha256": _sha256_file(src)})
+
+    with zipfile.ZipFile(tmp_zip, "r") as z, open(tmp_zip, "rb") as f:
+        infos = {i.filename: i for i in z.infolist()}
+        for m in members:
+            m["offset"] = _data_offset(f, infos[m["name"]].header_offset)
+
+    index = {
+        "format": 1,
+        "built": time.strftime("%Y-%m-%d_%H%M%S"),
+        "bundle": BUNDLE_NAME,
+        "bundle_size": tmp_zip.stat().st_size,
+        "cases": sorted({m["case"] for m in members}),
+        "members": members,
+    }
+    os.replace(tmp_zip, out_dir / BUNDLE_NAME)
+    tmp_idx = out_dir / (INDEX_NAME + ".tmp")
+    tmp_idx.write_text(json.dumps(index, indent=2), encoding="utf-8")
+    os.replace(tmp_idx, out_dir / INDEX_NAME)
+    return index
+
+
+def load_index(bundle_dir: Path) -> Optional[Dict[str, Any]]:
+    try:
+        p = bundle_dir / INDEX_NAME
+        if not p.exists() or not (bundle_dir / BUNDLE_NAME).exists():
+            return None
+        d = json.loads(p.read_text(encoding="utf-8"))
+        return d if isinstance(d, dict) and isinstance(d.get("members"), list) else None
+    except Exception:
+        return None
+
+
+def extract_missing(
+    bundle_dir: Optional[Path],
+    index: Dict[str, Any],
+    dest_root: Path,
+    want: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    read_at: Optional[Callable[[int, int], bytes]] = None,
+) -> List[str]:
+    """Extract members whose destination file is absent (or rejected by `want`).
+
+    The bundle is opened once and read front to back in offset order, seeking
+    over members already present locally. Each member is written to a temp
+    file, checked against its SHA-256 and moved into place. Returns the list of
+    case folder names that received at least one file. With `read_at(offset, n)`
+    (e.g. HTTP range reads) the bundle is read through it instead of from disk.
+    """
+    todo = []
+    for m in index.get("members") or []:
+        dest = dest_root / str(m.get("case")) / str(m.get("file"))
+        need = want(m) if want else not dest.exists()
+        if need:
+            todo.append((int(m.get("offset", 0)), m, dest))
+    if not todo:
+        return []
+    todo.sort(key=lambda x: x[0])
+
+    touched: List[str] = []
+    f = open(bundle_dir / BUNDLE_NAME, "rb", buffering=_CHUNK) if read_at is None else None
+    try:
+        for off, m, dest in todo:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp = tmp_sibling(dest)
+            h = hashlib.sha256()
+            left = int(m.get("size", 0))
+            pos = off
+            if f is not None:
+                f.seek(off)
+            with open(tmp, "wb") as out:
+                while left > 0:
+                    n = min(_REMOTE_CHUNK if f is None else _CHUNK, left)
+                    chunk = f.read(n) if f is not None else read_at(pos, n)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    out.write(chunk)
+                    left -= len(chunk)
+                    pos += len(chunk)
+            if left or h.hexdigest() != str(m.get("sha256") or ""):
+                tmp.unlink(missing_ok=True)
+                continue
+            if dest.exists():
+                store.unlink(dest)  # may be a read-only hardlink to a blob (Windows cannot replace it)
+            os.replace(tmp, dest)
+            if m.get("case") not in touched:
+                touched.append(str(m.get("case")))
+    finally:
+        if f is not None:
+            f.close()
+    return touched
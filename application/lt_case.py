@@ -1,9 +1,10 @@
 from __future__ import annotations
-import json, os, shutil
+import json, os, shutil, threading
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 import lt_core as core
+import lt_perf as perf
 
 @dataclass
 class CaseRow:
@@ -14,6 +15,7 @@ class CaseRow:
     gold: Path
     student: Path
     meta: Dict[str, Any]
+    evicted: bool = False  # volumes dropped by the workspace budget; re-fetched on demand
 
 def set_readonly(p: Path) -> None:
     try:
@@ -25,6 +27,10 @@ def set_readonly(p: Path) -> None:
 def write_case(case_dir: Path, case_id: str, extra: Dict[str, Any]) -> None:
     meta = {"case_id": case_id, **(extra or {})}
     (case_dir / "case.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    index_update(case_dir)
+
+def _source(case_dir: Path) -> str:
+    return "WORK" if str(case_dir).startswith(str(core.WORKSPACE)) else "LOCAL"
 
 def load_case(case_dir: Path) -> Optional[CaseRow]:
     try:
@@ -36,20 +42,110 @@ def load_case(case_dir: Path) -> Optional[CaseRow]:
         t1 = case_dir / "t1.nii.gz"
         gold = case_dir / "gold.nii.gz"
         student = case_dir / "student.nii.gz"
-        if not t1.exists() or not gold.exists():
+        source = _source(case_dir)
+        evicted = source == "WORK" and (case_dir / ".evicted").exists()
+        if not evicted and (not t1.exists() or not gold.exists()):
             return None
-        source = "WORK" if str(case_dir).startswith(str(core.WORKSPACE)) else "LOCAL"
-        return CaseRow(cid, source, case_dir, t1, gold, student, meta if isinstance(meta, dict) else {})
+        return CaseRow(cid, source, case_dir, t1, gold, student, meta if isinstance(meta, dict) else {}, evicted)
     except Exception:
         return None
 
+# =========================
+# PERSISTENT INDEX
+# =========================
+# JSON snapshot of parsed case folders, invalidated per directory by st_mtime_ns:
+# adding/removing case folders bumps the base dir mtime, and adding/removing
+# t1/gold/student/.evicted bumps the case dir mtime. In-place rewrites of
+# case.json go through write_case -> index_update.
+INDEX_PATH = core.USER_DATA / "case_index.json"
+_INDEX_VERSION = 1
+_index: Optional[Dict[str, Any]] = None
+_index_lock = threading.RLock()
+
+def _index_load() -> Dict[str, Any]:
+    global _index
+    if _index is None:
+        try:
+            d = json.loads(INDEX_PATH.read_text(encoding="utf-8")) if INDEX_PATH.exists() else {}
+        except Exception:
+            d = {}
+        if not isinstance(d, dict) or d.get("version") != _INDEX_VERSION:
+            d = {"version": _INDEX_VERSION, "bases": {}, "cases": {}}
+        _index = d
+    return _index
+
+def _index_save() -> None:
+    try:
+        INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = INDEX_PATH.with_name(INDEX_PATH.name + ".tmp")
+        tmp.write_text(json.dumps(_index_load(), separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, INDEX_PATH)
+    except Exception:
+        pass
+
+def _entry(case_dir: Path, mtime_ns: int) -> Dict[str, Any]:
+    c = load_case(case_dir)
+    if not c:
+        return {"mtime_ns": mtime_ns, "ok": False}
+    return {"mtime_ns": mtime_ns, "ok": True, "case_id": c.case_id, "meta": c.meta, "evicted": c.evicted}
+
+def _row(case_dir: Path, e: Dict[str, Any]) -> CaseRow:
+    return CaseRow(
+        str(e.get("case_id") or case_dir.name), _source(case_dir), case_dir,
+        case_dir / "t1.nii.gz", case_dir / "gold.nii.gz", case_dir / "student.nii.gz",
+        e.get("meta") if isinstance(e.get("meta"), dict) else {}, bool(e.get("evicted")),
+    )
+
+def index_update(case_dir: Path) -> None:
+    """Re-read one case folder into the index (import, sync, eviction, re-fetch)."""
+    with _index_lock:
+        idx = _index_load()
+        try:
+            idx["cases"][str(case_dir)] = _entry(case_dir, case_dir.stat().st_mtime_ns)
+        except Exception:
+            idx["cases"].pop(str(case_dir), None)
+        _index_save()
+
+def index_drop(case_dir: Path) -> None:
+    with _index_lock:
+        if _index_load()["cases"].pop(str(case_dir), None) is not None:
+            _index_save()
+
+@perf.timed("list_cases")
 def list_cases() -> List[CaseRow]:
     out: List[CaseRow] = []
-    for base in (core.WORKSPACE, core.LOCAL_CASES):
-        if not base.exists():
-            continue
-        for d in sorted([p for p in base.iterdir() if p.is_dir()], key=lambda x: x.name.lower()):
-            c = load_case(d)
-            if c:
-                out.append(c)
+    with _index_lock:
+        idx = _index_load()
+        dirty = False
+        for base in (core.WORKSPACE, core.LOCAL_CASES):
+            try:
+                bst = base.stat()
+            except Exception:
+                continue
+            bkey = str(base)
+            bent = idx["bases"].get(bkey)
+            if not bent or bent.get("mtime_ns") != bst.st_mtime_ns:
+                names = sorted([p.name for p in base.iterdir() if p.is_dir()], key=lambda x: x.lower())
+                keep = {str(base / n) for n in names}
+                for k in [k for k in idx["cases"] if str(Path(k).parent) == bkey and k not in keep]:
+                    del idx["cases"][k]
+                idx["bases"][bkey] = {"mtime_ns": bst.st_mtime_ns, "dirs": names}
+                dirty = True
+            else:
+                names = list(bent.get("dirs") or [])
+            for name in names:
+                d = base / name
+                try:
+                    mt = d.stat().st_mtime_ns
+                except Exception:
+                    continue
+                e = idx["cases"].get(str(d))
+                if not e or e.get("mtime_ns") != mt:
+                    e = _entry(d, mt)
+                    idx["cases"][str(d)] = e
+                    dirty = True
+                if e.get("ok"):
+                    out.append(_row(d, e))
+        if dirty:
+            _index_save()
     return out
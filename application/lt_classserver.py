@@ -0,0 +1,236 @@
+# lt_classserver.py — optional self-hosted classroom server (stdlib, threaded) over an LTTrainer folder
+#
+#   python lt_classserver.py --root /srv/LTTrainer --port 8765
+#   students then join with  http://<host>:8765  instead of a mounted share path
+#
+# Serves class manifests, case files and bundles (ETag / If-None-Match, single byte ranges)
+# and accepts batched attempt uploads (its only write route). Like the SMB share it trusts the class code and the
+# user name; run it on the campus network or behind a VPN / reverse proxy with TLS.
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+import lt_core as core
+import lt_share as share
+from lt_utils import norm_code
+
+DEFAULT_PORT = 8765
+MAX_BODY = 256 * 1024 * 1024
+_CHUNK = 1024 * 1024
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_HIDDEN = ("config",)  # top-level folders never served (teacher PIN)
+
+
+def _etag(st: os.stat_result) -> str:
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "LTClassServer/1"
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out in separate writes; avoid the delayed-ACK stall
+    timeout = 120  # drop idle keep-alive connections (clients reconnect transparently)
+
+    @property
+    def root(self) -> Path:
+        return self.server.root  # type: ignore[attr-defined]
+
+    def log_message(self, fmt, *args):  # quiet unless --verbose
+        if getattr(self.server, "verbose", False):
+            super().log_message(fmt, *args)
+
+    # ---- helpers ----
+    def _route(self) -> Tuple[str, str]:
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        parts = path.strip("/").split("/", 2)
+        if len(parts) < 2 or parts[0] != "v1":
+            return "", ""
+        return parts[1], parts[2] if len(parts) > 2 else ""
+
+    def _resolve(self, rel: str) -> Optional[Path]:
+        parts = [p for p in rel.split("/") if p]
+        if any(p in (".", "..") or "\\" in p or ":" in p for p in parts):
+            return None
+        if parts and parts[0].lower() in _HIDDEN:
+            return None
+        p = self.root.joinpath(*parts)
+        return p
+
+    def _send(self, status: int, body: bytes = b"", ctype: str = "application/json", headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, obj: Any, status: int = 200) -> None:
+        body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+        tag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if status == 200 and self.headers.get("If-None-Match") == tag:
+            self._send(304, headers={"ETag": tag})
+            return
+        self._send(status, body, headers={"ETag": tag, "Cache-Control": "no-cache"})
+
+    def _error(self, status: int, msg: str) -> None:
+        self._send(status, json.dumps({"error": msg}).encode("utf-8"))
+
+    def _body(self) -> Optional[bytes]:
+        n = int(self.headers.get("Content-Length") or 0)
+        if n > MAX_BODY:
+            self.close_connection = True  # unread body: the connection cannot be reused
+            self._error(413, "body too large")
+            return None
+        return self.rfile.read(n) if n else b""
+
+    # ---- GET / HEAD ----
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        kind, rel = self._route()
+        try:
+            if kind == "ping":
+                return self._json({"app": core.APP_NAME, "version": core.APP_VERSION})
+            if kind == "classes":
+                code, _, what = rel.partition("/")
+                if what != "manifest":
+                    return self._error(404, "unknown")
+                m = share.local_manifest(self.root, norm_code(code))
+                return self._json(m) if m is not None else self._error(404, "no such class")
+            p = self._resolve(rel)
+            if p is None:
+                return self._error(403, "forbidden")
+            if kind == "stat":
+                st = share.backend(self.root).stat(rel)
+                return self._json(st) if st is not None else self._error(404, "not found")
+            if kind == "list":
+                return self._json(share.backend(self.root).list(rel)) if p.is_dir() else self._error(404, "not a folder")
+            if kind == "files":
+                return self._file(p)
+            self._error(404, "unknown")
+        except Exception as e:
+            self._error(500, str(e))
+
+    def _file(self, p: Path) -> None:
+        try:
+            st = p.stat()
+        except Exception:
+            return self._error(404, "not found")
+        if not p.is_file():
+            return self._error(404, "not a file")
+        tag = _etag(st)
+        if self.headers.get("If-None-Match") == tag:
+            return self._send(304, headers={"ETag": tag})
+        size = st.st_size
+        start, end = 0, size - 1
+        status = 200
+        rng = self.headers.get("Range")
+        if rng and self.headers.get("If-Range", tag) == tag:
+            m = _RANGE.match(rng.strip())
+            if not m or (not m.group(1) and not m.group(2)):
+                return self._send(416, headers={"Content-Range": f"bytes */{size}"})
+            if m.group(1):
+                start = int(m.group(1))
+                end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+            else:  # suffix range: last N bytes
+                start = max(0, size - int(m.group(2)))
+            if start >= size or start > end:
+                return self._send(416, headers={"Content-Range": f"bytes */{size}"})
+            status = 206
+        n = end - start + 1 if size else 0
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(n))
+        self.send_header("ETag", tag)
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if self.command == "HEAD" or not n:
+            return
+        with open(p, "rb") as f:
+            f.seek(start)
+            left = n
+            while left > 0:
+                chunk = f.read(min(_CHUNK, left))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                left -= len(chunk)
+
+    # ---- writes ----
+    def do_POST(self):
+        kind, rel = self._route()
+        data = self._body()
+        if data is None:
+            return
+        try:
+            if kind == "classes":
+                parts = rel.split("/")
+                if len(parts) != 3 or parts[1] != "attempts":
+                    return self._error(404, "unknown")
+                code, user = norm_code(parts[0]), parts[2]
+                if not share.class_exists(self.root, code):
+                    return self._error(404, "no such class")
+                req = json.loads(data.decode("utf-8"))
+                masks = {k: base64.b64decode(v) for k, v in (req.get("masks") or {}).items()}
+                attempts = [a for a in (req.get("attempts") or []) if isinstance(a, dict)]
+                with self.server.write_lock:  # type: ignore[attr-defined]
+                    n = share.store_attempts(self.root, code, user, attempts, masks)
+                return self._json({"written": n, "received": len(attempts)})
+            self._error(404, "unknown")
+        except ValueError as e:
+            self._error(400, str(e))
+        except Exception as e:
+            self._error(500, str(e))
+
+
+def make_server(root: Path, host: str = "0.0.0.0", port: int = DEFAULT_PORT, verbose: bool = False) -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer((host, port), Handler)
+    srv.daemon_threads = True
+    srv.root = share.resolve_share_root(Path(root))  # type: ignore[attr-defined]
+    srv.verbose = verbose  # type: ignore[attr-defined]
+    srv.write_lock = threading.Lock()  # type: ignore[attr-defined]
+    return srv
+
+
+def start_in_thread(root: Path, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve on a background thread (port 0 = any free port). Returns (server, base URL)."""
+    srv = make_server(root, host, port)
+    threading.Thread(target=srv.serve_forever, name="lt-classserver", daemon=True).start()
+    return srv, f"http://{srv.server_address[0]}:{srv.server_address[1]}"
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=f"{core.APP_NAME} classroom server")
+    ap.add_argument("--root", required=True, help="share folder (the LTTrainer folder or its parent)")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args(argv)
+    srv = make_server(Path(args.root), args.host, args.port, args.verbose)
+    print(f"Serving {srv.root} on http://{args.host}:{srv.server_address[1]}", flush=True)  # type: ignore[attr-defined]
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
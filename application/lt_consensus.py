@@ -0,0 +1,214 @@
+# lt_consensus.py — per-case "where do students draw" frequency and FP/FN heatmaps from archived masks
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import lt_analytics as analytics
+import lt_backend
+import lt_maskcodec as maskcodec
+import lt_share as share
+import lt_store as store
+
+HEATMAP_DIR = "heatmaps"
+STATE_NAME = "state.npz"
+OUTPUTS = {"freq": "frequency.nii.gz", "fp": "false_positive.nii.gz", "fn": "false_negative.nii.gz"}
+
+
+def heatmap_dir(root: Path, code: str, case_id: str) -> Path:
+    return share.class_dir(root, code) / HEATMAP_DIR / case_id
+
+
+def latest_submissions(attempts_root: Path, case_id: str) -> Dict[str, str]:
+    """user -> mask sha of that student's newest archived submission for the case."""
+    out: Dict[str, str] = {}
+    b, rel = lt_backend.locate(attempts_root)
+    for e in b.list(rel):
+        if not e.get("dir"):
+            continue
+        d = attempts_root / e["name"]
+        best = None
+        for a in analytics.read_user_attempts(d):
+            if str(a.get("case_id") or "") != case_id or not a.get("mask_sha256"):
+                continue
+            if best is None or str(a.get("timestamp") or "") >= str(best.get("timestamp") or ""):
+                best = a
+        if best is None:
+            continue
+        mb, mrel = lt_backend.locate(maskcodec.store_path(d / maskcodec.STORE_DIR, str(best["mask_sha256"])))
+        if mb.exists(mrel):
+            out[d.name] = str(best["mask_sha256"])
+    return out
+
+
+class _Acc:
+    """uint16 counts over a growing ROI (union of submission bboxes and the gold bbox).
+
+    Only `freq` (students drawing the voxel) and `tp` (… inside gold) are kept;
+    FP = freq - tp and FN = n * gold - tp are derived at write time.
+    """
+
+    def __init__(self, shape, lo, hi):
+        import numpy as np
+        self.shape = tuple(int(x) for x in shape)
+        self.lo = np.asarray(lo, dtype=np.int64)
+        self.hi = np.asarray(hi, dtype=np.int64)
+        dims = tuple(int(x) for x in (self.hi - self.lo))
+        self.freq = np.zeros(dims, dtype=np.uint16)
+        self.tp = np.zeros(dims, dtype=np.uint16)
+        self.members: Dict[str, str] = {}
+
+    def grow(self, lo, hi) -> None:
+        import numpy as np
+        nlo = np.minimum(self.lo, lo)
+        nhi = np.maximum(self.hi, hi)
+        if (nlo == self.lo).all() and (nhi == self.hi).all():
+            return
+        dims = tuple(int(x) for x in (nhi - nlo))
+        o = self.lo - nlo
+        sl = tuple(slice(int(o[i]), int(o[i] + self.freq.shape[i])) for i in range(3))
+        for name in ("freq", "tp"):
+            arr = np.zeros(dims, dtype=np.uint16)
+            arr[sl] = getattr(self, name)
+            setattr(self, name, arr)
+        self.lo, self.hi = nlo, nhi
+
+    def apply(self, data: bytes, gold, sign: int) -> None:
+        import numpy as np
+        h, crop = maskcodec.decode_crop(data)
+        if tuple(h["shape"]) != self.shape:
+            raise ValueError("Submission shape does not match gold")
+        if not crop.size:
+            return
+        lo = np.array([b[0] for b in h["bbox"]])
+        hi = np.array([b[1] for b in h["bbox"]])
+        self.grow(lo, hi)
+        reg = tuple(slice(int(lo[i] - self.lo[i]), int(hi[i] - self.lo[i])) for i in range(3))
+        g = gold[tuple(slice(int(lo[i]), int(hi[i])) for i in range(3))]
+        c = crop.view(np.uint8)
+        if sign > 0:
+            self.freq[reg] += c
+            self.tp[reg] += c & g.view(np.uint8)
+        else:
+            self.freq[reg] -= c
+            self.tp[reg] -= c & g.view(np.uint8)
+
+    def roi(self):
+        return tuple(slice(int(self.lo[i]), int(self.hi[i])) for i in range(3))
+
+
+def _gold_bbox(gold):
+    import numpy as np
+    nz = np.argwhere(gold)
+    if not nz.size:
+        return np.zeros(3, dtype=np.int64), np.zeros(3, dtype=np.int64)
+    return nz.min(axis=0), nz.max(axis=0) + 1
+
+
+def _load_state(out: Path) -> Optional[Dict[str, Any]]:
+    import numpy as np
+    try:
+        p = out / STATE_NAME
+        if p.exists():
+            with np.load(p, allow_pickle=False) as z:
+                return {k: z[k] for k in z.files}
+    except Exception:
+        pass
+    return None
+
+
+def _save_state(out: Path, acc: _Acc, gold_sha: str) -> None:
+    import numpy as np
+    tmp = out / f".{STATE_NAME}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp, freq=acc.freq, tp=acc.tp, lo=acc.lo, hi=acc.hi, shape=np.array(acc.shape),
+                        members=np.array(json.dumps(acc.members, sort_keys=True)), gold_sha=np.array(gold_sha))
+    os.replace(tmp, out / STATE_NAME)
+
+
+def _write_outputs(out: Path, acc: _Acc, gold, affine) -> None:
+    """Full-size uint16 volumes (one at a time) so they overlay the case T1 directly."""
+    import numpy as np
+    import nibabel as nib
+    roi = acc.roi()
+    n = len(acc.members)
+    g = gold[roi].astype(np.uint16)
+    for key, name in OUTPUTS.items():
+        if key == "freq":
+            crop = acc.freq
+        elif key == "fp":
+            crop = acc.freq - acc.tp
+        else:
+            crop = g * np.uint16(n) - acc.tp
+        full = np.zeros(acc.shape, dtype=np.uint16)
+        full[roi] = crop
+        img = nib.Nifti1Image(full, affine)
+        img.set_data_dtype(np.uint16)
+        tmp = out / f".{name}.{os.getpid()}.tmp.nii.gz"
+        nib.save(img, str(tmp))
+        os.replace(tmp, out / name)
+        del full
+
+
+def build(root: Path, code: str, case_id: str, force: bool = False) -> Dict[str, Any]:
+    """Bring a case's heatmaps up to date with the newest submission of each student.
+
+    Masks are streamed one at a time into the ROI accumulator, so memory does
+    not grow with cohort size. A student's resubmission subtracts their old
+    mask and adds the new one; a changed gold mask forces a full rebuild.
+    """
+    import numpy as np
+    from lt_eval import load_gold_mask
+
+    gold_path = share.class_dir(root, code) / "cases" / case_id / "gold.nii.gz"
+    gold, affine, _header = load_gold_mask(gold_path)
+    gold_sha = store.sha256_file(gold_path)
+    out = heatmap_dir(root, code, case_id)
+    out.mkdir(parents=True, exist_ok=True)
+    attempts = share.attempts_root(root, code)
+
+    acc: Optional[_Acc] = None
+    st = None if force else _load_state(out)
+    if st is not None and str(st["gold_sha"]) == gold_sha and tuple(int(x) for x in st["shape"]) == tuple(gold.shape):
+        acc = _Acc(gold.shape, st["lo"], st["hi"])
+        acc.freq, acc.tp = st["freq"].astype(np.uint16), st["tp"].astype(np.uint16)
+        acc.members = json.loads(str(st["members"]))
+
+    subs = latest_submissions(attempts, case_id)
+    removed = added = 0
+    if acc is not None:
+        for user, sha in list(acc.members.items()):
+            if subs.get(user) == sha:
+                continue
+            data = maskcodec.load(attempts / user / maskcodec.STORE_DIR, sha)
+            if data is None:
+                acc = None  # can't subtract a mask that is gone: start over
+                break
+            acc.apply(data, gold, -1)
+            del acc.members[user]
+            removed += 1
+    fresh = acc is None
+    if fresh:
+        acc = _Acc(gold.shape, *_gold_bbox(gold))
+        removed = 0
+
+    for user, sha in sorted(subs.items()):
+        if acc.members.get(user) == sha:
+            continue
+        data = maskcodec.load(attempts / user / maskcodec.STORE_DIR, sha)
+        if data is None:
+            continue
+        try:
+            acc.apply(data, gold, +1)
+        except Exception:
+            continue
+        acc.members[user] = sha
+        added += 1
+
+    outputs_ok = all((out / name).exists() for name in OUTPUTS.values())
+    if fresh or added or removed or not outputs_ok:
+        _save_state(out, acc, gold_sha)
+        _write_outputs(out, acc, gold, affine)
+    return {"n": len(acc.members), "added": added, "removed": removed,
+            "roi": [[int(a), int(b)] for a, b in zip(acc.lo, acc.hi)], "dir": out}
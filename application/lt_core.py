@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import atexit
 import json
+import os
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 # =========================
 # APP IDENTITY
@@ -52,6 +55,7 @@ WORKSPACE = USER_DATA / "cases_workspace"
 LOCAL_MATERIALS = USER_DATA / "materials_local"
 LOCAL_PROGRESS = USER_DATA / "progress_local" / "attempts"
 UPDATES_DIR = USER_DATA / "updates"
+BLOB_STORE = USER_DATA / "blobs"  # content-addressed (sha256) NIfTI store, hardlinked into cases
 
 # =========================
 # DEFAULTS
@@ -63,35 +67,143 @@ DEFAULT_TOLERANCE = 150
 SMB_URL = "smb://sv-nas1.rcp.epfl.ch/Hummel-Lab"
 
 def ensure_dirs() -> None:
-    for p in (USER_DATA, LOCAL_CASES, WORKSPACE, LOCAL_MATERIALS, LOCAL_PROGRESS, UPDATES_DIR):
+    for p in (USER_DATA, LOCAL_CASES, WORKSPACE, LOCAL_MATERIALS, LOCAL_PROGRESS, UPDATES_DIR, BLOB_STORE):
         p.mkdir(parents=True, exist_ok=True)
 
 # =========================
 # CONFIG
 # =========================
+class _Config:
+    """config.json cached in memory.
+
+    The file is re-parsed only when its (mtime_ns, size) changes, so another
+    process's edits are still picked up. `set` updates memory immediately and
+    schedules one debounced write; pending keys are merged over the on-disk
+    state and written via temp file + os.replace.
+    """
+
+    DEBOUNCE_S = 0.3
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._data: Dict[str, Any] = {}
+        self._sig: Optional[Tuple[int, int]] = None
+        self._loaded = False
+        self._pending: Dict[str, Any] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+            return int(st.st_mtime_ns), int(st.st_size)
+        except OSError:
+            return None
+
+    def _read_disk(self) -> Dict[str, Any]:
+        try:
+            d = json.loads(self.path.read_text(encoding="utf-8"))
+            return d if isinstance(d, dict) else {}
+        except Exception:
+            return {}
+
+    def _fresh(self) -> Dict[str, Any]:
+        sig = self._stat()
+        if not self._loaded or sig != self._sig:
+            self._data = {**(self._read_disk() if sig else {}), **self._pending}
+            self._sig = sig
+            self._loaded = True
+        return self._data
+
+    def get(self, k: str, default=None):
+        with self._lock:
+            return self._fresh().get(k, default)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._fresh())
+
+    def set(self, k: str, v) -> None:
+        with self._lock:
+            self._fresh()[k] = v
+            self._pending[k] = v
+            if self._timer is None:
+                self._timer = threading.Timer(self.DEBOUNCE_S, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def replace(self, d: Dict[str, Any]) -> None:
+        """Overwrite the whole file now (cfg_save semantics)."""
+        with self._lock:
+            self._pending = {}
+            self._write(dict(d))
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            merged = {**(self._read_disk() if self._stat() else {}), **self._pending}
+            self._pending = {}
+            self._write(merged)
+
+    def _write(self, d: Dict[str, Any]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(d, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._data = d
+            self._sig = self._stat()
+            self._loaded = True
+        except Exception:
+            pass
+
+
+_CFG = _Config(CFG_PATH)
+atexit.register(_CFG.flush)
+
 def cfg_load() -> Dict[str, Any]:
+    return _CFG.snapshot()
+
+def cfg_save(d: Dict[str, Any]) -> None:
+    _CFG.replace(d)
+
+def cfg_get(k: str, default=None):
+    return _CFG.get(k, default)
+
+def cfg_set(k: str, v) -> None:
+    _CFG.set(k, v)
+
+def cfg_flush() -> None:
+    """Write pending cfg_set changes now (normally debounced)."""
+    _CFG.flush()
+
+def cfg_int(k: str, default: int = 0) -> int:
     try:
-        if CFG_PATH.exists():
-            d = json.loads(CFG_PATH.read_text(encoding="utf-8"))
-            return d if isinstance(d, dict) else {}
+        v = _CFG.get(k, default)
+        return int(v) if v not in (None, "") else int(default)
     except Exception:
-        pass
-    return {}
+        return int(default)
 
-def cfg_save(d: Dict[str, Any]) -> None:
+def cfg_float(k: str, default: float = 0.0) -> float:
     try:
-        CFG_PATH.parent.mkdir(parents=True, exist_ok=True)
-        CFG_PATH.write_text(json.dumps(d, indent=2), encoding="utf-8")
+        v = _CFG.get(k, default)
+        return float(v) if v not in (None, "") else float(default)
     except Exception:
-        pass
+        return float(default)
 
-def cfg_get(k: str, default=None):
-    return cfg_load().get(k, default)
+def cfg_bool(k: str, default: bool = False) -> bool:
+    v = _CFG.get(k, default)
+    if isinstance(v, str):
+        return v.strip().lower() in ("1", "true", "yes", "on")
+    return bool(v)
 
-def cfg_set(k: str, v) -> None:
-    d = cfg_load()
-    d[k] = v
-    cfg_save(d)
+def cfg_str(k: str, default: str = "") -> str:
+    v = _CFG.get(k, default)
+    return str(v) if v is not None else str(default)
 
 # =========================
 # LOCKED POLICY (classroom)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 import os, sys, subprocess
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import lt_core as core
 from lt_utils import open_default
 
@@ -13,7 +13,7 @@ def itksnap_exec() -> Optional[Path]:
         ]:
             if p.exists():
                 return p
-    user = core.cfg_get("itksnap_path", "")
+    user = core.cfg_str("itksnap_path")
     if user:
         p = Path(str(user)).expanduser()
         if p.exists():
@@ -21,7 +21,7 @@ def itksnap_exec() -> Optional[Path]:
     return None
 
 def launch(t1: Path, seg: Path) -> None:
-    editor = core.cfg_get("editor", "itksnap")
+    editor = core.cfg_str("editor", "itksnap")
     if editor == "itksnap":
         exe = itksnap_exec()
         if exe:
@@ -32,3 +32,20 @@ def launch(t1: Path, seg: Path) -> None:
                 pass
     open_default(t1)
     open_default(seg)
+
+def view_overlays(t1: Path, seg: Optional[Path], overlays: List[Path]) -> None:
+    """Open T1 (+ optional segmentation) with extra overlay images in ITK-SNAP."""
+    exe = itksnap_exec()
+    if exe:
+        args = [str(exe), "-g", str(t1)]
+        if seg is not None:
+            args += ["-s", str(seg)]
+        if overlays:
+            args += ["-o", *[str(p) for p in overlays]]
+        try:
+            subprocess.Popen(args)
+            return
+        except Exception:
+            pass
+    for p in overlays:
+        open_default(p)
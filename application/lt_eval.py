@@ -1,13 +1,19 @@
 from __future__ import annotations
 
 import csv
+import io
 import json
-import os
 import platform
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict, Tuple, Optional
 
+import lt_attemptlog as attemptlog
+import lt_backend
 import lt_core as core
+import lt_online as online
+import lt_perf as perf
 import lt_utils as u
 
 
@@ -43,97 +49,134 @@ def make_blank_student_mask(ref_t1: Path, out_mask: Path) -> Tuple[bool, str]:
         return False, f"Could not create blank mask: {e}"
 
 
-def evaluate_masks(gold: Path, student: Path) -> Tuple[bool, str, Dict[str, Any]]:
-    """Study-friendly binary mask evaluation.
+# Set while an evaluation runs; background work (prefetch) yields to it.
+EVAL_BUSY = threading.Event()
 
-    Returned metrics are deliberately *analysis-ready* (CSV/JSONL) for later papers.
-    """
-    try:
-        import numpy as np
-        import nibabel as nib
+# Decoded gold masks keyed by (path, mtime_ns, size); small LRU, shared with the prefetcher.
+_GOLD_CACHE: "OrderedDict[Tuple[str, int, int], Tuple[Any, Any, Any]]" = OrderedDict()
+_GOLD_CACHE_MAX = 4
+_GOLD_LOCK = threading.Lock()
 
-        gi = nib.load(str(gold))
-        si = nib.load(str(student))
 
-        g = gi.get_fdata()
-        s = si.get_fdata()
-        gb = (g > 0.5)
-        sb = (s > 0.5)
+def load_gold_mask(gold: Path):
+    """Return (bool mask, affine, header) for a gold NIfTI, decoding at most once per file version."""
+    import numpy as np
+    import nibabel as nib
 
-        tp = int((gb & sb).sum())
-        fp = int((~gb & sb).sum())
-        fn = int((gb & ~sb).sum())
-        total = int(gb.size)
-        tn = int(total - tp - fp - fn)
+    st = gold.stat()
+    key = (str(gold), int(st.st_mtime_ns), int(st.st_size))
+    with _GOLD_LOCK:
+        hit = _GOLD_CACHE.get(key)
+        if hit is not None:
+            _GOLD_CACHE.move_to_end(key)
+            return hit
+    gi = nib.load(str(gold))
+    entry = (np.asanyarray(gi.dataobj) > 0.5, gi.affine, gi.header)
+    with _GOLD_LOCK:
+        _GOLD_CACHE[key] = entry
+        while len(_GOLD_CACHE) > _GOLD_CACHE_MAX:
+            _GOLD_CACHE.popitem(last=False)
+    return entry
 
-        gvox = int(gb.sum())
-        svox = int(sb.sum())
 
-        denom_dice = (2 * tp + fp + fn)
-        dice = (2.0 * tp / denom_dice) if denom_dice > 0 else 1.0
+def mask_metrics(gb, sb, g_affine, g_header) -> Dict[str, Any]:
+    """Metrics for a boolean student mask `sb` against gold `gb` (same grid)."""
+    import numpy as np
+    import nibabel as nib
 
-        denom_j = (tp + fp + fn)
-        jaccard = (float(tp) / denom_j) if denom_j > 0 else 1.0
+    tp = int((gb & sb).sum())
+    fp = int((~gb & sb).sum())
+    fn = int((gb & ~sb).sum())
+    total = int(gb.size)
+    tn = int(total - tp - fp - fn)
 
-        precision = (float(tp) / (tp + fp)) if (tp + fp) > 0 else (1.0 if gvox == 0 else 0.0)
-        recall = (float(tp) / (tp + fn)) if (tp + fn) > 0 else 1.0
-        specificity = (float(tn) / (tn + fp)) if (tn + fp) > 0 else 1.0
-        accuracy = (float(tp + tn) / total) if total > 0 else 1.0
+    gvox = int(gb.sum())
+    svox = int(sb.sum())
 
-        mismatch = int((gb ^ sb).sum())
+    denom_dice = (2 * tp + fp + fn)
+    dice = (2.0 * tp / denom_dice) if denom_dice > 0 else 1.0
 
-        # voxel volume (mm^3) and lesion volumes (ml)
-        try:
-            zooms = gi.header.get_zooms()[:3]
-            vox_mm3 = float(zooms[0] * zooms[1] * zooms[2])
-        except Exception:
-            vox_mm3 = 1.0
-        gold_ml = float(gvox * vox_mm3 / 1000.0)
-        student_ml = float(svox * vox_mm3 / 1000.0)
-        vol_abs_err_ml = float(abs(student_ml - gold_ml))
-        vol_rel_err = float((student_ml - gold_ml) / gold_ml) if gold_ml > 0 else (0.0 if student_ml == 0 else 1.0)
-
-        # centroid distance (mm)
-        def _centroid_mm(mask: "np.ndarray", affine) -> Optional[Tuple[float, float, float]]:
-            if int(mask.sum()) == 0:
-                return None
-            pts = np.argwhere(mask)
-            c_vox = pts.mean(axis=0)
-            c_mm = nib.affines.apply_affine(affine, c_vox)
-            return float(c_mm[0]), float(c_mm[1]), float(c_mm[2])
-
-        c_g = _centroid_mm(gb, gi.affine)
-        c_s = _centroid_mm(sb, gi.affine)
-        centroid_dist_mm = None
-        if c_g and c_s:
-            dx = c_g[0] - c_s[0]
-            dy = c_g[1] - c_s[1]
-            dz = c_g[2] - c_s[2]
-            centroid_dist_mm = float((dx * dx + dy * dy + dz * dz) ** 0.5)
-
-        return True, "OK", {
-            "dice": float(dice),
-            "jaccard": float(jaccard),
-            "precision": float(precision),
-            "recall": float(recall),
-            "specificity": float(specificity),
-            "accuracy": float(accuracy),
-            "tp": int(tp),
-            "fp": int(fp),
-            "fn": int(fn),
-            "tn": int(tn),
-            "gold_voxels": int(gvox),
-            "student_voxels": int(svox),
-            "mismatch_voxels": int(mismatch),
-            "vox_mm3": float(vox_mm3),
-            "gold_ml": float(gold_ml),
-            "student_ml": float(student_ml),
-            "vol_abs_err_ml": float(vol_abs_err_ml),
-            "vol_rel_err": float(vol_rel_err),
-            "centroid_dist_mm": centroid_dist_mm,
-        }
+    denom_j = (tp + fp + fn)
+    jaccard = (float(tp) / denom_j) if denom_j > 0 else 1.0
+
+    precision = (float(tp) / (tp + fp)) if (tp + fp) > 0 else (1.0 if gvox == 0 else 0.0)
+    recall = (float(tp) / (tp + fn)) if (tp + fn) > 0 else 1.0
+    specificity = (float(tn) / (tn + fp)) if (tn + fp) > 0 else 1.0
+    accuracy = (float(tp + tn) / total) if total > 0 else 1.0
+
+    mismatch = int((gb ^ sb).sum())
+
+    # voxel volume (mm^3) and lesion volumes (ml)
+    try:
+        zooms = g_header.get_zooms()[:3]
+        vox_mm3 = float(zooms[0] * zooms[1] * zooms[2])
+    except Exception:
+        vox_mm3 = 1.0
+    gold_ml = float(gvox * vox_mm3 / 1000.0)
+    student_ml = float(svox * vox_mm3 / 1000.0)
+    vol_abs_err_ml = float(abs(student_ml - gold_ml))
+    vol_rel_err = float((student_ml - gold_ml) / gold_ml) if gold_ml > 0 else (0.0 if student_ml == 0 else 1.0)
+
+    # centroid distance (mm)
+    def _centroid_mm(mask: "np.ndarray", affine) -> Optional[Tuple[float, float, float]]:
+        if int(mask.sum()) == 0:
+            return None
+        pts = np.argwhere(mask)
+        c_vox = pts.mean(axis=0)
+        c_mm = nib.affines.apply_affine(affine, c_vox)
+        return float(c_mm[0]), float(c_mm[1]), float(c_mm[2])
+
+    c_g = _centroid_mm(gb, g_affine)
+    c_s = _centroid_mm(sb, g_affine)
+    centroid_dist_mm = None
+    if c_g and c_s:
+        dx = c_g[0] - c_s[0]
+        dy = c_g[1] - c_s[1]
+        dz = c_g[2] - c_s[2]
+        centroid_dist_mm = float((dx * dx + dy * dy + dz * dz) ** 0.5)
+
+    return {
+        "dice": float(dice),
+        "jaccard": float(jaccard),
+        "precision": float(precision),
+        "recall": float(recall),
+        "specificity": float(specificity),
+        "accuracy": float(accuracy),
+        "tp": int(tp),
+        "fp": int(fp),
+        "fn": int(fn),
+        "tn": int(tn),
+        "gold_voxels": int(gvox),
+        "student_voxels": int(svox),
+        "mismatch_voxels": int(mismatch),
+        "vox_mm3": float(vox_mm3),
+        "gold_ml": float(gold_ml),
+        "student_ml": float(student_ml),
+        "vol_abs_err_ml": float(vol_abs_err_ml),
+        "vol_rel_err": float(vol_rel_err),
+        "centroid_dist_mm": centroid_dist_mm,
+    }
+
+
+@perf.timed("evaluate_masks")
+def evaluate_masks(gold: Path, student: Path) -> Tuple[bool, str, Dict[str, Any]]:
+    """Study-friendly binary mask evaluation.
+
+    Returned metrics are deliberately *analysis-ready* (CSV/JSONL) for later papers.
+    """
+    EVAL_BUSY.set()
+    try:
+        import numpy as np
+        import nibabel as nib
+
+        gb, g_affine, g_header = load_gold_mask(gold)
+        si = nib.load(str(student))
+        sb = (np.asanyarray(si.dataobj) > 0.5)
+        return True, "OK", mask_metrics(gb, sb, g_affine, g_header)
     except Exception as e:
         return False, f"Evaluation requires nibabel+numpy. {e}", {}
+    finally:
+        EVAL_BUSY.clear()
 
 
 ATTEMPT_FIELDS = [
@@ -144,6 +187,8 @@ ATTEMPT_FIELDS = [
     "mode",
     "class_code",
     "case_id",
+    "gold_version",
+    "gold_sha256",
     "session",
     "min_voxels",
     "tolerance",
@@ -171,38 +216,64 @@ ATTEMPT_FIELDS = [
 ]
 
 
-def write_attempt(out_dir: Path, attempt: Dict[str, Any]) -> None:
-    """Write one attempt in 3 forms: JSON, JSONL, CSV."""
-    out_dir.mkdir(parents=True, exist_ok=True)
+ATTEMPTS_CSV = "attempts.csv"
+
+_WRITE_LOCK = threading.Lock()
+
+
+def attempts_csv(out_dir: Path) -> bytes:
+    """All logged attempts of a folder (every writer, de-duplicated, oldest first) as CSV."""
+    buf = io.StringIO(newline="")
+    w = csv.DictWriter(buf, fieldnames=ATTEMPT_FIELDS)
+    w.writeheader()
+    for a in attemptlog.read_records(out_dir):
+        w.writerow({k: a.get(k, "") for k in ATTEMPT_FIELDS})
+    return buf.getvalue().encode("utf-8")
+
+
+@perf.timed("write_attempt", root=lambda out_dir, *_a, **_k: perf.root_label(out_dir))
+def write_attempt(out_dir: Path, attempt: Dict[str, Any]) -> bool:
+    """Write one attempt: framed log record, JSON file, merged attempts.csv and the running summary.
+
+    The log record and summary go to this process's own files under log/ (see
+    lt_attemptlog), so concurrent writers never append to the same file. attempts.csv
+    is rewritten atomically from the merged log; if two machines race, the next write
+    brings it up to date. Re-writing an attempt whose `_rid` any writer of the folder
+    already logged is a no-op, also across restarts. Returns False if the log record could not be written.
+    """
+    b, base = lt_backend.locate(out_dir)  # the share's backend when out_dir is on a share
+    b.makedirs(base)
 
     attempt.setdefault("app_version", getattr(core, "APP_VERSION", ""))
     attempt.setdefault("platform", platform.platform())
+    attempt.setdefault("_rid", attemptlog.new_rid())
 
     ts = str(attempt.get("timestamp") or "")
-    rid = str(attempt.get("_rid") or os.urandom(3).hex())
+    rid = str(attempt["_rid"])
 
-    # 1) individual JSON (human readable)
-    try:
-        (out_dir / f"{ts}_{rid}.json").write_text(json.dumps(attempt, indent=2), encoding="utf-8")
-    except Exception:
-        pass
+    with _WRITE_LOCK:
+        # 1) framed record in this writer's segment (the source of truth for readers)
+        try:
+            if not attemptlog.append(out_dir, attempt):
+                return True
+        except Exception:
+            return False
 
-    # 2) JSONL (analysis-friendly)
-    try:
-        with (out_dir / "attempts.jsonl").open("a", encoding="utf-8") as f:
-            f.write(json.dumps(attempt, ensure_ascii=False) + "\n")
-    except Exception:
-        pass
+        # 2) individual JSON (human readable)
+        try:
+            b.write_atomic(lt_backend.join(base, f"{ts}_{rid}.json"), json.dumps(attempt, indent=2).encode("utf-8"))
+        except Exception:
+            pass
 
-    # 3) CSV (analysis-friendly)
-    csv_path = out_dir / "attempts.csv"
-    row = {k: attempt.get(k, "") for k in ATTEMPT_FIELDS}
-    try:
-        write_header = not csv_path.exists()
-        with csv_path.open("a", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=ATTEMPT_FIELDS)
-            if write_header:
-                w.writeheader()
-            w.writerow(row)
-    except Exception:
-        pass
+        # 3) merged CSV (analysis-friendly), regenerated from the log so every writer's rows are in one file
+        try:
+            b.write_atomic(lt_backend.join(base, ATTEMPTS_CSV), attempts_csv(out_dir))
+        except Exception:
+            pass
+
+        # 4) running aggregates (Welford) so dashboards never need to rescan the logs
+        try:
+            online.update_summary(out_dir, attempt)
+        except Exception:
+            pass
+    return True
@@ -0,0 +1,123 @@
+# lt_maskcodec.py — compact binary mask encoding (bbox crop + packed bits + zlib), content-addressed
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import lt_backend
+
+MAGIC = b"LMK1"
+EXT = ".lmk"
+STORE_DIR = "masks"  # per-user store, next to the attempt logs
+
+
+def encode(mask, affine, zooms=None) -> bytes:
+    """Encode a 3D binary mask: JSON header (shape, affine, bbox) + zlib(packbits(crop)).
+
+    Deterministic for identical masks, so the SHA-256 of the bytes dedups
+    identical resubmissions.
+    """
+    import numpy as np
+
+    m = np.asarray(mask).astype(bool)
+    shape = [int(x) for x in m.shape[:3]]
+    m = m.reshape(shape)
+    nz = np.argwhere(m)
+    if nz.size:
+        lo = nz.min(axis=0)
+        hi = nz.max(axis=0) + 1
+    else:
+        lo = np.zeros(3, dtype=np.int64)
+        hi = np.zeros(3, dtype=np.int64)
+    crop = m[lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]]
+    header = {
+        "v": 1,
+        "shape": shape,
+        "affine": [[round(float(x), 6) for x in row] for row in np.asarray(affine)[:4, :4]],
+        "zooms": [round(float(z), 6) for z in (zooms or [])][:3],
+        "bbox": [[int(lo[i]), int(hi[i])] for i in range(3)],
+        "voxels": int(nz.shape[0]),
+    }
+    hb = json.dumps(header, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    payload = zlib.compress(np.packbits(crop.ravel(order="C")).tobytes(), 9)
+    return MAGIC + struct.pack("<I", len(hb)) + hb + payload
+
+
+def read_header(data: bytes) -> Dict[str, Any]:
+    if data[:4] != MAGIC:
+        raise ValueError("Not an encoded mask")
+    (n,) = struct.unpack("<I", data[4:8])
+    return json.loads(data[8:8 + n].decode("utf-8"))
+
+
+def read_header_file(path: Path) -> Dict[str, Any]:
+    """Header only (bbox/shape) without reading the payload."""
+    with open(path, "rb") as f:
+        head = f.read(8)
+        if head[:4] != MAGIC:
+            raise ValueError("Not an encoded mask")
+        (n,) = struct.unpack("<I", head[4:8])
+        return json.loads(f.read(n).decode("utf-8"))
+
+
+def decode_crop(data: bytes):
+    """Return (header, bool crop array) — the crop covers header['bbox']."""
+    import numpy as np
+
+    h = read_header(data)
+    (n,) = struct.unpack("<I", data[4:8])
+    dims = [b[1] - b[0] for b in h["bbox"]]
+    count = int(dims[0] * dims[1] * dims[2])
+    bits = np.frombuffer(zlib.decompress(data[8 + n:]), dtype=np.uint8)
+    crop = np.unpackbits(bits, count=count).astype(bool).reshape(dims) if count else np.zeros(dims, dtype=bool)
+    return h, crop
+
+
+def decode(data: bytes):
+    """Return (header, full-size bool mask)."""
+    import numpy as np
+
+    h, crop = decode_crop(data)
+    full = np.zeros(h["shape"], dtype=bool)
+    (x0, x1), (y0, y1), (z0, z1) = h["bbox"]
+    full[x0:x1, y0:y1, z0:z1] = crop
+    return h, full
+
+
+def encode_nifti(path: Path) -> bytes:
+    import numpy as np
+    import nibabel as nib
+
+    img = nib.load(str(path))
+    m = np.asanyarray(img.dataobj) > 0.5
+    return encode(m, img.affine, img.header.get_zooms()[:3])
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def store_path(store_dir: Path, sha: str) -> Path:
+    return store_dir / sha[:2] / f"{sha}{EXT}"
+
+
+def archive(store_dir: Path, data: bytes) -> Tuple[str, bool]:
+    """Write `data` into a content-addressed store. Returns (sha256, newly_written)."""
+    sha = sha256(data)
+    b, rel = lt_backend.locate(store_path(store_dir, sha))
+    if b.exists(rel):
+        return sha, False
+    b.write_atomic(rel, data)
+    return sha, True
+
+
+def load(store_dir: Path, sha: str) -> Optional[bytes]:
+    try:
+        b, rel = lt_backend.locate(store_path(store_dir, sha))
+        return b.read(rel)
+    except Exception:
+        return None
@@ -0,0 +1,222 @@
+# lt_online.py — streaming (Welford) attempt aggregates persisted next to the attempt logs
+from __future__ import annotations
+
+import csv
+import json
+import math
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import lt_attemptlog as attemptlog
+import lt_backend
+
+SUMMARY_NAME = "summary.json"
+WRITER_SUMMARY_EXT = ".summary.json"  # per-writer summaries next to the log segments
+_VERSION = 1
+
+_legacy_lock = threading.Lock()
+# user dir -> (parsed legacy records it was built from, summary)
+_legacy_cache: Dict[str, Tuple[List[Dict[str, Any]], Dict[str, Any]]] = {}
+
+
+def acc_new() -> Dict[str, float]:
+    return {"n": 0, "mean": 0.0, "m2": 0.0}
+
+
+def acc_add(a: Dict[str, float], x: float) -> None:
+    """Welford update: one pass, numerically stable mean/variance."""
+    n = int(a.get("n", 0)) + 1
+    d = x - float(a.get("mean", 0.0))
+    mean = float(a.get("mean", 0.0)) + d / n
+    a["m2"] = float(a.get("m2", 0.0)) + d * (x - mean)
+    a["mean"] = mean
+    a["n"] = n
+
+
+def acc_merge(a: Dict[str, float], b: Dict[str, float]) -> Dict[str, float]:
+    """Combine two accumulators (Chan et al. parallel variance)."""
+    na, nb = int(a.get("n", 0)), int(b.get("n", 0))
+    if nb == 0:
+        return dict(a)
+    if na == 0:
+        return dict(b)
+    n = na + nb
+    d = float(b["mean"]) - float(a["mean"])
+    return {
+        "n": n,
+        "mean": float(a["mean"]) + d * nb / n,
+        "m2": float(a["m2"]) + float(b["m2"]) + d * d * na * nb / n,
+    }
+
+
+def acc_sd(a: Dict[str, float]) -> float:
+    n = int(a.get("n", 0))
+    return math.sqrt(float(a.get("m2", 0.0)) / (n - 1)) if n > 1 else 0.0
+
+
+def _empty() -> Dict[str, Any]:
+    return {"version": _VERSION, "n": 0, "passed": 0, "dice": acc_new(), "cases": {}}
+
+
+def _num(x: Any) -> Optional[float]:
+    try:
+        v = float(x)
+        return v if math.isfinite(v) else None
+    except Exception:
+        return None
+
+
+def add_attempt(summary: Dict[str, Any], attempt: Dict[str, Any]) -> None:
+    dice = _num(attempt.get("dice"))
+    passed = bool(attempt.get("passed"))
+    summary["n"] = int(summary.get("n", 0)) + 1
+    summary["passed"] = int(summary.get("passed", 0)) + int(passed)
+    if dice is not None:
+        acc_add(summary.setdefault("dice", acc_new()), dice)
+    cid = str(attempt.get("case_id") or "")
+    if not cid:
+        return
+    c = summary.setdefault("cases", {}).setdefault(cid, {"n": 0, "passed": 0, "dice": acc_new(), "mismatch": acc_new(), "best": None})
+    c["n"] = int(c.get("n", 0)) + 1
+    c["passed"] = int(c.get("passed", 0)) + int(passed)
+    if dice is not None:
+        acc_add(c["dice"], dice)
+        c["best"] = dice if c.get("best") is None else max(float(c["best"]), dice)
+    mm = _num(attempt.get("mismatch_voxels"))
+    if mm is not None:
+        acc_add(c["mismatch"], mm)
+
+
+def _load_file(p: Path) -> Optional[Dict[str, Any]]:
+    b, rel = lt_backend.locate(p)
+    d = b.read_json(rel)
+    return d if isinstance(d, dict) and d.get("version") == _VERSION else None
+
+
+def merge_into(total: Dict[str, Any], s: Dict[str, Any]) -> None:
+    total["n"] = int(total.get("n", 0)) + int(s.get("n", 0))
+    total["passed"] = int(total.get("passed", 0)) + int(s.get("passed", 0))
+    total["dice"] = acc_merge(total.get("dice") or acc_new(), s.get("dice") or acc_new())
+    for cid, c in (s.get("cases") or {}).items():
+        t = total.setdefault("cases", {}).setdefault(cid, {"n": 0, "passed": 0, "dice": acc_new(), "mismatch": acc_new(), "best": None})
+        t["n"] += int(c.get("n", 0))
+        t["passed"] += int(c.get("passed", 0))
+        t["dice"] = acc_merge(t["dice"], c.get("dice") or acc_new())
+        t["mismatch"] = acc_merge(t["mismatch"], c.get("mismatch") or acc_new())
+        if c.get("best") is not None:
+            t["best"] = c["best"] if t["best"] is None else max(t["best"], c["best"])
+
+
+def _legacy_summary(out_dir: Path) -> Optional[Dict[str, Any]]:
+    """summary.json, or one rebuilt from the legacy attempts.jsonl when there is none.
+
+    Writer summaries only count their own segments, so without this a folder upgraded
+    from the single-file log would drop every attempt made before the upgrade. The
+    rebuild is cached against the parsed log and redone only when the file changes.
+    """
+    s = _load_file(out_dir / SUMMARY_NAME)
+    if s is not None:
+        return s
+    legacy = attemptlog.legacy_records(out_dir)
+    if not legacy:
+        return None
+    key = str(out_dir)
+    with _legacy_lock:
+        c = _legacy_cache.get(key)
+    if c and c[0] is legacy:
+        return c[1]
+    s = rebuild_summary(attemptlog.owned_records(out_dir, out_dir / attemptlog.LEGACY_JSONL))
+    with _legacy_lock:
+        _legacy_cache[key] = (legacy, s)
+    return s
+
+
+def load_summary(out_dir: Path) -> Optional[Dict[str, Any]]:
+    """Legacy summary (summary.json or attempts.jsonl) merged with the summary of every segment (see lt_attemptlog).
+
+    Only summaries with a segment count, so ones left behind by compaction are ignored.
+    """
+    parts = [_legacy_summary(out_dir)]
+    ld = attemptlog.log_dir(out_dir)
+    b, rel = lt_backend.locate(ld)
+    names = {e["name"] for e in b.list(rel)}
+    for seg in sorted(n for n in names if n.endswith(attemptlog.SEG_EXT)):
+        stem = seg[:-len(attemptlog.SEG_EXT)]
+        s = _load_file(ld / (stem + WRITER_SUMMARY_EXT)) if stem + WRITER_SUMMARY_EXT in names else None
+        # a segment whose summary is missing (compaction, crash) is counted from the log itself
+        parts.append(s if s is not None else rebuild_summary(attemptlog.owned_records(out_dir, ld / seg)))
+    parts = [p for p in parts if p is not None]
+    if not parts:
+        return None
+    if len(parts) == 1:
+        return dict(parts[0])
+    total = _empty()
+    for p in parts:
+        merge_into(total, p)
+    return total
+
+
+def save_summary(out_dir: Path, summary: Dict[str, Any], path: Optional[Path] = None) -> None:
+    """Atomic write through the folder's backend, so a crash never leaves a half-written summary."""
+    b, rel = lt_backend.locate(path or out_dir / SUMMARY_NAME)
+    b.write_atomic(rel, json.dumps(summary, separators=(",", ":")).encode("utf-8"))
+
+
+def rebuild_summary(attempts: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    s = _empty()
+    for a in attempts:
+        add_attempt(s, a)
+    return s
+
+
+def update_summary(out_dir: Path, attempt: Dict[str, Any]) -> None:
+    """O(1) update of this writer's own summary (only this process ever writes it).
+
+    A missing writer summary is rebuilt from the records this writer's segment owns
+    (attemptlog.owned_records), so nothing is double counted against the legacy
+    summary (summary.json or attempts.jsonl) or other machines' summaries.
+    """
+    path = attemptlog.writer_path(out_dir, WRITER_SUMMARY_EXT)
+    s = _load_file(path)
+    if s is None:
+        key = attemptlog.record_key(attempt)
+        seg = attemptlog.writer_path(out_dir)
+        s = rebuild_summary(a for a in attemptlog.owned_records(out_dir, seg) if attemptlog.record_key(a) != key)
+    add_attempt(s, attempt)
+    save_summary(out_dir, s, path)
+
+
+def class_summary(attempts_root: Path) -> Dict[str, Any]:
+    """Merge per-student summaries: O(students), never touches the attempt logs."""
+    total = _empty()
+    users: Dict[str, Dict[str, Any]] = {}
+    b, rel = lt_backend.locate(attempts_root)
+    for e in b.list(rel):
+        if not e.get("dir"):
+            continue
+        s = load_summary(attempts_root / e["name"])
+        if s is None:
+            continue
+        users[e["name"]] = s
+        merge_into(total, s)
+    return {**total, "users": users}
+
+
+def export_summary_csv(summary: Dict[str, Any], out_csv: Path) -> int:
+    """Per-student and per-case summary rows from merged accumulators. Returns rows written."""
+    rows: List[List[Any]] = []
+    for u, s in sorted((summary.get("users") or {}).items()):
+        d = s.get("dice") or acc_new()
+        n = int(s.get("n", 0))
+        rows.append(["user", u, n, f"{float(d['mean']):.4f}", f"{acc_sd(d):.4f}", f"{int(s.get('passed', 0)) / max(1, n):.4f}", ""])
+    for cid, c in sorted((summary.get("cases") or {}).items()):
+        d = c.get("dice") or acc_new()
+        n = int(c.get("n", 0))
+        rows.append(["case", cid, n, f"{float(d['mean']):.4f}", f"{acc_sd(d):.4f}", f"{int(c.get('passed', 0)) / max(1, n):.4f}",
+                     f"{float((c.get('mismatch') or acc_new())['mean']):.1f}"])
+    with out_csv.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["level", "key", "attempts", "mean_dice", "sd_dice", "pass_rate", "mean_mismatch"])
+        w.writerows(rows)
+    return len(rows)
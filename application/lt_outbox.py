@@ -0,0 +1,244 @@
+# lt_outbox.py — durable local write-behind queue for attempt uploads (offline-safe)
+#
+# enqueue() commits an attempt (and its archived mask) to USER_DATA/outbox in one small local
+# write and returns; a daemon thread delivers queued entries to their destination folder
+# (usually the class share) with write_attempt, or uploads them in batches to a classroom
+# server, retrying with exponential backoff. Delivery is idempotent (attempts whose _rid is
+# already in the destination log are skipped, and the server de-duplicates by _rid), so a
+# quit or crash between delivery and dequeue is safe.
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import lt_attemptlog as attemptlog
+import lt_backend
+import lt_core as core
+import lt_maskcodec as maskcodec
+
+OUTBOX_DIR = core.USER_DATA / "outbox"
+ENTRY_EXT = ".json"
+BACKOFF_MIN_S = 2.0
+BACKOFF_MAX_S = 300.0
+_BATCH = 50
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_thread: Optional[threading.Thread] = None
+_state: Dict[str, Any] = {"pending": 0, "last_ok": 0.0, "last_error": "", "failures": 0, "next_try": 0.0, "busy": False}
+
+
+def _entry_path(rid: str) -> Path:
+    return OUTBOX_DIR / f"{rid}{ENTRY_EXT}"
+
+
+def _mask_path(rid: str) -> Path:
+    return OUTBOX_DIR / f"{rid}{maskcodec.EXT}"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def entries() -> List[Path]:
+    try:
+        return sorted(OUTBOX_DIR.glob(f"*{ENTRY_EXT}"))
+    except Exception:
+        return []
+
+
+def _read(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        d = json.loads(path.read_text(encoding="utf-8"))
+        return d if isinstance(d, dict) and isinstance(d.get("attempt"), dict) else None
+    except Exception:
+        return None
+
+
+def enqueue(out_dir: Path, attempt: Dict[str, Any], mask: Optional[bytes] = None,
+            upload: Optional[Dict[str, str]] = None) -> str:
+    """Commit an attempt locally for delivery to `out_dir`. Returns its record id.
+
+    `upload={"root", "code", "user"}` additionally sends it to a classroom server
+    (lt_share.upload_attempts), batched with the other queued attempts for it.
+    """
+    OUTBOX_DIR.mkdir(parents=True, exist_ok=True)
+    rid = str(attempt.setdefault("_rid", attemptlog.new_rid()))
+    if mask is not None:
+        attempt["mask_sha256"] = maskcodec.sha256(mask)
+        attempt["mask_bytes"] = len(mask)
+        _write_atomic(_mask_path(rid), mask)
+    entry = {"dest": str(out_dir), "attempt": attempt, "mask": mask is not None, "queued": time.time()}
+    if upload:
+        entry["upload"] = dict(upload)
+    _write_atomic(_entry_path(rid), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+    with _lock:
+        _state["pending"] = len(entries())
+        _state["next_try"] = 0.0  # new work: try now even if we were backing off
+    start()
+    _wake.set()
+    return rid
+
+
+def pending_for(out_dir: Path) -> List[Dict[str, Any]]:
+    """Queued, not yet delivered attempts bound for `out_dir` (for readers that merge them in)."""
+    out = []
+    for p in entries():
+        e = _read(p)
+        if e and Path(e.get("dest", "")) == Path(out_dir):
+            out.append(e["attempt"])
+    return out
+
+
+def _deliver(path: Path, e: Dict[str, Any]) -> bool:
+    """Write the entry into its destination folder. True when the entry is done (no upload left)."""
+    from lt_eval import write_attempt  # numpy/nibabel stay off the startup path
+
+    dest = Path(e["dest"])
+    rid = str(e["attempt"].get("_rid") or path.stem)
+    if not e.get("local_done"):
+        if core.USER_DATA in dest.parents:
+            b, rel = lt_backend.locate(dest)
+            b.makedirs(rel)
+        b, rel = lt_backend.locate(dest.parent)
+        if not b.exists(rel):
+            raise OSError(f"destination not reachable: {dest.parent}")
+        if e.get("mask"):
+            mp = _mask_path(rid)
+            if mp.exists():
+                maskcodec.archive(dest / maskcodec.STORE_DIR, mp.read_bytes())
+        # a quit/crash between write and dequeue re-delivers the entry on the next launch
+        if not attemptlog.contains(dest, attemptlog.record_key(e["attempt"])) and not write_attempt(dest, e["attempt"]):
+            raise OSError(f"could not write attempt log in {dest}")
+        if e.get("upload"):
+            e["local_done"] = True
+            _write_atomic(path, json.dumps(e, ensure_ascii=False).encode("utf-8"))
+    if e.get("upload"):
+        return False
+    _drop(path, rid)
+    return True
+
+
+def _drop(path: Path, rid: str) -> None:
+    path.unlink(missing_ok=True)
+    _mask_path(rid).unlink(missing_ok=True)
+
+
+def _upload(items: List[tuple]) -> int:
+    """One batched upload for entries sharing a server/class/user."""
+    import lt_share as share
+
+    up = items[0][1]["upload"]
+    masks: Dict[str, bytes] = {}
+    for p, e in items:
+        mp = _mask_path(str(e["attempt"].get("_rid") or p.stem))
+        sha = str(e["attempt"].get("mask_sha256") or "")
+        if e.get("mask") and sha and mp.exists():
+            masks[sha] = mp.read_bytes()
+    share.upload_attempts(up["root"], up["code"], up["user"], [e["attempt"] for _p, e in items], masks)
+    for p, e in items:
+        _drop(p, str(e["attempt"].get("_rid") or p.stem))
+    return len(items)
+
+
+def flush_once() -> int:
+    """Deliver up to one batch of queued entries, oldest first. Returns entries completed.
+
+    Each entry is written to its destination folder; entries bound for a classroom
+    server are then uploaded in one request per (server, class, user). After a
+    failure the rest of that destination's entries wait (it is usually down for
+    all of them, and order is kept); others still go through. Any failure
+    schedules the next pass with exponential backoff.
+    """
+    n = 0
+    failed = set()
+    uploads: Dict[str, List[tuple]] = {}
+    for p in entries()[:_BATCH]:
+        e = _read(p)
+        if e is None:
+            p.unlink(missing_ok=True)  # unreadable entry (should not happen: writes are atomic)
+            continue
+        up = e.get("upload") or {}
+        key = json.dumps([up.get("root"), up.get("code"), up.get("user")]) if up else str(e.get("dest", ""))
+        if key in failed:
+            continue
+        try:
+            if _deliver(p, e):
+                n += 1
+                with _lock:
+                    _state.update(last_ok=time.time(), last_error="", failures=0)
+            else:
+                uploads.setdefault(key, []).append((p, e))
+        except Exception as ex:
+            failed.add(key)
+            with _lock:
+                _state["last_error"] = str(ex)
+    for key, items in uploads.items():
+        try:
+            n += _upload(items)
+            with _lock:
+                _state.update(last_ok=time.time(), last_error="", failures=0)
+        except Exception as ex:
+            failed.add(key)
+            with _lock:
+                _state["last_error"] = str(ex)
+    with _lock:
+        if failed:
+            f = int(_state["failures"]) + 1
+            delay = min(BACKOFF_MAX_S, BACKOFF_MIN_S * 2 ** (f - 1)) * random.uniform(0.8, 1.2)
+            _state.update(failures=f, next_try=time.time() + delay)
+        else:
+            _state["next_try"] = 0.0
+        _state["pending"] = len(entries())
+    return n
+
+
+def _run() -> None:
+    while True:
+        with _lock:
+            wait = max(0.0, float(_state["next_try"]) - time.time())
+        if wait:
+            _wake.wait(wait)
+        _wake.clear()
+        with _lock:
+            _state["busy"] = True
+        try:
+            while flush_once() and not float(_state["next_try"]):
+                pass
+        finally:
+            with _lock:
+                _state["busy"] = False
+        with _lock:
+            idle = not _state["pending"] and not _state["next_try"]
+        if idle:
+            _wake.wait()
+
+
+def start() -> None:
+    """Start the flusher thread once (also delivers entries left over from a previous run)."""
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _state["pending"] = len(entries())
+        _thread = threading.Thread(target=_run, name="lt-outbox", daemon=True)
+        _thread.start()
+
+
+def retry_now() -> None:
+    with _lock:
+        _state["next_try"] = 0.0
+    _wake.set()
+
+
+def status() -> Dict[str, Any]:
+    """Snapshot for the UI: pending, busy, failures, last_error, last_ok, next_try."""
+    with _lock:
+        return dict(_state)
@@ -0,0 +1,189 @@
+# lt_perf.py — lightweight timing spans (monotonic clock + byte counters) with a rotating JSONL log
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import lt_core as core
+
+PERF_LOG = core.USER_DATA / "perf.jsonl"
+MAX_BYTES = 2 * 1024 * 1024  # rotate perf.jsonl -> perf.jsonl.1 … at this size
+KEEP = 3
+_FLUSH_EVERY = 32
+
+_lock = threading.Lock()
+_buf: List[str] = []
+
+
+class Span:
+    __slots__ = ("op", "root", "bytes", "fields", "ok")
+
+    def __init__(self, op: str, root: Optional[str], fields: Dict[str, Any]):
+        self.op = op
+        self.root = root
+        self.bytes = 0
+        self.fields = fields
+        self.ok = True
+
+    def add_bytes(self, n: int) -> None:
+        self.bytes += int(n or 0)
+
+
+@contextmanager
+def span(op: str, root: Any = None, **fields) -> Iterator[Span]:
+    """Time a block: `with perf.span("sync_cases", root=share_root) as s: s.add_bytes(n)`."""
+    s = Span(op, str(root) if root else None, fields)
+    t0 = time.perf_counter()
+    try:
+        yield s
+    except BaseException:
+        s.ok = False
+        raise
+    finally:
+        record(op, (time.perf_counter() - t0) * 1000.0, s.bytes, s.root, s.ok, **s.fields)
+
+
+def timed(op: str, root=None):
+    """Decorator form of span(); `root(*args, **kwargs)` may name the share the call touches."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            r = None
+            if root is not None:
+                try:
+                    r = root(*a, **kw)
+                except Exception:
+                    r = None
+            with span(op, r):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+
+def root_label(path: Any) -> str:
+    """Group key for a path: "local" under USER_DATA, a server URL, else its LTTrainer share root (or drive/anchor)."""
+    try:
+        if str(path).lower().startswith(("http://", "https://")):
+            return str(path).rstrip("/")
+        p = Path(path)
+        if p == core.USER_DATA or core.USER_DATA in p.parents:
+            return "local"
+        for q in [p, *p.parents]:
+            if q.name.lower() == "lttrainer":
+                return str(q)
+        return p.anchor or str(p)
+    except Exception:
+        return ""
+
+
+def record(op: str, ms: float, nbytes: int = 0, root: Optional[str] = None, ok: bool = True, **fields) -> None:
+    rec = {"ts": round(time.time(), 3), "op": op, "ms": round(float(ms), 3), "pid": os.getpid()}
+    if nbytes:
+        rec["bytes"] = int(nbytes)
+    if root:
+        rec["root"] = root
+    if not ok:
+        rec["ok"] = False
+    rec.update(fields)
+    with _lock:
+        _buf.append(json.dumps(rec, separators=(",", ":")))
+        if len(_buf) >= _FLUSH_EVERY:
+            _flush_locked()
+
+
+def _rotate() -> None:
+    for i in range(KEEP - 1, 0, -1):
+        src = PERF_LOG.with_name(f"{PERF_LOG.name}.{i}")
+        if src.exists():
+            os.replace(src, PERF_LOG.with_name(f"{PERF_LOG.name}.{i + 1}"))
+    os.replace(PERF_LOG, PERF_LOG.with_name(f"{PERF_LOG.name}.1"))
+
+
+def _flush_locked() -> None:
+    if not _buf:
+        return
+    lines = "\n".join(_buf) + "\n"
+    _buf.clear()
+    try:
+        PERF_LOG.parent.mkdir(parents=True, exist_ok=True)
+        if PERF_LOG.exists() and PERF_LOG.stat().st_size + len(lines) > MAX_BYTES:
+            _rotate()
+        with PERF_LOG.open("a", encoding="utf-8") as f:
+            f.write(lines)
+    except Exception:
+        pass
+
+
+def flush() -> None:
+    with _lock:
+        _flush_locked()
+
+
+atexit.register(flush)
+
+
+def log_files() -> List[Path]:
+    return [p for p in [PERF_LOG] + [PERF_LOG.with_name(f"{PERF_LOG.name}.{i}") for i in range(1, KEEP + 1)] if p.exists()]
+
+
+def read_log() -> List[Dict[str, Any]]:
+    flush()
+    out: List[Dict[str, Any]] = []
+    for p in log_files():
+        try:
+            for line in p.read_text(encoding="utf-8", errors="ignore").splitlines():
+                try:
+                    d = json.loads(line)
+                    if isinstance(d, dict) and "op" in d:
+                        out.append(d)
+                except Exception:
+                    continue
+        except Exception:
+            pass
+    return out
+
+
+def _pct(sorted_ms: List[float], q: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    pos = q * (len(sorted_ms) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_ms) - 1)
+    return sorted_ms[lo] + (sorted_ms[hi] - sorted_ms[lo]) * (pos - lo)
+
+
+def stats(records: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """p50/p95/max per (operation, share root), slowest p95 first."""
+    groups: Dict[Tuple[str, str], List[float]] = {}
+    nbytes: Dict[Tuple[str, str], int] = {}
+    for r in (records if records is not None else read_log()):
+        k = (str(r.get("op")), str(r.get("root") or ""))
+        try:
+            groups.setdefault(k, []).append(float(r.get("ms", 0.0)))
+            nbytes[k] = nbytes.get(k, 0) + int(r.get("bytes", 0) or 0)
+        except Exception:
+            continue
+    out = []
+    for (op, root), ms in groups.items():
+        ms.sort()
+        out.append({"op": op, "root": root, "n": len(ms), "p50": _pct(ms, 0.5), "p95": _pct(ms, 0.95),
+                    "max": ms[-1], "bytes": nbytes.get((op, root), 0)})
+    out.sort(key=lambda d: d["p95"], reverse=True)
+    return out
+
+
+def clear() -> None:
+    with _lock:
+        _buf.clear()
+        for p in log_files():
+            try:
+                p.unlink()
+            except Exception:
+                pass
@@ -0,0 +1,110 @@
+# lt_prefetch.py — low-priority background prefetch of the next practice cases
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Set
+
+import lt_attemptlog as attemptlog
+import lt_eval
+import lt_outbox as outbox
+import lt_workspace as workspace
+
+DEFAULT_AHEAD = 2
+_READ_CHUNK = 1024 * 1024
+_IDLE_SLEEP = 0.25   # poll interval while an evaluation is running
+_YIELD_SLEEP = 0.01  # pause between chunks so the UI/editor keep priority
+
+
+def attempted_case_ids(attempts_dir: Path) -> Set[str]:
+    try:
+        recs = attemptlog.read_records(attempts_dir) + outbox.pending_for(attempts_dir)
+        return {str(a["case_id"]) for a in recs if a.get("case_id")}
+    except Exception:
+        return set()
+
+
+def predict_next(rows: Sequence, current_id: str, attempted: Set[str], n: int = DEFAULT_AHEAD) -> List:
+    """Next `n` cases after `current_id` in list order, not-yet-attempted ones first."""
+    ids = [r.case_id for r in rows]
+    start = ids.index(current_id) + 1 if current_id in ids else 0
+    ordered = list(rows[start:]) + list(rows[:start])
+    ordered = [r for r in ordered if r.case_id != current_id]
+    fresh = [r for r in ordered if r.case_id not in attempted]
+    seen = [r for r in ordered if r.case_id in attempted]
+    return (fresh + seen)[: max(0, n)]
+
+
+class Prefetcher:
+    """Single daemon thread that warms the upcoming (already local) cases.
+
+    For each predicted case it stats the case files, reads the T1 through the OS
+    page cache (what the editor opens next) and decodes the gold mask into
+    `lt_eval`'s cache. Evicted cases are skipped: re-fetching them here would
+    bypass the workspace budget and leave the table showing them as evicted, so
+    they are restored when opened (workspace.ensure_local). It backs off whenever
+    `lt_eval.EVAL_BUSY` is set, so it never competes with a running evaluation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue: List = []
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, rows: Sequence, current_id: str, attempts_dir: Path, n: int = DEFAULT_AHEAD) -> None:
+        with self._lock:
+            self._queue = [("plan", list(rows), current_id, attempts_dir, n)]
+        self._wake.set()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="case-prefetch", daemon=True)
+            self._thread.start()
+
+    def _pop(self):
+        with self._lock:
+            return self._queue.pop(0) if self._queue else None
+
+    def _superseded(self) -> bool:
+        with self._lock:
+            return bool(self._queue)
+
+    def _wait_idle(self) -> None:
+        while lt_eval.EVAL_BUSY.is_set():
+            time.sleep(_IDLE_SLEEP)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            job = self._pop()
+            while job is not None:
+                _, rows, current_id, attempts_dir, n = job
+                attempted = attempted_case_ids(attempts_dir)
+                for c in predict_next(rows, current_id, attempted, n):
+                    if self._superseded():
+                        break
+                    try:
+                        self._warm(c)
+                    except Exception:
+                        pass
+                job = self._pop()
+
+    def _warm(self, c) -> None:
+        if getattr(c, "evicted", False) or workspace.is_evicted(c.case_dir):
+            return
+        self._wait_idle()
+        for p in (c.case_dir / "case.json", c.t1, c.gold, c.student):
+            try:
+                p.stat()
+            except Exception:
+                pass
+        with open(c.t1, "rb") as f:
+            while f.read(_READ_CHUNK):
+                if lt_eval.EVAL_BUSY.is_set() or self._superseded():
+                    self._wait_idle()
+                    if self._superseded():
+                        return
+                time.sleep(_YIELD_SLEEP)
+        self._wait_idle()
+        lt_eval.load_gold_mask(c.gold)
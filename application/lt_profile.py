@@ -0,0 +1,142 @@
+# lt_profile.py — opt-in cProfile / tracemalloc capture around heavy operations + diagnostics bundle
+from __future__ import annotations
+
+import functools
+import json
+import os
+import platform
+import sys
+import time
+import zipfile
+from pathlib import Path
+from typing import List
+
+import lt_core as core
+
+PROFILE_DIR = core.USER_DATA / "profiles"
+ENV_VAR = "LT_PROFILE"       # "1"/"all" or comma-separated op names
+KEEP_FILES = 60              # retention: newest files kept …
+KEEP_MB = 200                # … and total size cap
+TOP_ALLOCS = 25
+
+
+def enabled(op: str) -> bool:
+    env = os.environ.get(ENV_VAR, "").strip().lower()
+    if env:
+        if env in ("0", "off", "false", "no"):
+            return False
+        return env in ("1", "all", "on", "true", "yes") or op.lower() in {x.strip() for x in env.split(",")}
+    if not core.cfg_bool("profile_enabled", False):
+        return False
+    ops = core.cfg_get("profile_ops", "all")
+    return ops == "all" or (isinstance(ops, list) and op in ops)
+
+
+def profiled(op: str):
+    """Wrap a call in cProfile + tracemalloc when profiling is switched on for `op`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if not enabled(op):
+                return fn(*a, **kw)
+            return _run_profiled(op, fn, a, kw)
+        return wrapper
+    return deco
+
+
+def _run_profiled(op: str, fn, a, kw):
+    import cProfile
+    import tracemalloc
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(10)
+    tracemalloc.reset_peak()
+    prof = cProfile.Profile()
+    t0 = time.perf_counter()
+    try:
+        return prof.runcall(fn, *a, **kw)
+    finally:
+        wall = time.perf_counter() - t0
+        try:
+            snap = tracemalloc.take_snapshot()
+            cur, peak = tracemalloc.get_traced_memory()
+            if started:
+                tracemalloc.stop()
+            _dump(op, prof, snap, wall, cur, peak)
+        except Exception:
+            pass
+
+
+def _dump(op: str, prof, snap, wall: float, cur: int, peak: int) -> None:
+    import io
+    import pstats
+
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = f"{time.strftime('%Y-%m-%d_%H%M%S')}_{int(time.time() * 1000) % 1000:03d}_{os.getpid()}_{op}"
+    prof.dump_stats(str(PROFILE_DIR / f"{stem}.prof"))
+
+    buf = io.StringIO()
+    buf.write(f"{op}: wall {wall * 1000:.1f} ms · traced now {cur / 1e6:.1f} MB · peak {peak / 1e6:.1f} MB\n\n")
+    buf.write(f"Top {TOP_ALLOCS} allocation sites (by size):\n")
+    for st in snap.statistics("lineno")[:TOP_ALLOCS]:
+        buf.write(f"  {st.size / 1024:10.1f} KiB  {st.count:8d} blocks  {st.traceback}\n")
+    buf.write("\nTop 30 functions (cumulative time):\n")
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(30)
+    (PROFILE_DIR / f"{stem}.txt").write_text(buf.getvalue(), encoding="utf-8")
+    prune()
+
+
+def prune() -> int:
+    """Drop the oldest captures beyond KEEP_FILES / KEEP_MB. Returns files removed."""
+    try:
+        files = sorted([p for p in PROFILE_DIR.iterdir() if p.is_file()], key=lambda p: p.stat().st_mtime, reverse=True)
+    except Exception:
+        return 0
+    total = 0
+    removed = 0
+    for i, p in enumerate(files):
+        try:
+            total += p.stat().st_size
+            if i >= KEEP_FILES or total > KEEP_MB * 1024 * 1024:
+                p.unlink()
+                removed += 1
+        except Exception:
+            pass
+    return removed
+
+
+def _sysinfo() -> dict:
+    info = {
+        "app": core.APP_NAME, "version": core.APP_VERSION, "python": sys.version, "platform": platform.platform(),
+        "machine": platform.machine(), "cpus": os.cpu_count(), "frozen": bool(getattr(sys, "frozen", False)),
+        "profile_env": os.environ.get(ENV_VAR, ""),
+    }
+    for mod in ("numpy", "nibabel", "PySide6"):
+        try:
+            info[mod] = __import__(mod).__version__
+        except Exception:
+            info[mod] = None
+    return info
+
+
+def export_diagnostics(out_zip: Path) -> int:
+    """Zip profiles, perf logs, config and indexes with system info. Returns files added."""
+    import lt_perf as perf
+
+    perf.flush()
+    core.cfg_flush()
+    files: List[Path] = []
+    for p in [core.CFG_PATH, core.USER_DATA / "case_index.json", core.USER_DATA / "workspace_access.json", *perf.log_files()]:
+        if p.exists():
+            files.append(p)
+    if PROFILE_DIR.exists():
+        files += sorted(p for p in PROFILE_DIR.iterdir() if p.is_file())
+    with zipfile.ZipFile(out_zip, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        z.writestr("sysinfo.json", json.dumps(_sysinfo(), indent=2))
+        for p in files:
+            try:
+                z.write(p, p.relative_to(core.USER_DATA).as_posix())
+            except Exception:
+                pass
+    return len(files) + 1
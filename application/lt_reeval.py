@@ -0,0 +1,178 @@
+# lt_reeval.py — re-score archived submissions against new gold versions (process pool, versioned results)
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import lt_backend
+import lt_maskcodec as maskcodec
+import lt_share as share
+import lt_store as store
+
+REEVAL_DIR = "reeval"
+_SAVE_EVERY = 50
+# Metric columns replaced when dashboards switch to "current gold" scores.
+METRIC_KEYS = ("dice", "jaccard", "precision", "recall", "specificity", "accuracy", "tp", "fp", "fn", "tn",
+               "gold_voxels", "student_voxels", "mismatch_voxels", "gold_ml", "student_ml", "vol_abs_err_ml",
+               "vol_rel_err", "centroid_dist_mm")
+
+
+def results_path(root: Path, code: str, case_id: str, version: int) -> Path:
+    return share.class_dir(root, code) / REEVAL_DIR / case_id / f"gold_v{int(version)}.json"
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    b, rel = lt_backend.locate(path)
+    d = b.read_json(rel)
+    return d if isinstance(d, dict) else {}
+
+
+def _save_results(path: Path, d: Dict[str, Any]) -> None:
+    b, rel = lt_backend.locate(path)
+    b.write_atomic(rel, json.dumps(d, separators=(",", ":")).encode("utf-8"))
+
+
+def _score(gold_path: str, store_dir: str, sha: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Pool worker: decode one archived mask and score it (gold decode is cached per process)."""
+    from lt_eval import load_gold_mask, mask_metrics
+    data = maskcodec.load(Path(store_dir), sha)
+    if data is None:
+        return sha, None
+    gb, affine, header = load_gold_mask(Path(gold_path))
+    _h, sb = maskcodec.decode(data)
+    if sb.shape != gb.shape:
+        return sha, None
+    return sha, mask_metrics(gb, sb, affine, header)
+
+
+def pending(root: Path, code: str, case_id: str) -> Tuple[int, Dict[str, Any], List[Tuple[str, str]]]:
+    """(gold version, results so far, [(store_dir, sha)] still to score) for one case."""
+    import lt_analytics as analytics
+    meta = share.case_meta(root, code, case_id)
+    version = int(meta.get("gold_version") or 1)
+    res = load_results(results_path(root, code, case_id, version))
+    if res.get("gold_sha256") != meta.get("gold_sha256"):
+        res = {}
+    res = {"case_id": case_id, "version": version, "gold_sha256": meta.get("gold_sha256", ""), "results": res.get("results") or {}}
+    done = res["results"]
+    todo: Dict[str, str] = {}
+    attempts = share.attempts_root(root, code)
+    b, rel = lt_backend.locate(attempts)
+    for e in b.list(rel):
+        if not e.get("dir"):
+            continue
+        d = attempts / e["name"]
+        for a in analytics.read_user_attempts(d):
+            sha = str(a.get("mask_sha256") or "")
+            if sha and str(a.get("case_id") or "") == case_id and sha not in done and sha not in todo:
+                todo[sha] = str(d / maskcodec.STORE_DIR)
+    return version, res, [(sd, sha) for sha, sd in todo.items()]
+
+
+def reevaluate_case(root: Path, code: str, case_id: str, workers: Optional[int] = None) -> int:
+    """Score every not-yet-scored submission of a case against its current gold. Returns count scored."""
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    import tempfile
+
+    version, res, todo = pending(root, code, case_id)
+    if not todo:
+        return 0
+    path = results_path(root, code, case_id, version)
+    n = 0
+    workers = workers or max(1, min(len(todo), (os.cpu_count() or 2) - 1))
+    with tempfile.TemporaryDirectory(prefix="lt_reeval_") as tmp:
+        # score against a snapshot of the gold the results are filed under: a gold replaced
+        # while the job runs must not end up in this version's results
+        gold_path = Path(tmp) / "gold.nii.gz"
+        share.backend(root).download(share.class_rel(code, "cases", case_id, "gold.nii.gz"), gold_path)
+        if store.sha256_file(gold_path) != res["gold_sha256"]:
+            return 0  # replaced since pending() read case.json; the next run scores the new version
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as ex:
+            futs = [ex.submit(_score, str(gold_path), sd, sha) for sd, sha in todo]
+            for fut in futs:
+                try:
+                    sha, metrics = fut.result()
+                except Exception:
+                    continue
+                if metrics is None:
+                    continue
+                res["results"][sha] = metrics
+                n += 1
+                if n % _SAVE_EVERY == 0:
+                    _save_results(path, res)
+    _save_results(path, res)
+    return n
+
+
+def reevaluate_class(root: Path, code: str, case_ids: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    ids = list(case_ids) if case_ids is not None else share.list_class_cases(root, code)
+    out: Dict[str, int] = {}
+    for cid in ids:
+        try:
+            out[cid] = reevaluate_case(root, code, cid)
+        except Exception:
+            out[cid] = -1
+    return out
+
+
+_job_lock = threading.Lock()
+
+
+def start_background(root: Path, code: str, case_ids: Optional[Iterable[str]] = None) -> bool:
+    """Run reevaluate_class on a daemon thread; False if a job is already running."""
+    if not _job_lock.acquire(blocking=False):
+        return False
+    ids = list(case_ids) if case_ids is not None else None
+
+    def run():
+        try:
+            reevaluate_class(root, code, ids)
+        finally:
+            _job_lock.release()
+
+    threading.Thread(target=run, name="lt-reeval", daemon=True).start()
+    return True
+
+
+def is_running() -> bool:
+    return _job_lock.locked()
+
+
+def rescore(records: List[Dict[str, Any]], root: Path, code: str) -> Tuple[List[Dict[str, Any]], int]:
+    """Records with metrics swapped for current-gold results where available.
+
+    Attempts already scored against the current gold (or without an archived
+    mask) are kept as is; `passed` is recomputed with each attempt's own policy.
+    Returns (records, number rescored).
+    """
+    cache: Dict[str, Dict[str, Any]] = {}
+    out: List[Dict[str, Any]] = []
+    n = 0
+    for a in records:
+        cid = str(a.get("case_id") or "")
+        sha = str(a.get("mask_sha256") or "")
+        if not cid or not sha:
+            out.append(a)
+            continue
+        if cid not in cache:
+            meta = share.case_meta(root, code, cid)
+            r = load_results(results_path(root, code, cid, int(meta.get("gold_version") or 1)))
+            cache[cid] = r if r.get("gold_sha256") == meta.get("gold_sha256") else {}
+        r = cache[cid]
+        m = (r.get("results") or {}).get(sha)
+        if not m or a.get("gold_sha256") == r.get("gold_sha256"):
+            out.append(a)
+            continue
+        b = dict(a)
+        b.update({k: m.get(k) for k in METRIC_KEYS if k in m})
+        b["passed"] = int(m.get("student_voxels", 0)) >= int(a.get("min_voxels") or 0) and int(m.get("mismatch_voxels", 0)) <= int(a.get("tolerance") or 0)
+        b["gold_sha256"] = r.get("gold_sha256")
+        b["gold_version"] = r.get("version")
+        out.append(b)
+        n += 1
+    return out, n
@@ -1,9 +1,28 @@
 from __future__ import annotations
-import json, uuid, hashlib, shutil
+import re, uuid, hashlib
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 import lt_core as core
-from lt_utils import norm_code
+import lt_backend
+import lt_bundle
+import lt_perf as perf
+import lt_store as store
+from lt_utils import norm_code, now_ts
+
+# Every share access goes through a ShareBackend (lt_backend): a mounted folder or a classroom server URL.
+# Native paths (class_dir, attempts_root, ...) under a share folder resolve back to its backend
+# via lt_backend.locate, so the attempt log, summaries and mask store use it as well.
+CASE_FILES = ("t1.nii.gz", "gold.nii.gz", "case.json")
+
+def is_remote(root: Any) -> bool:
+    return lt_backend.is_url(root)
+
+def backend(root: Any) -> lt_backend.ShareBackend:
+    """LocalBackend for a share folder, HttpBackend for an http(s):// classroom server (one per root)."""
+    return lt_backend.get(root)
+
+def class_rel(code: str, *parts: str) -> str:
+    return "/".join(["classrooms", norm_code(code), *parts])
 
 def resolve_share_root(selected_path: Path) -> Path:
     p = selected_path.expanduser().resolve()
@@ -13,32 +32,30 @@ def resolve_share_root(selected_path: Path) -> Path:
         root = (p / "LTTrainer").resolve()
     else:
         root = (p / "LTTrainer").resolve()
-    root.mkdir(parents=True, exist_ok=True)
     ensure_layout(root)
     return root
 
 def ensure_layout(root: Path) -> None:
-    (root / "config").mkdir(parents=True, exist_ok=True)
-    (root / "classrooms").mkdir(parents=True, exist_ok=True)
-    (root / "updates").mkdir(parents=True, exist_ok=True)
+    b = backend(root)
+    for d in ("config", "classrooms", "updates"):
+        b.makedirs(d)
 
-def pin_path(root: Path) -> Path:
-    return root / "config" / "teacher_pin.json"
+PIN_REL = "config/teacher_pin.json"
 
 def _pin_hash(pin: str, salt: str) -> str:
     return hashlib.sha256((salt + "|" + pin).encode("utf-8")).hexdigest()
 
 def pin_is_set(root: Path) -> bool:
-    return pin_path(root).exists()
+    return backend(root).exists(PIN_REL)
 
 def pin_set(root: Path, pin: str) -> None:
     salt = uuid.uuid4().hex
     obj = {"salt": salt, "hash": _pin_hash(pin, salt)}
-    pin_path(root).write_text(json.dumps(obj, indent=2), encoding="utf-8")
+    backend(root).write_json(PIN_REL, obj)
 
 def pin_verify(root: Path, pin: str) -> bool:
     try:
-        obj = json.loads(pin_path(root).read_text(encoding="utf-8"))
+        obj = backend(root).read_json(PIN_REL) or {}
         salt = str(obj.get("salt") or "")
         h = str(obj.get("hash") or "")
         return bool(salt and h and _pin_hash(pin, salt) == h)
@@ -49,45 +66,175 @@ def class_dir(root: Path, code: str) -> Path:
     return root / "classrooms" / norm_code(code)
 
 def class_exists(root: Path, code: str) -> bool:
-    return class_dir(root, code).exists()
+    return backend(root).exists(class_rel(code))
 
 def ensure_classroom(root: Path, code: str) -> Path:
     code = norm_code(code)
-    cd = class_dir(root, code)
-    (cd / "cases").mkdir(parents=True, exist_ok=True)
-    (cd / "progress" / "attempts").mkdir(parents=True, exist_ok=True)
-    (cd / "materials_protected").mkdir(parents=True, exist_ok=True)
-    pol = cd / "config.json"
-    if not pol.exists():
-        pol.write_text(json.dumps({"min_voxels": core.DEFAULT_MIN_VOXELS, "tolerance": core.DEFAULT_TOLERANCE, "session": "practice"}, indent=2), encoding="utf-8")
-    return cd
+    b = backend(root)
+    for d in ("cases", "progress/attempts", "materials_protected"):
+        b.makedirs(class_rel(code, d))
+    if not b.exists(class_rel(code, "config.json")):
+        policy_save(root, code, {"min_voxels": core.DEFAULT_MIN_VOXELS, "tolerance": core.DEFAULT_TOLERANCE, "session": "practice"})
+    return class_dir(root, code)
 
 def policy_load(root: Path, code: str) -> Dict[str, Any]:
-    try:
-        p = class_dir(root, code) / "config.json"
-        if p.exists():
-            d = json.loads(p.read_text(encoding="utf-8"))
-            return d if isinstance(d, dict) else {}
-    except Exception:
-        pass
-    return {}
+    d = backend(root).read_json(class_rel(code, "config.json"))
+    return d if isinstance(d, dict) else {}
 
 def policy_save(root: Path, code: str, d: Dict[str, Any]) -> None:
-    p = class_dir(root, code) / "config.json"
-    p.write_text(json.dumps(d, indent=2), encoding="utf-8")
-
-def list_class_cases(root: Path, code: str) -> List[Path]:
-    cd = class_dir(root, code) / "cases"
-    if not cd.exists():
-        return []
-    return sorted([p for p in cd.iterdir() if p.is_dir()], key=lambda x: x.name.lower())
-
-def upload_case(root: Path, code: str, case_id: str, t1: Path, gold: Path) -> Path:
-    dest = class_dir(root, code) / "cases" / case_id
-    dest.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(t1, dest / "t1.nii.gz")
-    shutil.copy2(gold, dest / "gold.nii.gz")
-    return dest
+    backend(root).write_json(class_rel(code, "config.json"), d)
+
+@perf.timed("share_list_cases", root=lambda root, *_a, **_k: perf.root_label(root))
+def list_class_cases(root: Any, code: str) -> List[str]:
+    """Case ids of a classroom (share folder or server)."""
+    return [e["name"] for e in backend(root).list(class_rel(code, "cases")) if e.get("dir")]
+
+GOLD_VERSIONS_DIR = "gold_versions"
+
+def case_meta(root: Path, code: str, case_id: str) -> Dict[str, Any]:
+    d = backend(root).read_json(class_rel(code, "cases", case_id, "case.json"))
+    return d if isinstance(d, dict) else {}
+
+def upload_case(root: Path, code: str, case_id: str, t1: Optional[Path], gold: Path, meta: Optional[Dict[str, Any]] = None) -> Path:
+    """Copy a case to the share and record its gold hash/version in case.json.
+
+    Uploading a different gold for an existing case archives the previous one
+    under gold_versions/ and bumps gold_version; `t1=None` replaces only the gold.
+    """
+    b = backend(root)
+    rel = class_rel(code, "cases", case_id)
+    b.makedirs(rel)
+    cur = case_meta(root, code, case_id)
+    if t1 is not None:
+        b.put_file(f"{rel}/t1.nii.gz", t1)
+
+    g_rel = f"{rel}/gold.nii.gz"
+    has_gold = b.exists(g_rel)
+    sha = store.sha256_file(gold)
+    old_sha = str(cur.get("gold_sha256") or "") or (hashlib.sha256(b.read(g_rel)).hexdigest() if has_gold else "")
+    ver = int(cur.get("gold_version") or (1 if old_sha else 0))
+    versions = list(cur.get("gold_versions") or ([{"version": ver, "sha256": old_sha}] if old_sha else []))
+    if sha != old_sha or not has_gold:
+        if has_gold and old_sha:
+            b.write_atomic(f"{rel}/{GOLD_VERSIONS_DIR}/v{ver}_{old_sha[:12]}.nii.gz", b.read(g_rel))
+        b.put_file(g_rel, gold, readonly=True)
+        ver += 1
+        versions.append({"version": ver, "sha256": sha, "timestamp": now_ts()})
+    b.write_json(f"{rel}/case.json",
+                 {**cur, **(meta or {}), "case_id": case_id, "gold_sha256": sha, "gold_version": ver, "gold_versions": versions})
+    return class_dir(root, code) / "cases" / case_id
+
+def replace_gold(root: Path, code: str, case_id: str, gold: Path) -> Dict[str, Any]:
+    """New gold version for an existing case; returns the updated case.json."""
+    upload_case(root, code, case_id, None, gold)
+    return case_meta(root, code, case_id)
 
 def attempts_root(root: Path, code: str) -> Path:
     return class_dir(root, code) / "progress" / "attempts"
+
+def mask_store(root: Path, code: str, user: str) -> Path:
+    """Per-student content-addressed store of archived submission masks."""
+    return attempts_root(root, code) / user / "masks"
+
+def bundle_dir(root: Path, code: str) -> Path:
+    return class_dir(root, code) / "bundle"
+
+def publish_bundle(root: Path, code: str) -> Dict[str, Any]:
+    """Pack the classroom's case folders into one indexed bundle for fast student sync.
+
+    The bundle is built in a local staging folder and then put on the share
+    (bundle first, index last, so students never see an index without its bundle).
+    """
+    import tempfile
+    with tempfile.TemporaryDirectory(prefix="lt_bundle_") as tmp:
+        stage = Path(tmp)
+        for cid in list_class_cases(root, code):
+            fetch_case(root, code, cid, stage / "cases" / cid)
+        index = lt_bundle.build_bundle(stage / "cases", stage / "bundle")
+        b = backend(root)
+        b.put_file(class_rel(code, "bundle", lt_bundle.BUNDLE_NAME), stage / "bundle" / lt_bundle.BUNDLE_NAME)
+        b.put_file(class_rel(code, "bundle", lt_bundle.INDEX_NAME), stage / "bundle" / lt_bundle.INDEX_NAME)
+    return index
+
+def bundle_index(root: Path, code: str) -> Optional[Dict[str, Any]]:
+    b = backend(root)
+    if not b.exists(class_rel(code, "bundle", lt_bundle.BUNDLE_NAME)):
+        return None
+    d = b.read_json(class_rel(code, "bundle", lt_bundle.INDEX_NAME))
+    return d if isinstance(d, dict) and isinstance(d.get("members"), list) else None
+
+# ---- transport-independent access (mounted folder or lt_classserver URL) ----
+
+def local_manifest(root: Path, code: str) -> Optional[Dict[str, Any]]:
+    """Manifest built from storage (what lt_classserver serves for a class)."""
+    if not class_exists(root, code):
+        return None
+    b = backend(root)
+    cases = []
+    for e in b.list(class_rel(code, "cases")):
+        if not e.get("dir"):
+            continue
+        files = {}
+        for fn in CASE_FILES:
+            st = b.stat(class_rel(code, "cases", e["name"], fn))
+            if st is not None:
+                files[fn] = {"size": st["size"], "mtime": st["mtime"]}
+        cases.append({"case_id": e["name"], "meta": case_meta(root, code, e["name"]), "files": files})
+    return {"code": norm_code(code), "policy": policy_load(root, code), "cases": cases, "bundle": bundle_index(root, code)}
+
+def class_manifest(root: Any, code: str) -> Optional[Dict[str, Any]]:
+    """Policy, case list (case.json + file sizes) and bundle index in one call; None if no such class."""
+    if is_remote(root):
+        return backend(root).get_json("classes", f"{norm_code(code)}/manifest")
+    return local_manifest(Path(root), code)
+
+def fetch_case(root: Any, code: str, case_id: str, dest: Path, files=CASE_FILES) -> List[str]:
+    """Copy a case's files from the share/server into `dest`; returns the files fetched."""
+    b = backend(root)
+    got = []
+    for fn in files:
+        rel = class_rel(code, "cases", case_id, fn)
+        if b.stat(rel) is None:
+            continue
+        b.download(rel, dest / fn)
+        got.append(fn)
+    return got
+
+def extract_bundle(root: Any, code: str, index: Dict[str, Any], dest_root: Path, want=None) -> List[str]:
+    """lt_bundle.extract_missing against the class bundle, through backend range reads."""
+    b = backend(root)
+    rel = class_rel(code, "bundle", lt_bundle.BUNDLE_NAME)
+    return lt_bundle.extract_missing(None, index, dest_root, want=want, read_at=lambda off, n: b.read(rel, off, off + n))
+
+_USER_OK = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.@ -]{0,63}$")
+
+def store_attempts(root: Path, code: str, user: str, attempts: List[Dict[str, Any]], masks: Dict[str, bytes]) -> int:
+    """Write a batch of attempts (+ archived masks) into a student's folder; skips ids already there."""
+    import lt_attemptlog as attemptlog
+    import lt_maskcodec as maskcodec
+    from lt_eval import write_attempt
+
+    if not _USER_OK.match(user or ""):
+        raise ValueError(f"invalid user name: {user!r}")
+    out_dir = attempts_root(root, code) / user
+    for sha, data in masks.items():
+        if maskcodec.sha256(data) == sha:
+            maskcodec.archive(out_dir / maskcodec.STORE_DIR, data)
+    seen = {attemptlog.record_key(a) for a in attemptlog.read_records(out_dir)}
+    n = 0
+    for a in attempts:
+        if attemptlog.record_key(a) in seen:
+            continue
+        if not write_attempt(out_dir, dict(a)):
+            raise OSError(f"could not write attempt log in {out_dir}")
+        n += 1
+    return n
+
+def upload_attempts(root: Any, code: str, user: str, attempts: List[Dict[str, Any]], masks: Optional[Dict[str, bytes]] = None) -> int:
+    """Batched attempt upload (one request per batch for a server URL). Returns attempts newly stored."""
+    masks = masks or {}
+    if not is_remote(root):
+        return store_attempts(Path(root), code, user, attempts, masks)
+    import base64
+    body = {"attempts": attempts, "masks": {k: base64.b64encode(v).decode("ascii") for k, v in masks.items()}}
+    return int(backend(root).post_json("classes", f"{norm_code(code)}/attempts/{user}", body).get("written", 0))
@@ -0,0 +1,169 @@
+# lt_skill.py — Rasch (1PL IRT) model of student ability and case difficulty
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+import lt_analytics as analytics
+import lt_backend
+
+MODEL_NAME = "skill_model.json"
+ELO_K = 0.4      # step size for per-attempt updates between refits (logit units)
+REFIT_FRACTION = 0.2  # full refit once incremental updates exceed this share of fitted attempts
+_PRIOR = 0.1     # ridge penalty; keeps perfect/zero scorers finite
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def fit_rasch(tab: analytics.AttemptTable, iters: int = 50, tol: float = 1e-6) -> Dict[str, Any]:
+    """Fit P(pass | user u, case c) = sigmoid(theta_u - b_c) by penalised maximum likelihood.
+
+    Attempts are collapsed into a user x case matrix of (passes, trials), then
+    theta and b are updated alternately with vectorised Newton steps (each is a
+    diagonal Hessian over the whole matrix). Difficulties are centred at 0.
+    """
+    rec = tab.rec
+    users = tab.labels.get("user", [])
+    cases = tab.labels.get("case", [])
+    nu, nc = len(users), len(cases)
+    theta = np.zeros(nu)
+    b = np.zeros(nc)
+    if len(rec) == 0 or nu == 0 or nc == 0:
+        return {"users": users, "cases": cases, "theta": theta, "b": b, "n_user": np.zeros(nu), "n_case": np.zeros(nc),
+                "trials": np.zeros((nu, nc)), "passes": np.zeros((nu, nc))}
+
+    trials, passes = pair_counts(tab)
+
+    for _ in range(iters):
+        p = _sigmoid(theta[:, None] - b[None, :])
+        w = trials * p * (1 - p)
+        g_theta = (passes - trials * p).sum(axis=1) - _PRIOR * theta
+        step_t = g_theta / (w.sum(axis=1) + _PRIOR)
+        theta += np.clip(step_t, -2, 2)
+
+        p = _sigmoid(theta[:, None] - b[None, :])
+        w = trials * p * (1 - p)
+        g_b = -(passes - trials * p).sum(axis=0) - _PRIOR * b
+        step_b = g_b / (w.sum(axis=0) + _PRIOR)
+        b += np.clip(step_b, -2, 2)
+        b -= b.mean()
+        if max(np.abs(step_t).max(initial=0), np.abs(step_b).max(initial=0)) < tol:
+            break
+
+    return {"users": users, "cases": cases, "theta": theta, "b": b,
+            "n_user": trials.sum(axis=1), "n_case": trials.sum(axis=0), "trials": trials, "passes": passes}
+
+
+def pair_counts(tab: analytics.AttemptTable):
+    """(trials, passes) user x case matrices of the table."""
+    rec = tab.rec
+    nu, nc = len(tab.labels.get("user", [])), len(tab.labels.get("case", []))
+    flat = rec["user"].astype(np.int64) * nc + rec["case"]
+    trials = np.bincount(flat, minlength=nu * nc).reshape(nu, nc).astype(np.float64)
+    passes = np.bincount(flat, weights=rec["passed"].astype(np.float64), minlength=nu * nc).reshape(nu, nc)
+    return trials, passes
+
+
+def _pair_key(user: str, case_id: str) -> str:
+    return f"{user}\t{case_id}"
+
+
+def to_json(model: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ability": {u: float(t) for u, t in zip(model["users"], model["theta"]) if u},
+        "difficulty": {c: float(x) for c, x in zip(model["cases"], model["b"]) if c},
+        "n_user": {u: int(n) for u, n in zip(model["users"], model["n_user"]) if u},
+        "n_case": {c: int(n) for c, n in zip(model["cases"], model["n_case"]) if c},
+        "fitted_attempts": int(sum(model["n_user"])),
+        # attempts (and passes) already applied per user/case, so sync_class can tell what is new
+        "pairs": {_pair_key(model["users"][u], model["cases"][c]): [int(model["trials"][u, c]), int(model["passes"][u, c])]
+                  for u, c in zip(*np.nonzero(model["trials"]))},
+    }
+
+
+def load_model(path: Path) -> Optional[Dict[str, Any]]:
+    b, rel = lt_backend.locate(path)
+    d = b.read_json(rel)
+    return d if isinstance(d, dict) else None
+
+
+def save_model(path: Path, model: Dict[str, Any]) -> None:
+    b, rel = lt_backend.locate(path)
+    b.write_atomic(rel, json.dumps(model, indent=1).encode("utf-8"))
+
+
+def update_attempt(model: Dict[str, Any], user: str, case_id: str, passed: bool) -> None:
+    """Elo-style online step between full refits: move ability/difficulty by the surprise."""
+    ab = model.setdefault("ability", {})
+    df = model.setdefault("difficulty", {})
+    t = float(ab.get(user, 0.0))
+    d = float(df.get(case_id, 0.0))
+    p = 1.0 / (1.0 + math.exp(-(t - d)))
+    err = (1.0 if passed else 0.0) - p
+    ab[user] = t + ELO_K * err
+    df[case_id] = d - ELO_K * err
+    model.setdefault("n_user", {})[user] = int(model["n_user"].get(user, 0)) + 1
+    model.setdefault("n_case", {})[case_id] = int(model["n_case"].get(case_id, 0)) + 1
+    model["pending_updates"] = int(model.get("pending_updates", 0)) + 1
+
+
+def refit_class(attempts_root: Path, tab: Optional[analytics.AttemptTable] = None) -> Dict[str, Any]:
+    """Full batch refit from all attempts; stored next to the class attempt logs."""
+    tab = tab if tab is not None else analytics.load_class(attempts_root)
+    model = to_json(fit_rasch(tab))
+    try:
+        save_model(attempts_root / MODEL_NAME, model)
+    except Exception:
+        pass
+    return model
+
+
+def sync_class(attempts_root: Path, tab: analytics.AttemptTable, force: bool = False) -> Dict[str, Any]:
+    """Bring the stored model up to date with `tab`.
+
+    Attempts not yet applied are found by comparing per user/case attempt and pass
+    counts with the model's (timestamps cannot tell: attempts in the same second, or
+    delivered late by the offline queue, carry older times), and applied as Elo
+    steps. A full Rasch refit runs when there is no model yet, on `force`, when
+    attempts disappeared, or once the incremental updates exceed REFIT_FRACTION of
+    the fitted attempts.
+    """
+    path = attempts_root / MODEL_NAME
+    model = None if force else load_model(path)
+    if model is None or not isinstance(model.get("pairs"), dict):
+        return refit_class(attempts_root, tab)
+    users = tab.labels.get("user", [])
+    cases = tab.labels.get("case", [])
+    trials, passes = pair_counts(tab)
+    pairs = model["pairs"]
+    new = []  # (user, case, new attempts, new passes)
+    for u, c in zip(*np.nonzero(trials)):
+        done_t, done_p = (pairs.get(_pair_key(users[u], cases[c])) or [0, 0])[:2]
+        k, kp = int(trials[u, c]) - int(done_t), int(passes[u, c]) - int(done_p)
+        if k < 0 or kp < 0 or kp > k:
+            return refit_class(attempts_root, tab)  # attempts were removed or rewritten
+        if k:
+            new.append((users[u], cases[c], k, kp))
+    n_new = sum(x[2] for x in new)
+    fitted = max(1, int(model.get("fitted_attempts", 0)))
+    if int(model.get("pending_updates", 0)) + n_new > REFIT_FRACTION * fitted:
+        return refit_class(attempts_root, tab)
+    if n_new == 0:
+        return model
+    for user, case_id, k, kp in new:
+        if case_id:
+            for i in range(k):  # spread the passes evenly over the new attempts
+                update_attempt(model, user, case_id, (i + 1) * kp // k > i * kp // k)
+        done = pairs.setdefault(_pair_key(user, case_id), [0, 0])
+        done[0], done[1] = int(done[0]) + k, int(done[1]) + kp
+    try:
+        save_model(path, model)
+    except Exception:
+        pass
+    return model
@@ -0,0 +1,171 @@
+# lt_store.py — content-addressed local blob store (SHA-256), hardlinked into case folders
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import lt_core as core
+from lt_utils import tmp_sibling
+
+_CHUNK = 1024 * 1024
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def blob_path(sha: str) -> Path:
+    sha = str(sha or "").lower()
+    return core.BLOB_STORE / sha[:2] / sha
+
+
+def has(sha: Optional[str]) -> bool:
+    return bool(sha) and blob_path(str(sha)).exists()
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = tmp_sibling(dest, ".lnk")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except Exception:
+        shutil.copy2(src, tmp)
+    try:
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def unlink(path: Path) -> None:
+    """Remove one name of a possibly hardlinked, read-only file (case volumes share blobs).
+
+    The mode belongs to the file, not the name, so it is only touched where deleting a
+    read-only file fails (Windows); the blob it shared storage with is made read-only again.
+    """
+    try:
+        path.unlink(missing_ok=True)
+        return
+    except PermissionError:
+        if os.name != "nt":
+            raise
+    shared = sha256_file(path) if path.stat().st_nlink > 1 else ""
+    os.chmod(path, 0o644)
+    path.unlink()
+    if shared and has(shared):
+        os.chmod(blob_path(shared), 0o444)
+
+
+def link_into(sha: str, dest: Path) -> bool:
+    """Materialise blob `sha` at `dest` (hardlink, copy fallback). False if the blob is unknown."""
+    b = blob_path(sha)
+    if not b.exists():
+        return False
+    try:
+        if dest.exists() and os.path.samefile(b, dest):
+            return True
+    except Exception:
+        pass
+    _link_or_copy(b, dest)
+    return True
+
+
+def adopt(path: Path, sha: Optional[str] = None) -> Optional[str]:
+    """Make `path` share storage with the blob store.
+
+    If the blob is new, the file itself is linked into the store; if an identical
+    blob already exists, `path` is replaced by a link to it. Returns the SHA-256.
+    """
+    try:
+        if not path.exists():
+            return None
+        sha = (sha or sha256_file(path)).lower()
+        b = blob_path(sha)
+        if not b.exists():
+            _link_or_copy(path, b)
+            try:
+                os.chmod(b, 0o444)
+            except Exception:
+                pass
+        elif not os.path.samefile(b, path):
+            _link_or_copy(b, path)
+        return sha
+    except Exception:
+        return None
+
+
+def import_file(src: Path, dest: Path) -> Optional[str]:
+    """Copy `src` into the store (once) and link it to `dest`. Returns the SHA-256."""
+    sha = sha256_file(src).lower()
+    if not has(sha):
+        b = blob_path(sha)
+        b.parent.mkdir(parents=True, exist_ok=True)
+        tmp = tmp_sibling(b)
+        shutil.copy2(src, tmp)
+        os.replace(tmp, b)
+        try:
+            os.chmod(b, 0o444)
+        except Exception:
+            pass
+    if not link_into(sha, dest):
+        shutil.copy2(src, dest)
+    return sha
+
+
+_hardlinks: Optional[bool] = None
+
+
+def hardlinks_ok() -> bool:
+    """Whether blobs can be hardlinked into the case folders (probed once per process)."""
+    global _hardlinks
+    if _hardlinks is None:
+        ok = True
+        try:
+            core.BLOB_STORE.mkdir(parents=True, exist_ok=True)
+            probe = tmp_sibling(core.BLOB_STORE / "probe", ".tmp")
+            probe.write_bytes(b"")
+            try:
+                for d in (core.WORKSPACE, core.LOCAL_CASES):
+                    d.mkdir(parents=True, exist_ok=True)
+                    link = tmp_sibling(d / "probe", ".lnk")
+                    try:
+                        os.link(probe, link)
+                    except Exception:
+                        ok = False
+                    finally:
+                        link.unlink(missing_ok=True)
+            finally:
+                probe.unlink(missing_ok=True)
+        except Exception:
+            ok = False
+        _hardlinks = ok
+    return _hardlinks
+
+
+def gc() -> int:
+    """Remove blobs no case folder links to any more (link count 1). Returns bytes freed.
+
+    Without hard links (_link_or_copy fell back to copies) every blob has link count 1,
+    so references cannot be told apart and nothing is removed; the blobs still serve
+    re-fetching evicted cases offline.
+    """
+    freed = 0
+    if not core.BLOB_STORE.exists() or not hardlinks_ok():
+        return 0
+    for b in core.BLOB_STORE.glob("*/*"):
+        try:
+            st = b.stat()
+            if b.is_file() and st.st_nlink <= 1:
+                os.chmod(b, 0o644)
+                b.unlink()
+                freed += int(st.st_size)
+        except Exception:
+            pass
+    return freed
@@ -6,13 +6,10 @@ import json
 import platform
 import shutil
 import tempfile
-import urllib.request
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
-from packaging.version import Version, InvalidVersion
-
 import lt_core as core
 
 
@@ -33,6 +30,7 @@ def _sha256_file(path: Path) -> str:
 
 
 def _fetch_json(url: str, timeout: int = 10) -> dict:
+    import urllib.request
     req = urllib.request.Request(url, headers={"User-Agent": "SegLabUpdater/1.0"})
     with urllib.request.urlopen(req, timeout=timeout) as r:
         raw = r.read()
@@ -49,6 +47,7 @@ def _platform_key() -> str:
 
 
 def check_for_update(update_json_url: str, current_version: str) -> Optional[UpdateInfo]:
+    from packaging.version import Version, InvalidVersion
     data = _fetch_json(update_json_url)
     latest = str(data.get("version") or "").strip()
     notes = str(data.get("notes") or "").strip()
@@ -83,6 +82,7 @@ def download_update(info: UpdateInfo) -> Path:
     fd, tmp = tempfile.mkstemp(prefix="seglab_update_", suffix=".zip")
     Path(tmp).unlink(missing_ok=True)
 
+    import urllib.request
     req = urllib.request.Request(info.url, headers={"User-Agent": "SegLabUpdater/1.0"})
     with urllib.request.urlopen(req, timeout=60) as r, open(tmp, "wb") as f:
         shutil.copyfileobj(r, f)
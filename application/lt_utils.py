@@ -1,11 +1,15 @@
 from __future__ import annotations
-import os, sys, subprocess, time
+import os, sys, subprocess, threading, time
 from pathlib import Path
 import lt_core as core
 
 def now_ts() -> str:
     return time.strftime("%Y-%m-%d_%H%M%S")
 
+def tmp_sibling(dest: Path, ext: str = ".part") -> Path:
+    """Temp path next to `dest`, unique per process and thread (two writers never share it)."""
+    return dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}{ext}")
+
 def open_default(path: Path) -> None:
     try:
         if sys.platform == "darwin":
@@ -0,0 +1,236 @@
+# lt_workspace.py — last-access tracking + size-budgeted LRU eviction of synced case volumes
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import lt_core as core
+import lt_case
+import lt_share as share
+import lt_store as store
+
+ACCESS_PATH = core.USER_DATA / "workspace_access.json"
+EVICTED_MARKER = ".evicted"
+VOLUME_FILES = ("t1.nii.gz", "gold.nii.gz")
+SHA_KEYS = {"t1.nii.gz": "t1_sha256", "gold.nii.gz": "gold_sha256"}  # case.json keys naming each volume's blob
+DEFAULT_BUDGET_MB = 20_000
+
+_refetch_locks: Dict[str, Any] = {}  # case dir -> RLock (re-entrant: ensure_local -> refetch)
+_refetch_guard = threading.Lock()
+
+
+def _load_access() -> Dict[str, float]:
+    try:
+        if ACCESS_PATH.exists():
+            d = json.loads(ACCESS_PATH.read_text(encoding="utf-8"))
+            return {str(k): float(v) for k, v in d.items()} if isinstance(d, dict) else {}
+    except Exception:
+        pass
+    return {}
+
+
+def _save_access(d: Dict[str, float]) -> None:
+    try:
+        tmp = ACCESS_PATH.with_name(ACCESS_PATH.name + ".tmp")
+        tmp.write_text(json.dumps(d, indent=2), encoding="utf-8")
+        os.replace(tmp, ACCESS_PATH)
+    except Exception:
+        pass
+
+
+def touch(case_dir: Path) -> None:
+    """Record an access (editor launch / evaluation) for LRU ordering."""
+    d = _load_access()
+    d[case_dir.name] = time.time()
+    _save_access(d)
+
+
+def budget_bytes() -> int:
+    try:
+        mb = core.cfg_int("workspace_budget_mb", DEFAULT_BUDGET_MB)
+    except Exception:
+        mb = DEFAULT_BUDGET_MB
+    return max(0, mb) * 1024 * 1024
+
+
+def record_blobs(case_dir: Path, shas: Dict[str, Optional[str]]) -> None:
+    """Note the blob behind each volume ({file: sha256}) in case.json, so an evicted case
+    can be re-linked from the blob store without the share. Needs an existing case.json."""
+    p = case_dir / "case.json"
+    try:
+        meta = json.loads(p.read_text(encoding="utf-8"))
+        new = {SHA_KEYS[fn]: str(sha) for fn, sha in shas.items() if sha and fn in SHA_KEYS}
+        if not isinstance(meta, dict) or all(meta.get(k) == v for k, v in new.items()):
+            return
+        meta.update(new)
+        tmp = p.with_name(p.name + ".tmp")
+        tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        os.replace(tmp, p)
+    except Exception:
+        pass
+
+
+def is_evicted(case_dir: Path) -> bool:
+    return (case_dir / EVICTED_MARKER).exists()
+
+
+def _volumes(case_dir: Path) -> List[Tuple[Path, os.stat_result]]:
+    out = []
+    for fn in VOLUME_FILES:
+        p = case_dir / fn
+        try:
+            out.append((p, p.stat()))
+        except Exception:
+            pass
+    return out
+
+
+def usage() -> Tuple[int, List[Path]]:
+    """Bytes held by workspace volumes (hardlinked blobs counted once) and resident case dirs."""
+    seen = set()
+    total = 0
+    resident: List[Path] = []
+    if not core.WORKSPACE.exists():
+        return 0, resident
+    for d in core.WORKSPACE.iterdir():
+        if not d.is_dir() or is_evicted(d):
+            continue
+        vols = _volumes(d)
+        if vols:
+            resident.append(d)
+        for _, st in vols:
+            key = (st.st_dev, st.st_ino)
+            if key not in seen:
+                seen.add(key)
+                total += int(st.st_size)
+    return total, resident
+
+
+def evict(case_dir: Path) -> int:
+    """Drop a synced case's T1/gold volumes; case.json, student mask and attempts are kept."""
+    freed = 0
+    for p, st in _volumes(case_dir):
+        try:
+            store.unlink(p)
+            freed += int(st.st_size) if st.st_nlink <= 1 else 0
+        except Exception:
+            pass
+    try:
+        (case_dir / EVICTED_MARKER).write_text(time.strftime("%Y-%m-%d_%H%M%S"), encoding="utf-8")
+    except Exception:
+        pass
+    lt_case.index_update(case_dir)
+    return freed
+
+
+def enforce_budget(keep: Optional[Path] = None) -> int:
+    """Evict least-recently-used workspace cases until volumes fit the configured budget.
+
+    Only WORKSPACE (synced classroom) cases are evicted; locally imported cases
+    cannot be re-fetched and are never touched. Returns the number of cases evicted.
+    """
+    budget = budget_bytes()
+    if budget <= 0:
+        return 0
+    total, resident = usage()
+    if total <= budget:
+        return 0
+    access = _load_access()
+
+    def last_used(d: Path) -> float:
+        if d.name in access:
+            return access[d.name]
+        try:
+            return (d / "case.json").stat().st_mtime
+        except Exception:
+            return 0.0
+
+    n = 0
+    for d in sorted(resident, key=last_used):
+        if keep is not None and d.name == keep.name:
+            continue
+        evict(d)
+        n += 1
+        total, _ = usage()
+        if total <= budget:
+            break
+    if n:
+        store.gc()
+    return n
+
+
+def _case_lock(case_dir: Path):
+    with _refetch_guard:
+        return _refetch_locks.setdefault(str(case_dir), threading.RLock())
+
+
+def ensure_local(c, share_root: Optional[Union[Path, str]], class_code: str) -> bool:
+    """Re-fetch an evicted case row (prefetch thread or UI) and clear its `evicted` flag."""
+    with _case_lock(c.case_dir):
+        if not c.evicted:
+            return True
+        if not refetch(c.case_dir, share_root, class_code):
+            return False
+        c.evicted = False
+        return True
+
+
+def refetch(case_dir: Path, share_root: Optional[Union[Path, str]], class_code: str) -> bool:
+    """Restore an evicted case's volumes from the blob store, the class bundle or the share (folder or server).
+
+    Serialised per case, so the prefetch thread and the UI never restore the same case at once.
+    """
+    with _case_lock(case_dir):
+        try:
+            return _refetch(case_dir, share_root, class_code)
+        except Exception:
+            return False
+
+
+def _refetch(case_dir: Path, share_root: Optional[Union[Path, str]], class_code: str) -> bool:
+    meta: Dict[str, str] = {}
+    try:
+        meta = json.loads((case_dir / "case.json").read_text(encoding="utf-8"))
+    except Exception:
+        pass
+    for fn, key in SHA_KEYS.items():
+        if not (case_dir / fn).exists() and isinstance(meta, dict) and meta.get(key):
+            store.link_into(str(meta.get(key)), case_dir / fn)
+
+    if share_root and class_code and not all((case_dir / fn).exists() for fn in VOLUME_FILES):
+        try:
+            idx = share.bundle_index(share_root, class_code)
+        except Exception:
+            idx = None
+        if idx and case_dir.name in (idx.get("cases") or []):
+            for m in idx.get("members") or []:
+                if m.get("case") == case_dir.name and m.get("file") in VOLUME_FILES and not (case_dir / str(m.get("file"))).exists():
+                    store.link_into(str(m.get("sha256") or ""), case_dir / str(m.get("file")))
+            try:
+                share.extract_bundle(
+                    share_root, class_code, idx, core.WORKSPACE,
+                    want=lambda m: m.get("case") == case_dir.name and m.get("file") in VOLUME_FILES
+                    and not (case_dir / str(m.get("file"))).exists(),
+                )
+            except Exception:
+                pass
+        try:
+            share.fetch_case(share_root, class_code, case_dir.name, case_dir,
+                             files=[fn for fn in VOLUME_FILES if not (case_dir / fn).exists()])
+        except Exception:
+            pass
+
+    if not all((case_dir / fn).exists() for fn in VOLUME_FILES):
+        return False
+    record_blobs(case_dir, {fn: store.adopt(case_dir / fn) for fn in VOLUME_FILES})
+    try:
+        os.chmod(case_dir / "gold.nii.gz", 0o444)
+    except Exception:
+        pass
+    (case_dir / EVICTED_MARKER).unlink(missing_ok=True)
+    lt_case.index_update(case_dir)
+    return True
@@ -2,36 +2,45 @@
 # startt_trainer.py — modular LT Trainer client (offline + SMB classroom)
 
 from __future__ import annotations
-import os, sys
+import os, sys, time
+_T0 = time.perf_counter()
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 
 if sys.platform == "darwin":
     os.environ.setdefault("QT_MAC_WANTS_LAYER", "1")
     os.environ.setdefault("OBJC_DISABLE_INITIALIZE_FORK_SAFETY", "YES")
 
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QListWidget, QListWidgetItem, QStackedWidget, QMessageBox
 )
 
 import lt_core as core
+import lt_outbox as outbox
+import lt_perf as perf
 import lt_style as style
 import lt_share as share
 
 from ui.widgets import pill, btn
-from ui.pages_gate import GatePage
-from ui.pages_dashboard import DashboardPage
-from ui.pages_connect import ConnectPage
-from ui.pages_materials import MaterialsPage
-from ui.pages_practice import PracticePage
-from ui.pages_progress import ProgressPage
-from ui.pages_teacher import TeacherPage
-from ui.pages_teacher_dash import TeacherDashboardPage
-from ui.pages_settings import SettingsPage
 
 NAV = ["Gate","Dashboard","Connect","Materials","Practice","Progress","Teacher","Teacher Dashboard","Settings"]
 
+# Page registry: module + class, imported and constructed on first navigation so
+# startup only pays for the Gate page (numpy/nibabel/urllib load with the pages that use them).
+PAGES = {
+    "Gate": ("ui.pages_gate", "GatePage"),
+    "Dashboard": ("ui.pages_dashboard", "DashboardPage"),
+    "Connect": ("ui.pages_connect", "ConnectPage"),
+    "Materials": ("ui.pages_materials", "MaterialsPage"),
+    "Practice": ("ui.pages_practice", "PracticePage"),
+    "Progress": ("ui.pages_progress", "ProgressPage"),
+    "Teacher": ("ui.pages_teacher", "TeacherPage"),
+    "Teacher Dashboard": ("ui.pages_teacher_dash", "TeacherDashboardPage"),
+    "Settings": ("ui.pages_settings", "SettingsPage"),
+}
+
 class AppWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -41,13 +50,13 @@ class AppWindow(QMainWindow):
         self.resize(1440, 840)
 
         self.mode: str = "gate"   # gate|solo|student|teacher
-        self.username: str = str(core.cfg_get("username","student") or "student")
-        self.share_root: Optional[Path] = None
-        self.class_code: str = str(core.cfg_get("class_code","") or "")
+        self.username: str = core.cfg_str("username") or "student"
+        self.share_root: Optional[Union[Path, str]] = None  # share folder or classroom server URL
+        self.class_code: str = core.cfg_str("class_code")
         self.locked_policy: Optional[Dict[str,Any]] = None
 
-        self.solo_min_voxels = int(core.cfg_get("solo_min_voxels", core.DEFAULT_MIN_VOXELS))
-        self.solo_tolerance = int(core.cfg_get("solo_tolerance", core.DEFAULT_TOLERANCE))
+        self.solo_min_voxels = core.cfg_int("solo_min_voxels", core.DEFAULT_MIN_VOXELS)
+        self.solo_tolerance = core.cfg_int("solo_tolerance", core.DEFAULT_TOLERANCE)
 
         root = QWidget(); self.setCentralWidget(root)
         outer = QVBoxLayout(root); outer.setContentsMargins(14,14,14,14); outer.setSpacing(12)
@@ -60,7 +69,8 @@ class AppWindow(QMainWindow):
         self.p_mode = pill("GATE")
         self.p_class = pill("NO CLASS")
         self.p_user = pill("USER")
-        tb.addWidget(self.p_mode); tb.addWidget(self.p_class); tb.addWidget(self.p_user)
+        self.p_sync = pill("SYNCED")
+        tb.addWidget(self.p_mode); tb.addWidget(self.p_class); tb.addWidget(self.p_user); tb.addWidget(self.p_sync)
 
         self.b_gate = btn("Gate","ghost")
         self.b_solo = btn("Solo","ghost")
@@ -86,19 +96,9 @@ class AppWindow(QMainWindow):
         self.stack = QStackedWidget()
         main.addWidget(self.stack, 1)
 
-        self.pages = {
-            "Gate": GatePage(self),
-            "Dashboard": DashboardPage(self),
-            "Connect": ConnectPage(self),
-            "Materials": MaterialsPage(self),
-            "Practice": PracticePage(self),
-            "Progress": ProgressPage(self),
-            "Teacher": TeacherPage(self),
-            "Teacher Dashboard": TeacherDashboardPage(self),
-            "Settings": SettingsPage(self),
-        }
+        self.pages: Dict[str, QWidget] = {}
         for name in NAV:
-            self.stack.addWidget(self.pages[name])
+            self.stack.addWidget(QWidget())  # placeholder until first shown
 
         app = QApplication.instance()
         if app is not None:
@@ -107,12 +107,36 @@ class AppWindow(QMainWindow):
         self.goto("Gate")
         self.refresh_all()
 
+        # attempts are queued locally and uploaded in the background (see lt_outbox)
+        outbox.start()
+        self._sync_timer = QTimer(self)
+        self._sync_timer.timeout.connect(self._update_sync_pill)
+        self._sync_timer.start(2000)
+        self._update_sync_pill()
+
     def toast(self, msg: str):
         try:
             self.statusBar().showMessage(str(msg or ""), 4500)
         except Exception:
             pass
 
+    def _update_sync_pill(self):
+        try:
+            st = outbox.status()
+            n = int(st.get("pending", 0))
+            if not n:
+                self.p_sync.setText("SYNCED")
+                self.p_sync.setToolTip("All attempts are saved to the class folder.")
+            elif st.get("last_error"):
+                wait = max(0, int(float(st.get("next_try") or 0) - time.time()))
+                self.p_sync.setText(f"OFFLINE · {n} QUEUED")
+                self.p_sync.setToolTip(f"Saved locally, will upload when the share is back (retry in {wait}s).\n{st['last_error']}")
+            else:
+                self.p_sync.setText(f"SYNCING · {n}")
+                self.p_sync.setToolTip("Saved locally, uploading…")
+        except Exception:
+            pass
+
     def quit_for_update(self):
         try:
             self.close()
@@ -126,9 +150,17 @@ class AppWindow(QMainWindow):
     def attempts_dir(self) -> Path:
         uname = self.username or "student"
         if self.mode == "student" and self.share_root and self.class_code:
+            if share.is_remote(self.share_root):
+                return core.LOCAL_PROGRESS / "classrooms" / self.class_code / uname  # local mirror, uploaded by the outbox
             return share.attempts_root(self.share_root, self.class_code) / uname
         return core.LOCAL_PROGRESS / uname
 
+    def attempt_upload(self) -> Optional[Dict[str, str]]:
+        """Server target for queued attempts when the classroom is an http(s) URL."""
+        if self.mode == "student" and self.class_code and share.is_remote(self.share_root):
+            return {"root": str(self.share_root), "code": self.class_code, "user": self.username or "student"}
+        return None
+
     def _update_nav_visibility(self):
         if self.mode == "gate":
             visible = {"Gate","Dashboard","Materials","Connect","Teacher"}
@@ -146,6 +178,23 @@ class AppWindow(QMainWindow):
             if it:
                 it.setHidden(it.text() not in visible)
 
+    def page(self, name: str) -> Optional[QWidget]:
+        """Construct a page on first use and swap it in for its placeholder."""
+        p = self.pages.get(name)
+        if p is not None or name not in PAGES:
+            return p
+        import importlib
+        mod, cls = PAGES[name]
+        p = getattr(importlib.import_module(mod), cls)(self)
+        i = NAV.index(name)
+        old = self.stack.widget(i)
+        self.stack.insertWidget(i, p)
+        if old is not None:
+            self.stack.removeWidget(old)
+            old.deleteLater()
+        self.pages[name] = p
+        return p
+
     def refresh_all(self):
         self.p_mode.setText(self.mode.upper())
         self.p_user.setText((self.username or "USER").upper())
@@ -174,8 +223,8 @@ class AppWindow(QMainWindow):
         name = it.text()
         if name not in NAV:
             return
+        p = self.page(name)
         self.stack.setCurrentIndex(NAV.index(name))
-        p = self.pages.get(name)
         if p and hasattr(p, "refresh"):
             try:
                 p.refresh()
@@ -194,7 +243,7 @@ class AppWindow(QMainWindow):
         self.mode = "teacher"
         self.share_root = share_root
         core.cfg_set("share_root", str(share_root))
-        cc = str(core.cfg_get("class_code","") or "")
+        cc = core.cfg_str("class_code")
         if cc and share.class_exists(share_root, cc):
             self.class_code = cc
             self.locked_policy = share.policy_load(share_root, cc)
@@ -205,14 +254,26 @@ class AppWindow(QMainWindow):
         self.goto("Dashboard")
 
     def join_classroom(self, share_path: str, class_code: str, username: str):
-        p = Path(share_path).expanduser()
-        if not p.exists():
-            QMessageBox.critical(self, core.APP_NAME, f"Mounted share path does not exist:\n{p}")
-            return
-
-        root = share.resolve_share_root(p)
         code = class_code
-        share.ensure_classroom(root, code)
+        if share.is_remote(share_path):
+            root = share_path.strip().rstrip("/")
+            try:
+                man = share.class_manifest(root, code)
+            except Exception as e:
+                QMessageBox.critical(self, core.APP_NAME, f"Classroom server not reachable:\n{root}\n\n{e}")
+                return
+            if man is None:
+                QMessageBox.critical(self, core.APP_NAME, f"No classroom {code} on:\n{root}")
+                return
+            policy = man.get("policy") or {}
+        else:
+            p = Path(share_path).expanduser()
+            if not p.exists():
+                QMessageBox.critical(self, core.APP_NAME, f"Mounted share path does not exist:\n{p}")
+                return
+            root = share.resolve_share_root(p)
+            share.ensure_classroom(root, code)
+            policy = share.policy_load(root, code)
 
         self.share_root = root
         self.username = (username or "student").strip() or "student"
@@ -222,7 +283,7 @@ class AppWindow(QMainWindow):
         core.cfg_set("share_root", str(root))
         core.cfg_set("class_code", code)
 
-        self.locked_policy = share.policy_load(root, code) or {
+        self.locked_policy = policy or {
             "min_voxels": core.DEFAULT_MIN_VOXELS,
             "tolerance": core.DEFAULT_TOLERANCE,
             "session": "practice",
@@ -236,7 +297,10 @@ def main():
     app = QApplication(sys.argv)
     w = AppWindow()
     w.show()
+    QTimer.singleShot(0, lambda: perf.record("startup", (time.perf_counter() - _T0) * 1000.0))
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # re-evaluation pool workers in frozen builds
     main()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+from typing import Any, Callable, List, Optional, Sequence
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+
+SORT_ROLE = Qt.UserRole + 1
+
+
+class ArrayTableModel(QAbstractTableModel):
+    """Read-only table over column arrays (NumPy or lists).
+
+    Cells are formatted only when the view asks for them; SORT_ROLE returns the
+    raw value so a proxy sorts numerically.
+    """
+
+    def __init__(self, headers: Sequence[str], formats: Optional[Sequence[Callable[[Any], str]]] = None, parent=None):
+        super().__init__(parent)
+        self._headers = list(headers)
+        self._formats = list(formats) if formats else [str] * len(self._headers)
+        self._cols: List[Sequence[Any]] = [[] for _ in self._headers]
+        self._n = 0
+
+    def set_columns(self, cols: Sequence[Sequence[Any]]) -> None:
+        self.beginResetModel()
+        self._cols = list(cols)
+        self._n = len(self._cols[0]) if self._cols else 0
+        self.endResetModel()
+
+    def clear(self) -> None:
+        self.set_columns([[] for _ in self._headers])
+
+    def value(self, row: int, col: int) -> Any:
+        v = self._cols[col][row]
+        return v.item() if hasattr(v, "item") else v
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._n
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            try:
+                return self._formats[index.column()](self.value(index.row(), index.column()))
+            except Exception:
+                return ""
+        if role == SORT_ROLE:
+            return self.value(index.row(), index.column())
+        if role == Qt.TextAlignmentRole and index.column() > 0:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._headers[section]
+        return None
+
+
+def sorted_proxy(model: QAbstractTableModel, parent=None) -> QSortFilterProxyModel:
+    """Proxy that sorts on SORT_ROLE and filters column 0 case-insensitively."""
+    px = QSortFilterProxyModel(parent)
+    px.setSourceModel(model)
+    px.setSortRole(SORT_ROLE)
+    px.setFilterKeyColumn(0)
+    px.setFilterCaseSensitivity(Qt.CaseInsensitive)
+    return px
@@ -17,11 +17,12 @@ class ConnectPage(QWidget):
         v.addWidget(muted(r"""This uses the mounted SMB folder path (NOT smb://...).
 Mount first, then select the mounted folder.
 macOS: /Volumes/Hummel-Lab/...   Windows: X:\\...
+Or enter a classroom server address: http://host:8765
 """))
 
         self.ed_share = QLineEdit()
-        self.ed_share.setPlaceholderText("Mounted folder path (e.g. /Volumes/Hummel-Lab/LTTrainer)")
-        self.ed_share.setText(str(core.cfg_get("share_root", "") or ""))
+        self.ed_share.setPlaceholderText("Mounted folder path (e.g. /Volumes/Hummel-Lab/LTTrainer) or http://server:8765")
+        self.ed_share.setText(core.cfg_str("share_root"))
 
         tools = QHBoxLayout()
         tools.setSpacing(10)
@@ -35,11 +36,11 @@ macOS: /Volumes/Hummel-Lab/...   Windows: X:\\...
 
         self.ed_code = QLineEdit()
         self.ed_code.setPlaceholderText("Classroom code (teacher provides it)")
-        self.ed_code.setText(str(core.cfg_get("class_code", "") or ""))
+        self.ed_code.setText(core.cfg_str("class_code"))
 
         self.ed_name = QLineEdit()
         self.ed_name.setPlaceholderText("Your name")
-        self.ed_name.setText(str(core.cfg_get("username", "student") or "student"))
+        self.ed_name.setText(core.cfg_str("username") or "student")
 
         v.addWidget(QLabel("Mounted share path"))
         v.addWidget(self.ed_share)
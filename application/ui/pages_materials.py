@@ -3,9 +3,14 @@ from pathlib import Path
 import shutil
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, QFileDialog, QMessageBox
 import lt_core as core
+import lt_perf as perf
+import lt_share as share
 from lt_utils import open_default
 from ui.widgets import btn, h1, muted
 
+PROTECTED_DIR = "materials_protected"
+MATERIALS_CACHE = core.USER_DATA / "materials_cache"  # local copies of protected materials from a classroom server
+
 class MaterialsPage(QWidget):
     def __init__(self, app):
         super().__init__()
@@ -35,8 +40,7 @@ You can also add your own local PDFs/PPTX, and (optionally) protected materials
         self.b_add.clicked.connect(self._add)
         self.b_open.clicked.connect(self._open)
         self.b_folder.clicked.connect(lambda: open_default(core.LOCAL_MATERIALS))
-
-        self.refresh()
+        # first scan happens in refresh() when the page is navigated to
 
     def refresh(self):
         self.list.clear()
@@ -51,10 +55,14 @@ You can also add your own local PDFs/PPTX, and (optionally) protected materials
             items.append(("Local", p))
 
         if self.app.mode in ("student", "teacher") and self.app.share_root and self.app.class_code:
-            prot = self.app.share_root / "classrooms" / self.app.class_code / "materials_protected"
-            if prot.exists():
-                for p in sorted([x for x in prot.iterdir() if x.is_file()], key=lambda x: x.name.lower()):
-                    items.append(("Protected", p))
+            rel = share.class_rel(self.app.class_code, PROTECTED_DIR)
+            with perf.span("share_materials_scan", perf.root_label(self.app.share_root)):
+                try:
+                    for e in share.backend(self.app.share_root).list(rel):
+                        if not e.get("dir"):
+                            items.append(("Protected", f"{rel}/{e['name']}"))
+                except Exception:
+                    pass
 
         if not items:
             self.list.addItem("(no materials)")
@@ -63,7 +71,7 @@ You can also add your own local PDFs/PPTX, and (optionally) protected materials
 
         self._items = items
         for group, p in items:
-            self.list.addItem(f"[{group}] {p.name}")
+            self.list.addItem(f"[{group}] {Path(p).name}")
 
     def _add(self):
         fp, _ = QFileDialog.getOpenFileName(self, "Add material", str(Path.home()), "Docs (*.pdf *.pptx *.ppt);;All files (*)")
@@ -81,6 +89,27 @@ You can also add your own local PDFs/PPTX, and (optionally) protected materials
         it = self.list.currentRow()
         if it < 0 or it >= len(getattr(self, "_items", [])):
             return
-        _, p = self._items[it]
+        group, p = self._items[it]
+        if group == "Protected":
+            p = self._protected_path(p)
+            if p is None:
+                QMessageBox.critical(self, core.APP_NAME, "Could not fetch this material from the classroom.")
+                return
         if p.exists():
             open_default(p)
+
+    def _protected_path(self, rel: str):
+        """Native path on a mounted share; otherwise a local copy, refreshed when the size/mtime changes."""
+        b = share.backend(self.app.share_root)
+        if not share.is_remote(self.app.share_root):
+            return b.path(rel)
+        dest = MATERIALS_CACHE / self.app.class_code / Path(rel).name
+        try:
+            st = b.stat(rel)
+            if st is None:
+                return None
+            if not dest.exists() or dest.stat().st_size != st["size"] or dest.stat().st_mtime < st["mtime"]:
+                b.download(rel, dest)
+            return dest
+        except Exception:
+            return dest if dest.exists() else None
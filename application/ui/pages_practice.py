@@ -1,21 +1,145 @@
 from __future__ import annotations
-import json, shutil, uuid, re
+import json, os, shutil, uuid, re
 from pathlib import Path
-from typing import Dict, Any, List, Optional
-from PySide6.QtCore import QTimer
+from typing import Dict, Any, List, Optional, Tuple
+from PySide6.QtCore import Qt, QTimer, QAbstractTableModel, QModelIndex, QEvent, QRect, Signal
+from PySide6.QtGui import QColor, QPainter, QPen
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView, QStyledItemDelegate,
     QHeaderView, QAbstractItemView, QFileDialog, QMessageBox
 )
 
+import lt_attemptlog as attemptlog
 import lt_core as core
 import lt_share as share
+import lt_store as store
+import lt_maskcodec as maskcodec
+import lt_outbox as outbox
+import lt_workspace as workspace
+import lt_perf as perf
+import lt_profile as profile
+from lt_prefetch import Prefetcher
 from lt_utils import now_ts, open_default
-from lt_eval import validate_pair, make_blank_student_mask, evaluate_masks, write_attempt
+from lt_eval import validate_pair, make_blank_student_mask, evaluate_masks
 from lt_editor import launch as launch_editor
-from lt_case import list_cases, set_readonly, write_case, CaseRow
+from lt_case import list_cases, set_readonly, write_case, index_update, CaseRow
 from ui.widgets import btn, h1, muted
 
+COLUMNS = ["Case","Src","T1","Gold","Student","Status","Action"]
+ACTION_COL = 6
+
+
+class CaseTableModel(QAbstractTableModel):
+    """Practice cases as a model; the view only asks for the rows it shows."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[CaseRow] = []
+        self._cells: List[tuple] = []
+        self.results: Dict[str, str] = {}  # case_id -> last evaluation summary (this session)
+
+    def _row_cells(self, c: CaseRow) -> tuple:
+        has_student = (not c.evicted) and c.student.exists()
+        if c.evicted:
+            status = "EVICTED"
+        elif c.case_id in self.results:
+            status = self.results[c.case_id]
+        else:
+            status = "HAS STUDENT MASK" if has_student else "READY"
+        return (c.case_id, c.source, str(c.t1), str(c.gold), str(c.student) if has_student else "—", status, "Test case")
+
+    def set_rows(self, rows: List[CaseRow]) -> None:
+        cells = [self._row_cells(c) for c in rows]
+        if [c.case_id for c in rows] != [c.case_id for c in self._rows]:
+            self.beginResetModel()
+            self._rows, self._cells = rows, cells
+            self.endResetModel()
+            return
+        old = self._cells
+        self._rows, self._cells = rows, cells
+        for r, (a, b) in enumerate(zip(old, cells)):
+            if a != b:
+                self.dataChanged.emit(self.index(r, 0), self.index(r, len(COLUMNS) - 1))
+
+    def update_case(self, case_id: str) -> None:
+        for r, c in enumerate(self._rows):
+            if c.case_id == case_id:
+                cells = self._row_cells(c)
+                if cells != self._cells[r]:
+                    self._cells[r] = cells
+                    self.dataChanged.emit(self.index(r, 0), self.index(r, len(COLUMNS) - 1))
+                return
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._cells)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self._cells[index.row()][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return None
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Paints a ghost-style button in a cell and reports clicks by row."""
+    clicked = Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._hover_row = -1
+        self._pressed_row = -1
+
+    def _button_rect(self, option) -> QRect:
+        w = option.fontMetrics.horizontalAdvance("Test case") + 36
+        h = 36
+        r = option.rect
+        return QRect(r.left() + 6, r.top() + (r.height() - h) // 2, min(w, r.width() - 12), h)
+
+    def paint(self, painter: QPainter, option, index):
+        br = self._button_rect(option)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        hot = index.row() == self._hover_row
+        painter.setPen(QPen(QColor(core.STROKE), 1))
+        painter.setBrush(QColor(core.BTN_H if hot else core.BTN))
+        painter.drawRoundedRect(br, 12, 12)
+        painter.setPen(QColor(core.TEXT))
+        painter.drawText(br, Qt.AlignCenter, str(index.data() or ""))
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        s = super().sizeHint(option, index)
+        s.setWidth(option.fontMetrics.horizontalAdvance("Test case") + 48)
+        return s
+
+    def editorEvent(self, event, model, option, index):
+        t = event.type()
+        if t == QEvent.MouseMove:
+            row = index.row() if self._button_rect(option).contains(event.position().toPoint()) else -1
+            if row != self._hover_row:
+                self._hover_row = row
+                if option.widget is not None:
+                    option.widget.viewport().update()
+            return False
+        if t == QEvent.MouseButtonPress and self._button_rect(option).contains(event.position().toPoint()):
+            self._pressed_row = index.row()
+            return False
+        if t == QEvent.MouseButtonRelease:
+            hit = self._button_rect(option).contains(event.position().toPoint()) and self._pressed_row == index.row()
+            self._pressed_row = -1
+            if hit:
+                self.clicked.emit(index.row())
+                return True
+        return False
+
+
 class PracticePage(QWidget):
     def __init__(self, app):
         super().__init__()
@@ -62,20 +186,28 @@ class PracticePage(QWidget):
         self.btn_pick_t1.clicked.connect(self._pick_pending_t1)
         self.btn_pick_gold.clicked.connect(self._pick_pending_gold)
         self.btn_save_pending.clicked.connect(self._save_pending_case)
-        self.btn_batch.clicked.connect(self._batch_import)
-
-        self.table = QTableWidget(0, 7)
-        self.table.setHorizontalHeaderLabels(["Case","Src","T1","Gold","Student","Status","Action"])
-        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
-        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
-        self.table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
-        self.table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(6, QHeaderView.ResizeToContents)
+        self.btn_batch.clicked.connect(lambda: self._batch_import())
+
+        self.model = CaseTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.delegate = ButtonDelegate(self.table)
+        self.delegate.clicked.connect(self._on_action_clicked)
+        self.table.setItemDelegateForColumn(ACTION_COL, self.delegate)
+        self.table.setMouseTracking(True)
+        hh = self.table.horizontalHeader()
+        hh.setResizeContentsPrecision(200)  # size columns from a sample, not every row
+        hh.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        hh.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        hh.setSectionResizeMode(2, QHeaderView.Stretch)
+        hh.setSectionResizeMode(3, QHeaderView.Stretch)
+        hh.setSectionResizeMode(4, QHeaderView.Stretch)
+        hh.setSectionResizeMode(5, QHeaderView.ResizeToContents)
+        hh.setSectionResizeMode(6, QHeaderView.ResizeToContents)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.table.verticalHeader().setDefaultSectionSize(56)
         self.table.setWordWrap(False)
         self.table.setShowGrid(False)
@@ -91,18 +223,22 @@ class PracticePage(QWidget):
         row.addStretch(1)
         v.addLayout(row)
 
-        self.b_sync.clicked.connect(self._sync_cases)
+        self.b_sync.clicked.connect(lambda: self._sync_cases())
         self.b_open.clicked.connect(self._open_case_folder)
 
         self._rows: List[CaseRow] = []
         self._last_mtime: Dict[str, float] = {}
+        self._prefetch = Prefetcher()
 
+        # mask polling starts after the page is first painted; the case scan runs in refresh()
         self._timer = QTimer(self)
         self._timer.setInterval(1200)
         self._timer.timeout.connect(self._auto_check_student_masks)
-        self._timer.start()
 
-        self.refresh()
+    def showEvent(self, e):
+        super().showEvent(e)
+        if not self._timer.isActive():
+            QTimer.singleShot(0, self._timer.start)
 
     def _selected(self) -> Optional[CaseRow]:
         sel = self.table.selectionModel().selectedRows()
@@ -113,23 +249,13 @@ class PracticePage(QWidget):
 
     def refresh(self):
         self._rows = list_cases()
-        self.table.setRowCount(0)
-        for c in self._rows:
-            r = self.table.rowCount()
-            self.table.insertRow(r)
-            self.table.setItem(r,0,QTableWidgetItem(c.case_id))
-            self.table.setItem(r,1,QTableWidgetItem(c.source))
-            self.table.setItem(r,2,QTableWidgetItem(str(c.t1)))
-            self.table.setItem(r,3,QTableWidgetItem(str(c.gold)))
-            self.table.setItem(r,4,QTableWidgetItem(str(c.student) if c.student.exists() else "—"))
-            self.table.setItem(r,5,QTableWidgetItem("HAS STUDENT MASK" if c.student.exists() else "READY"))
-            b = btn("Test case","ghost")
-            b.setMinimumHeight(34)
-            b.setFixedHeight(36)
-            b.clicked.connect(lambda _=False, cid=c.case_id: self._test_case(cid))
-            self.table.setCellWidget(r,6,b)
+        self.model.set_rows(self._rows)
         self._update_pending_ui()
 
+    def _on_action_clicked(self, row: int):
+        if 0 <= row < len(self._rows):
+            self._test_case(self._rows[row].case_id)
+
     def _open_case_folder(self):
         c = self._selected()
         if not c:
@@ -198,10 +324,10 @@ class PracticePage(QWidget):
 
         dest = core.LOCAL_CASES / case_id
         dest.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(t1, dest/"t1.nii.gz")
-        shutil.copy2(gold, dest/"gold.nii.gz")
+        t1_sha = store.import_file(t1, dest/"t1.nii.gz")
+        gold_sha = store.import_file(gold, dest/"gold.nii.gz")
         set_readonly(dest/"gold.nii.gz")
-        write_case(dest, case_id, {"origin":"local_upload", **meta})
+        write_case(dest, case_id, {"origin":"local_upload", "t1_sha256": t1_sha, "gold_sha256": gold_sha, **meta})
 
         # Ensure student mask exists
         try:
@@ -217,6 +343,7 @@ class PracticePage(QWidget):
         QMessageBox.information(self, core.APP_NAME, f"Case saved: {case_id}")
         self.refresh()
 
+    @profile.profiled("batch_import")
     def _batch_import(self):
         if getattr(self.app, "mode", "solo") == "student":
             QMessageBox.information(self, core.APP_NAME, "Students cannot add cases in classroom mode.")
@@ -271,10 +398,10 @@ class PracticePage(QWidget):
             case_id = f"{k}_{now_ts()}_{uuid.uuid4().hex[:4]}"
             dest = core.LOCAL_CASES / case_id
             dest.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(t1, dest/"t1.nii.gz")
-            shutil.copy2(gold, dest/"gold.nii.gz")
+            t1_sha = store.import_file(t1, dest/"t1.nii.gz")
+            gold_sha = store.import_file(gold, dest/"gold.nii.gz")
             set_readonly(dest/"gold.nii.gz")
-            write_case(dest, case_id, {"origin":"batch_import", "pair_key": k, **meta})
+            write_case(dest, case_id, {"origin":"batch_import", "pair_key": k, "t1_sha256": t1_sha, "gold_sha256": gold_sha, **meta})
             try:
                 if not (dest/"student.nii.gz").exists():
                     make_blank_student_mask(dest/"t1.nii.gz", dest/"student.nii.gz")
@@ -289,39 +416,172 @@ class PracticePage(QWidget):
         if self.app.mode != "student" or not self.app.share_root or not self.app.class_code:
             QMessageBox.information(self, core.APP_NAME, "Join a classroom first (Connect).")
             return
-        src_cases = share.class_dir(self.app.share_root, self.app.class_code) / "cases"
-        if not src_cases.exists():
-            QMessageBox.critical(self, core.APP_NAME, f"No cases folder:\n{src_cases}")
+        root, code = self.app.share_root, self.app.class_code
+        try:
+            res = self._sync_work(root, code)
+        except Exception as e:
+            QMessageBox.critical(self, core.APP_NAME, f"Classroom not reachable:\n{e}")
+            return
+        if res is None:
+            QMessageBox.critical(self, core.APP_NAME, f"No cases folder for classroom {code} at:\n{root}")
             return
+        copied, evicted = res
+        extra = f"\nEvicted (LRU, over disk budget): {evicted}" if evicted else ""
+        QMessageBox.information(self, core.APP_NAME, f"Synced. New cases copied: {copied}{extra}")
+        self.refresh()
+
+    @profile.profiled("sync_cases")
+    @perf.timed("sync_cases", root=lambda self, root, code: perf.root_label(root))
+    def _sync_work(self, root, code) -> Optional[Tuple[int, int]]:
+        """Manifest, bundle and per-case fetches (no dialogs, so the timing is the sync alone).
+        Returns (cases copied, cases evicted), or None if the classroom has no cases folder."""
+        man = share.class_manifest(root, code)
+        if man is None:
+            return None
         copied = 0
-        for case_folder in sorted([p for p in src_cases.iterdir() if p.is_dir()], key=lambda x: x.name.lower()):
-            dest = core.WORKSPACE / case_folder.name
+
+        # 1) published bundle: one file, read sequentially, only missing members
+        partial: Dict[str, List[str]] = {}
+        extracted: set = set()
+        idx = man.get("bundle")
+        member_shas: Dict[str, Dict[str, str]] = {}
+        if idx:
+            for m in idx.get("members") or []:
+                member_shas.setdefault(str(m.get("case")), {})[str(m.get("file"))] = str(m.get("sha256") or "")
+            try:
+                linked = set()
+                def missing(m) -> bool:
+                    cdir = core.WORKSPACE / str(m.get("case"))
+                    return not (cdir / str(m.get("file"))).exists() and not workspace.is_evicted(cdir)
+
+                for m in idx.get("members") or []:
+                    dest = core.WORKSPACE / str(m.get("case")) / str(m.get("file"))
+                    if m.get("file") != "case.json" and missing(m) and store.link_into(str(m.get("sha256") or ""), dest):
+                        linked.add(str(m.get("case")))
+                touched = share.extract_bundle(root, code, idx, core.WORKSPACE, want=missing)
+                for m in idx.get("members") or []:
+                    if m.get("case") in touched and m.get("file") != "case.json":
+                        store.adopt(core.WORKSPACE / str(m.get("case")) / str(m.get("file")), str(m.get("sha256") or "") or None)
+                for name in linked | set(touched):
+                    set_readonly(core.WORKSPACE / name / "gold.nii.gz")
+                    workspace.record_blobs(core.WORKSPACE / name, member_shas.get(name) or {})
+                    index_update(core.WORKSPACE / name)
+                extracted = linked | set(touched)
+                copied += len(extracted)
+            except Exception:
+                pass
+            # the extraction skips members that fail their size/sha check; such half-filled
+            # cases get their missing files fetched one by one below instead of counting as synced
+            for m in idx.get("members") or []:
+                cdir = core.WORKSPACE / str(m.get("case"))
+                if cdir.exists() and not (cdir / str(m.get("file"))).exists() and not workspace.is_evicted(cdir):
+                    partial.setdefault(cdir.name, []).append(str(m.get("file")))
+
+        # 2) per-case copy for cases uploaded after the bundle was published (or whose
+        #    bundle members all failed); cases whose gold was replaced get the new version
+        for case in sorted(man.get("cases") or [], key=lambda c: str(c.get("case_id")).lower()):
+            case_id = str(case.get("case_id") or "")
+            if not case_id:
+                continue
+            dest = core.WORKSPACE / case_id
+            if case_id in partial:
+                if self._fill_case(root, code, dest, partial[case_id], member_shas.get(case_id) or {}) and case_id not in extracted:
+                    copied += 1
+                continue
             if dest.exists():
+                if self._update_gold(case, dest):
+                    copied += 1
                 continue
+            tmp = core.WORKSPACE / f".{case_id}.part"
             try:
-                shutil.copytree(case_folder, dest)
+                shutil.rmtree(tmp, ignore_errors=True)
+                share.fetch_case(root, code, case_id, tmp)
+                os.replace(tmp, dest)
+                workspace.record_blobs(dest, {fn: store.adopt(dest / fn) for fn in workspace.VOLUME_FILES})
                 set_readonly(dest/"gold.nii.gz")
+                index_update(dest)
                 copied += 1
             except Exception:
-                pass
-        QMessageBox.information(self, core.APP_NAME, f"Synced. New cases copied: {copied}")
-        self.refresh()
+                shutil.rmtree(tmp, ignore_errors=True)
+        return copied, workspace.enforce_budget()
+
+    def _fill_case(self, root, code, dest: Path, files: List[str], shas: Dict[str, str]) -> bool:
+        """Fetch the files a bundle extraction left out of a case folder (`shas`: bundle members)."""
+        tmp = dest / ".fill.part"
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            got = share.fetch_case(root, code, dest.name, tmp, files=tuple(files))
+            shas = dict(shas)
+            for fn in got:
+                os.replace(tmp / fn, dest / fn)
+                if fn != "case.json":
+                    shas[fn] = store.adopt(dest / fn) or ""
+            workspace.record_blobs(dest, {fn: sha for fn, sha in shas.items() if (dest / fn).exists()})
+            set_readonly(dest / "gold.nii.gz")
+            index_update(dest)
+            return len(got) == len(files)
+        except Exception:
+            return False
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _update_gold(self, case: Dict[str, Any], dest: Path) -> bool:
+        try:
+            remote = case.get("meta") or {}
+            local = json.loads((dest / "case.json").read_text(encoding="utf-8")) if (dest / "case.json").exists() else {}
+        except Exception:
+            return False
+        sha = str(remote.get("gold_sha256") or "")
+        if not sha or sha == str(local.get("gold_sha256") or "") or workspace.is_evicted(dest):
+            return False
+        tmp = dest / ".gold_update.part"
+        try:
+            got = share.fetch_case(self.app.share_root, self.app.class_code, dest.name, tmp, files=("gold.nii.gz", "case.json"))
+            if "gold.nii.gz" not in got or "case.json" not in got:
+                return False  # keep the current gold unless the new one actually arrived
+            gp = dest / "gold.nii.gz"
+            store.unlink(gp)
+            gold_sha = store.import_file(tmp / "gold.nii.gz", gp)
+            set_readonly(gp)
+            shutil.copy2(tmp / "case.json", dest / "case.json")
+            workspace.record_blobs(dest, {"t1.nii.gz": local.get("t1_sha256") or store.adopt(dest / "t1.nii.gz"), "gold.nii.gz": gold_sha})
+            index_update(dest)
+            return True
+        except Exception:
+            return False
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
 
     def _test_case(self, case_id: str):
         c = next((x for x in self._rows if x.case_id == case_id), None)
         if not c:
             return
+        if c.evicted and not workspace.ensure_local(c, self.app.share_root, self.app.class_code):
+            QMessageBox.critical(self, core.APP_NAME, "This case was evicted to save disk space and could not be re-fetched.\nJoin the classroom (Connect) and try again.")
+            return
+        workspace.touch(c.case_dir)
+        workspace.enforce_budget(keep=c.case_dir)
         if not c.student.exists():
             ok, msg = make_blank_student_mask(c.t1, c.student)
             if not ok:
                 QMessageBox.critical(self, core.APP_NAME, msg)
                 return
         launch_editor(c.t1, c.student)
+        self.model.update_case(c.case_id)
         self.app.toast(f"Opened editor for {c.case_id}. Save to student.nii.gz.")
+        self._schedule_prefetch(c.case_id)
+
+    def _schedule_prefetch(self, case_id: str):
+        try:
+            n = core.cfg_int("prefetch_ahead", 2)
+            if n > 0:
+                self._prefetch.schedule(self._rows, case_id, self.app.attempts_dir(), n)
+        except Exception:
+            pass
 
     def _auto_check_student_masks(self):
         for c in self._rows:
-            if not c.student.exists():
+            if c.evicted or not c.student.exists():
                 continue
             key = str(c.student)
             try:
@@ -336,7 +596,9 @@ class PracticePage(QWidget):
                 self._last_mtime[key] = m
                 self._auto_eval(c)
 
+    @profile.profiled("auto_eval")
     def _auto_eval(self, c: CaseRow):
+        workspace.touch(c.case_dir)
         ok, msg, metrics = evaluate_masks(c.gold, c.student)
         if not ok:
             self.app.toast(msg)
@@ -366,13 +628,23 @@ class PracticePage(QWidget):
             "tolerance": tol,
             "passed": bool(passed),
             "editor": getattr(self.app, "editor", "external"),
-            "_rid": uuid.uuid4().hex[:6],
+            "gold_sha256": str(c.meta.get("gold_sha256") or ""),
+            "gold_version": c.meta.get("gold_version") or "",
+            "_rid": attemptlog.new_rid(),
             **metrics,
         }
 
-        write_attempt(self.app.attempts_dir(), attempt)
+        data = None
+        try:
+            data = maskcodec.encode_nifti(c.student)
+        except Exception:
+            pass
+        # committed locally first; the outbox thread delivers it to the share
+        outbox.enqueue(self.app.attempts_dir(), attempt, data, upload=self.app.attempt_upload())
 
         self.app.toast(
             f"{c.case_id}: Dice {dice:.3f} | J {float(metrics.get('jaccard',0.0)):.3f} | Δvox {mismatch} | {'PASS' if passed else 'NO PASS'}"
         )
-        self.refresh()
+        self.model.results[c.case_id] = f"{'PASS' if passed else 'NO PASS'} · Dice {dice:.3f}"
+        self.model.update_case(c.case_id)
+        self._schedule_prefetch(c.case_id)
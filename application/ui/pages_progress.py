@@ -1,17 +1,21 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QColor, QPainter, QPen, QFont
+import numpy as np
+from PySide6.QtCore import Qt, QLineF, QPointF, QRectF
+from PySide6.QtGui import QColor, QPainter, QPen, QFont, QPolygonF
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, QListWidgetItem,
-    QPushButton, QMessageBox
+    QPushButton, QMessageBox, QComboBox
 )
 
 import lt_core as core
+import lt_analytics as analytics
+import lt_attemptlog as attemptlog
+import lt_online as online
+import lt_outbox as outbox
 from lt_utils import open_default
 from ui.widgets import btn, h1, muted
 
@@ -23,22 +27,99 @@ def _safe_float(x, default=0.0) -> float:
         return float(default)
 
 
+def rolling_mean(values: "np.ndarray", k: int) -> "np.ndarray":
+    """Trailing mean over up to k points (shorter window at the start)."""
+    c = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    i = np.arange(1, len(values) + 1)
+    lo = np.maximum(0, i - k)
+    return (c[i] - c[lo]) / (i - lo)
+
+
+def minmax_decimate(x: "np.ndarray", y: "np.ndarray", buckets: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Keep the first min and first max of each x-bucket, in original order, so spikes survive."""
+    n = len(y)
+    if n <= 2 * buckets:
+        return x, y
+    b = (np.arange(n) * buckets) // n  # contiguous, non-decreasing bucket ids
+    starts = np.flatnonzero(np.concatenate([[True], b[1:] != b[:-1]]))
+    keep = np.zeros(n, dtype=bool)
+    for ext in (np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)):
+        idx = np.flatnonzero(y == np.repeat(ext, np.diff(np.append(starts, n))))
+        keep[idx[np.concatenate([[True], b[idx][1:] != b[idx][:-1]])]] = True
+    return x[keep], y[keep]
+
+
 class TinyLinePlot(QWidget):
     """
     Lightweight plot widget (no matplotlib).
-    Shows values (0..1) over an index (attempt order).
+    Shows one or more series over an index (attempt order). Geometry is built
+    once per data/size change from NumPy arrays, decimated (min/max per pixel
+    column) to the plot width, and cached; each series is then one batched
+    drawLines call (a translucent drawPolyline must stroke the whole
+    self-overlapping path and is far slower).
     """
+    COLORS = [QColor(226, 0, 26, 230), QColor(90, 160, 255, 210), QColor(255, 200, 80, 210)]
+    ROLLING_COLOR = QColor(255, 255, 255, 150)
+
     def __init__(self, title: str = ""):
         super().__init__()
         self._title = title
-        self._values: List[float] = []
+        self._series: List[Tuple[str, "np.ndarray", QColor, float]] = []
+        self._n = 0
+        self._vmin = 0.0
+        self._vmax = 1.0
+        self._geom_key = None
+        self._geom: List[Tuple[List[QLineF], QPen]] = []
+        self._dots: Optional[QPolygonF] = None
         self.setMinimumHeight(180)
 
     def set_series(self, title: str, values: List[float]):
+        self.set_multi(title, [("Dice", values)])
+
+    def set_multi(self, title: str, series: List[Tuple[str, List[float]]], rolling: int = 0):
+        """Set named series (first one drives the point markers and the rolling mean)."""
         self._title = str(title or "")
-        self._values = [float(v) for v in (values or [])]
+        out: List[Tuple[str, "np.ndarray", QColor, float]] = []
+        for i, (name, vals) in enumerate(series or []):
+            arr = np.asarray([_safe_float(v, np.nan) for v in (vals or [])], dtype=np.float64)
+            out.append((str(name), arr, self.COLORS[i % len(self.COLORS)], 2.0))
+        if out and rolling > 1 and len(out[0][1]) >= rolling:
+            base = out[0][1]
+            out.append((f"mean({rolling})", rolling_mean(np.nan_to_num(base), rolling), self.ROLLING_COLOR, 1.5))
+        self._series = out
+        self._n = max((len(a) for _, a, _, _ in out), default=0)
+        finite = [a[np.isfinite(a)] for _, a, _, _ in out]
+        finite = [a for a in finite if a.size]
+        if finite:
+            self._vmin = float(min(a.min() for a in finite))
+            self._vmax = float(max(a.max() for a in finite))
+            if abs(self._vmax - self._vmin) < 1e-9:
+                self._vmax = self._vmin + 1.0
+        self._geom_key = None
         self.update()
 
+    def resizeEvent(self, ev):
+        self._geom_key = None
+        super().resizeEvent(ev)
+
+    def _build(self, plot: QRectF):
+        self._geom = []
+        self._dots = None
+        w = max(1, int(plot.width()))
+        span = self._vmax - self._vmin
+        for k, (_name, arr, color, width) in enumerate(self._series):
+            if len(arr) < 2:
+                continue
+            x = plot.left() + plot.width() * (np.arange(len(arr)) / max(1, self._n - 1))
+            y = plot.bottom() - plot.height() * ((arr - self._vmin) / span)
+            ok = np.isfinite(y)
+            x, y = minmax_decimate(x[ok], y[ok], w)
+            poly = QPolygonF([QPointF(float(a), float(b)) for a, b in zip(x, y)])
+            lines = [QLineF(poly[i], poly[i + 1]) for i in range(poly.size() - 1)]
+            self._geom.append((lines, QPen(color, width)))
+            if k == 0 and len(arr) <= w // 6:
+                self._dots = poly
+
     def paintEvent(self, _ev):
         p = QPainter(self)
         p.setRenderHint(QPainter.Antialiasing, True)
@@ -50,7 +131,7 @@ class TinyLinePlot(QWidget):
         p.setBrush(QColor(255, 255, 255, 10))
         p.drawRoundedRect(r, 16, 16)
 
-        # title
+        # title + legend
         title_h = 26
         title_rect = r.adjusted(14, 8, -14, -(r.height() - title_h - 8))
         plot = r.adjusted(14, 8 + title_h, -14, -14)
@@ -58,50 +139,51 @@ class TinyLinePlot(QWidget):
         p.setPen(QPen(QColor(235, 235, 235, 220)))
         p.setFont(QFont(p.font().family(), 12, QFont.DemiBold))
         p.drawText(title_rect, Qt.AlignLeft | Qt.AlignVCenter, self._title)
-
-        if len(self._values) < 2:
+        if len(self._series) > 1:
+            p.setFont(QFont(p.font().family(), 10))
+            lx = title_rect.right()
+            for name, _arr, color, _w in reversed(self._series):
+                tw = p.fontMetrics().horizontalAdvance(name)
+                lx -= tw
+                p.setPen(QPen(color))
+                p.drawText(QRectF(lx, title_rect.top(), tw, title_rect.height()), Qt.AlignVCenter, name)
+                lx -= 14
+
+        if self._n < 2:
             p.setPen(QPen(QColor(160, 160, 160, 170)))
             p.setFont(QFont(p.font().family(), 11))
             p.drawText(plot, Qt.AlignCenter, "No attempts yet")
             return
 
-        vmin = min(self._values)
-        vmax = max(self._values)
-        if abs(vmax - vmin) < 1e-9:
-            vmax = vmin + 1.0
-
-        def xy(i: int, v: float) -> Tuple[float, float]:
-            x = plot.left() + plot.width() * (i / max(1, len(self._values) - 1))
-            y = plot.bottom() - plot.height() * ((v - vmin) / (vmax - vmin))
-            return x, y
-
         # grid lines
         p.setPen(QPen(QColor(255, 255, 255, 10), 1))
         for k in range(1, 4):
             y = plot.top() + (plot.height() * k / 4.0)
             p.drawLine(plot.left(), int(y), plot.right(), int(y))
 
-        # polyline
-        p.setPen(QPen(QColor(226, 0, 26, 230), 2))  # EPFL red
-        last = None
-        for i, v in enumerate(self._values):
-            x, y = xy(i, v)
-            if last is not None:
-                p.drawLine(int(last[0]), int(last[1]), int(x), int(y))
-            last = (x, y)
-
-        # points
-        p.setPen(QPen(QColor(255, 255, 255, 180), 1))
-        p.setBrush(QColor(255, 255, 255, 180))
-        for i, v in enumerate(self._values):
-            x, y = xy(i, v)
-            p.drawEllipse(int(x) - 2, int(y) - 2, 4, 4)
+        key = (plot.x(), plot.y(), plot.width(), plot.height())
+        if key != self._geom_key:
+            self._build(QRectF(plot))
+            self._geom_key = key
+
+        # series (one batched call each)
+        p.setBrush(Qt.NoBrush)
+        for lines, pen in self._geom:
+            p.setPen(pen)
+            p.drawLines(lines)
+
+        # points (only when sparse enough to be readable)
+        if self._dots is not None:
+            dot = QPen(QColor(255, 255, 255, 180), 4)
+            dot.setCapStyle(Qt.RoundCap)
+            p.setPen(dot)
+            p.drawPoints(self._dots)
 
         # min/max labels
         p.setPen(QPen(QColor(180, 180, 180, 170)))
         p.setFont(QFont(p.font().family(), 10))
-        p.drawText(plot.adjusted(4, 2, -4, -2), Qt.AlignTop | Qt.AlignLeft, f"{vmax:.3f}")
-        p.drawText(plot.adjusted(4, 2, -4, -2), Qt.AlignBottom | Qt.AlignLeft, f"{vmin:.3f}")
+        p.drawText(plot.adjusted(4, 2, -4, -2), Qt.AlignTop | Qt.AlignLeft, f"{self._vmax:.3f}")
+        p.drawText(plot.adjusted(4, 2, -4, -2), Qt.AlignBottom | Qt.AlignLeft, f"{self._vmin:.3f}")
 
 
 class ProgressPage(QWidget):
@@ -128,6 +210,19 @@ class ProgressPage(QWidget):
         self.lbl_path.setStyleSheet(f"color: {core.MUTED};")
         v.addWidget(self.lbl_path)
 
+        self.lbl_summary = QLabel("")
+        self.lbl_summary.setWordWrap(True)
+        v.addWidget(self.lbl_summary)
+
+        self.cb_metric = QComboBox()
+        self.cb_metric.addItems(["Dice / Jaccard", "Volume error (ml)"])
+        self.cb_metric.currentIndexChanged.connect(lambda _i: self._plot_overall())
+        mrow = QHBoxLayout()
+        mrow.addWidget(muted("Overall plot"))
+        mrow.addWidget(self.cb_metric)
+        mrow.addStretch(1)
+        v.addLayout(mrow)
+
         # plots
         plots = QHBoxLayout()
         plots.setSpacing(12)
@@ -183,23 +278,9 @@ class ProgressPage(QWidget):
 
     def _load_attempts(self) -> List[Dict[str, Any]]:
         d = self._attempts_dir()
-        jsonl = d / "attempts.jsonl"
-        out: List[Dict[str, Any]] = []
-        if not jsonl.exists():
-            return out
-        try:
-            for line in jsonl.read_text(encoding="utf-8", errors="ignore").splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                    if isinstance(obj, dict):
-                        out.append(obj)
-                except Exception:
-                    continue
-        except Exception:
-            return out
+        out = attemptlog.read_records(d)
+        seen = {attemptlog.record_key(a) for a in out}
+        out += [a for a in outbox.pending_for(d) if attemptlog.record_key(a) not in seen]  # not uploaded yet
 
         # newest first (timestamp is lexicographic sortable with now_ts)
         out.sort(key=lambda a: str(a.get("timestamp") or ""), reverse=True)
@@ -213,11 +294,28 @@ class ProgressPage(QWidget):
         # fallback: maybe embedded
         return "unknown"
 
-    def _case_attempt_series(self, case_id: str) -> List[float]:
+    def _case_attempts(self, case_id: str) -> List[Dict[str, Any]]:
         # oldest -> newest for attempt index
         items = [a for a in self._attempts if self._extract_case_id(a) == case_id]
         items.sort(key=lambda a: str(a.get("timestamp") or ""))
-        return [_safe_float(a.get("dice", 0.0)) for a in items]
+        return items
+
+    def _plot_overall(self):
+        # overall series (oldest -> newest)
+        oldest = list(reversed(self._attempts))
+        if self.cb_metric.currentIndex() == 1:
+            self.plot_overall.set_multi(
+                "Overall volume error (ml)",
+                [("|Δvol| ml", [_safe_float(a.get("vol_abs_err_ml"), float("nan")) for a in oldest])],
+                rolling=10,
+            )
+        else:
+            self.plot_overall.set_multi(
+                "Overall Dice (all attempts)",
+                [("Dice", [_safe_float(a.get("dice", 0.0)) for a in oldest]),
+                 ("Jaccard", [_safe_float(a.get("jaccard"), float("nan")) for a in oldest])],
+                rolling=10,
+            )
 
     # ---- UI ----
     def refresh(self):
@@ -225,11 +323,9 @@ class ProgressPage(QWidget):
         self.lbl_path.setText(f"Attempts folder:\n{d}")
 
         self._attempts = self._load_attempts()
+        self._update_summary()
 
-        # overall series (oldest -> newest)
-        overall_oldest = list(reversed(self._attempts))
-        overall = [_safe_float(a.get("dice", 0.0)) for a in overall_oldest]
-        self.plot_overall.set_series("Overall Dice (all attempts)", overall)
+        self._plot_overall()
 
         # cases list
         case_ids = []
@@ -266,13 +362,33 @@ class ProgressPage(QWidget):
         else:
             self.plot_case.set_series("Case Dice (selected case)", [])
 
+    def _update_summary(self):
+        try:
+            st = analytics.summary(analytics.from_records(self._attempts))
+        except Exception:
+            st = {}
+        if not st:
+            self.lbl_summary.setText("")
+            return
+        acc = (online.load_summary(self._attempts_dir()) or {}).get("dice")
+        spread = f" (mean {float(acc['mean']):.3f} ± {online.acc_sd(acc):.3f})" if acc and int(acc.get("n", 0)) else ""
+        self.lbl_summary.setText(
+            f"{int(st['n'])} attempts{spread}  ·  median Dice {st['median']:.3f} (IQR {st['iqr']:.3f})  ·  best {st['best']:.3f}  ·  "
+            f"pass rate {st['pass_rate'] * 100:.0f}%  ·  first-try pass {st['first_pass_rate'] * 100:.0f}%  ·  "
+            f"trend {st['slope']:+.4f} Dice/attempt"
+        )
+
     def _on_case_selected(self, idx: int):
         if idx < 0 or idx >= len(self._case_ids):
             self.plot_case.set_series("Case Dice (selected case)", [])
             return
         cid = self._case_ids[idx]
-        series = self._case_attempt_series(cid)
-        self.plot_case.set_series(f"Case Dice — {cid}", series)
+        items = self._case_attempts(cid)
+        self.plot_case.set_multi(
+            f"Case Dice — {cid}",
+            [("Dice", [_safe_float(a.get("dice", 0.0)) for a in items]),
+             ("Jaccard", [_safe_float(a.get("jaccard"), float("nan")) for a in items])],
+        )
 
     def _open_attempts_folder(self):
         d = self._attempts_dir()
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+from pathlib import Path
+
+from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QGridLayout, QInputDialog, QMessageBox, QLabel
+    QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QInputDialog, QMessageBox, QLabel,
+    QTableView, QHeaderView, QAbstractItemView, QFileDialog
 )
 
 import lt_core as core
+import lt_perf as perf
+import lt_profile as profile
 import lt_update as upd
+import lt_workspace as workspace
 from ui.widgets import btn, h1, muted, Card
+from ui.models import ArrayTableModel, sorted_proxy
 
 
 class SettingsPage(QWidget):
@@ -30,7 +38,8 @@ class SettingsPage(QWidget):
 
         card = Card()
         v.addWidget(card)
-        grid = QGridLayout(card)
+        grid = QGridLayout()
+        card.body().addLayout(grid)
         grid.setHorizontalSpacing(12)
         grid.setVerticalSpacing(10)
 
@@ -46,16 +55,74 @@ class SettingsPage(QWidget):
         self.b_update_url = btn("Set", "ghost")
         grid.addWidget(self.b_update_url, 2, 1)
 
+        grid.addWidget(muted("Workspace disk budget (synced case volumes)"), 3, 0)
+        self.b_budget = btn("Set", "ghost")
+        grid.addWidget(self.b_budget, 3, 1)
+
         self.b_check = btn("Check for updates", "primary")
-        grid.addWidget(self.b_check, 3, 0, 1, 2)
+        grid.addWidget(self.b_check, 4, 0, 1, 2)
 
         self.b_minvox.clicked.connect(self._set_minvox)
         self.b_tol.clicked.connect(self._set_tol)
         self.b_update_url.clicked.connect(self._set_update_url)
+        self.b_budget.clicked.connect(self._set_budget)
         self.b_check.clicked.connect(self._check_updates)
 
-        v.addStretch(1)
+        # performance panel: timings from the perf log (this and earlier sessions)
+        perf_card = Card()
+        v.addWidget(perf_card, 1)
+        pb = perf_card.body()
+        pb.addWidget(muted("Performance (p50 / p95 / max per operation and share root)"))
+        ms = lambda x: f"{float(x):.1f} ms"
+        self.m_perf = ArrayTableModel(["Operation", "Share root", "Calls", "p50", "p95", "Max", "MB"],
+                                      [str, str, str, ms, ms, ms, lambda x: f"{float(x) / (1024 * 1024):.1f}"], self)
+        self.px_perf = sorted_proxy(self.m_perf, self)
+        self.tbl_perf = QTableView()
+        self.tbl_perf.setModel(self.px_perf)
+        self.tbl_perf.setSortingEnabled(True)
+        self.tbl_perf.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.tbl_perf.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tbl_perf.verticalHeader().setVisible(False)
+        pb.addWidget(self.tbl_perf, 1)
+        prow = QHBoxLayout(); prow.setSpacing(10)
+        self.b_perf_refresh = btn("Refresh timings", "ghost")
+        self.b_perf_clear = btn("Clear perf log", "ghost")
+        self.b_profile = btn("Profiling: off", "ghost")
+        self.b_diag = btn("Export diagnostics bundle…", "ghost")
+        prow.addWidget(self.b_perf_refresh); prow.addWidget(self.b_perf_clear); prow.addWidget(self.b_profile); prow.addWidget(self.b_diag); prow.addStretch(1)
+        pb.addLayout(prow)
+        self.b_perf_refresh.clicked.connect(self._refresh_perf)
+        self.b_perf_clear.clicked.connect(self._clear_perf)
+        self.b_profile.clicked.connect(self._toggle_profile)
+        self.b_diag.clicked.connect(self._export_diagnostics)
+
+        self.refresh()
+
+    def _refresh_perf(self):
+        rows = perf.stats()
+        self.m_perf.set_columns([[r["op"] for r in rows], [r["root"] or "—" for r in rows], [r["n"] for r in rows],
+                                 [r["p50"] for r in rows], [r["p95"] for r in rows], [r["max"] for r in rows], [r["bytes"] for r in rows]])
+        self.tbl_perf.sortByColumn(4, Qt.DescendingOrder)
+
+    def _toggle_profile(self):
+        """cProfile + tracemalloc captures for eval, sync, batch import and dashboard refresh."""
+        core.cfg_set("profile_enabled", not core.cfg_bool("profile_enabled", False))
         self.refresh()
+        self.app.toast(f"Profiling {'on' if core.cfg_bool('profile_enabled') else 'off'} — captures go to {profile.PROFILE_DIR}")
+
+    def _export_diagnostics(self):
+        fp, _ = QFileDialog.getSaveFileName(self, "Export diagnostics", str(Path.home() / "seglab_diagnostics.zip"), "Zip (*.zip)")
+        if not fp:
+            return
+        try:
+            n = profile.export_diagnostics(Path(fp))
+            self.app.toast(f"Diagnostics bundle written ({n} files).")
+        except Exception as e:
+            QMessageBox.critical(self, "Diagnostics", f"Export failed: {e}")
+
+    def _clear_perf(self):
+        perf.clear()
+        self._refresh_perf()
 
     def refresh(self):
         locked = getattr(core, "get_locked_policy", lambda: None)()
@@ -76,14 +143,20 @@ class SettingsPage(QWidget):
             self.b_minvox.setEnabled(True)
             self.b_tol.setEnabled(True)
 
-        cur = str(core.cfg_get("update_json_url", "") or "").strip()
+        used, _ = workspace.usage()
+        budget = core.cfg_int("workspace_budget_mb", workspace.DEFAULT_BUDGET_MB)
+        self.b_budget.setText(f"Set ({used / (1024 * 1024):.0f} / {budget} MB)" if budget else f"Set (unlimited, {used / (1024 * 1024):.0f} MB used)")
+
+        cur = core.cfg_str("update_json_url").strip()
         if cur:
             self.b_update_url.setText("Set (configured)")
         else:
             self.b_update_url.setText("Set")
+        self.b_profile.setText(f"Profiling: {'on' if core.cfg_bool('profile_enabled') else 'off'}")
+        self._refresh_perf()
 
     def _set_minvox(self):
-        cur = int(core.cfg_get("solo_min_voxels", core.DEFAULT_MIN_VOXELS) or core.DEFAULT_MIN_VOXELS)
+        cur = core.cfg_int("solo_min_voxels", core.DEFAULT_MIN_VOXELS) or core.DEFAULT_MIN_VOXELS
         v, ok = QInputDialog.getInt(self, "Min voxels", "Minimum lesion voxels (solo):", cur, 1, 10_000, 1)
         if not ok:
             return
@@ -92,7 +165,7 @@ class SettingsPage(QWidget):
         self.app.toast("Saved.")
 
     def _set_tol(self):
-        cur = int(core.cfg_get("solo_tolerance", core.DEFAULT_TOLERANCE) or core.DEFAULT_TOLERANCE)
+        cur = core.cfg_int("solo_tolerance", core.DEFAULT_TOLERANCE) or core.DEFAULT_TOLERANCE
         v, ok = QInputDialog.getInt(self, "Tolerance", "Voxel mismatch tolerance (solo):", cur, 0, 1_000_000, 10)
         if not ok:
             return
@@ -100,8 +173,18 @@ class SettingsPage(QWidget):
         self.refresh()
         self.app.toast("Saved.")
 
+    def _set_budget(self):
+        cur = core.cfg_int("workspace_budget_mb", workspace.DEFAULT_BUDGET_MB)
+        v, ok = QInputDialog.getInt(self, "Workspace budget", "Disk budget for synced case volumes in MB (0 = unlimited):", cur, 0, 10_000_000, 500)
+        if not ok:
+            return
+        core.cfg_set("workspace_budget_mb", int(v))
+        n = workspace.enforce_budget()
+        self.refresh()
+        self.app.toast(f"Saved. Evicted {n} case(s)." if n else "Saved.")
+
     def _set_update_url(self):
-        cur = str(core.cfg_get("update_json_url", "") or "")
+        cur = core.cfg_str("update_json_url")
         url, ok = QInputDialog.getText(
             self,
             "Update feed",
@@ -119,7 +202,7 @@ class SettingsPage(QWidget):
             QMessageBox.information(self, "Updates", "Update URL cleared.")
 
     def _check_updates(self):
-        url = str(core.cfg_get("update_json_url", "") or "").strip()
+        url = core.cfg_str("update_json_url").strip()
         if not url:
             QMessageBox.information(self, "Updates", "No update URL set.\nSet it first in Settings.")
             return
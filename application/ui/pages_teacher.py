@@ -4,6 +4,7 @@ from pathlib import Path
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QFileDialog, QMessageBox, QInputDialog
 import lt_core as core
 import lt_share as share
+import lt_reeval as reeval
 from lt_utils import open_smb_url, guess_share_root, norm_code, now_ts
 from lt_eval import validate_pair
 from ui.widgets import btn, h1, muted
@@ -23,7 +24,7 @@ After login: create classroom code, set policy, upload cases, view cohort dashbo
 
         self.ed_share = QLineEdit()
         self.ed_share.setPlaceholderText("Mounted share path (e.g. /Volumes/Hummel-Lab or /Volumes/Hummel-Lab/LTTrainer)")
-        self.ed_share.setText(str(core.cfg_get("share_root","") or ""))
+        self.ed_share.setText(core.cfg_str("share_root"))
 
         tools = QHBoxLayout()
         tools.setSpacing(10)
@@ -53,10 +54,14 @@ After login: create classroom code, set policy, upload cases, view cohort dashbo
         self.b_create = btn("Create classroom","ghost")
         self.b_policy = btn("Set policy","ghost")
         self.b_upload = btn("Upload case","ghost")
+        self.b_gold = btn("Replace gold…","ghost")
+        self.b_bundle = btn("Publish bundle","ghost")
         self.b_dash = btn("Open teacher dashboard","primary")
         row2.addWidget(self.b_create)
         row2.addWidget(self.b_policy)
         row2.addWidget(self.b_upload)
+        row2.addWidget(self.b_gold)
+        row2.addWidget(self.b_bundle)
         row2.addWidget(self.b_dash)
         row2.addStretch(1)
         v.addLayout(row2)
@@ -73,6 +78,8 @@ After login: create classroom code, set policy, upload cases, view cohort dashbo
         self.b_create.clicked.connect(self._create_class)
         self.b_policy.clicked.connect(self._policy)
         self.b_upload.clicked.connect(self._upload_case)
+        self.b_gold.clicked.connect(self._replace_gold)
+        self.b_bundle.clicked.connect(self._publish_bundle)
         self.b_dash.clicked.connect(lambda: self.app.goto("Teacher Dashboard"))
 
         self.refresh()
@@ -183,16 +190,53 @@ After login: create classroom code, set policy, upload cases, view cohort dashbo
             QMessageBox.critical(self, core.APP_NAME, msg)
             return
         case_id = f"case_{now_ts()}_{uuid.uuid4().hex[:6]}"
-        dest = share.upload_case(self.app.share_root, self.app.class_code, case_id, t1, gold)
-        try:
-            import os
-            os.chmod(dest / "gold.nii.gz", 0o444)
-        except Exception:
-            pass
-        (dest / "case.json").write_text(str({"case_id": case_id, **meta}), encoding="utf-8")
+        share.upload_case(self.app.share_root, self.app.class_code, case_id, t1, gold, meta)
         QMessageBox.information(self, core.APP_NAME, f"Uploaded: {case_id}")
         self.app.refresh_all()
 
+    def _replace_gold(self):
+        if self.app.mode != "teacher" or not self.app.share_root or not self.app.class_code:
+            QMessageBox.information(self, core.APP_NAME, "Login as teacher and create/select a classroom first.")
+            return
+        cases = share.list_class_cases(self.app.share_root, self.app.class_code)
+        if not cases:
+            QMessageBox.information(self, core.APP_NAME, "No cases in this classroom yet.")
+            return
+        case_id, ok = QInputDialog.getItem(self, "Replace gold", "Case:", cases, 0, False)
+        if not ok or not case_id:
+            return
+        gold_fp, _ = QFileDialog.getOpenFileName(self, "Select corrected gold mask (NIfTI)", str(Path.home()), "NIfTI (*.nii *.nii.gz)")
+        if not gold_fp:
+            return
+        case_dir = share.class_dir(self.app.share_root, self.app.class_code) / "cases" / case_id
+        ok, msg, _meta = validate_pair(case_dir / "t1.nii.gz", Path(gold_fp))
+        if not ok:
+            QMessageBox.critical(self, core.APP_NAME, msg)
+            return
+        try:
+            meta = share.replace_gold(self.app.share_root, self.app.class_code, case_id, Path(gold_fp))
+        except Exception as e:
+            QMessageBox.critical(self, core.APP_NAME, f"Replace failed: {e}")
+            return
+        started = reeval.start_background(self.app.share_root, self.app.class_code, [case_id])
+        QMessageBox.information(self, core.APP_NAME,
+            f"{case_id}: gold is now version {meta.get('gold_version')}.\n"
+            + ("Re-evaluating archived submissions in the background." if started else "A re-evaluation job is already running; refresh later.")
+            + "\nRepublish the bundle so students pick up the new gold.")
+        self.app.refresh_all()
+
+    def _publish_bundle(self):
+        if self.app.mode != "teacher" or not self.app.share_root or not self.app.class_code:
+            QMessageBox.information(self, core.APP_NAME, "Login as teacher and create/select a classroom first.")
+            return
+        try:
+            idx = share.publish_bundle(self.app.share_root, self.app.class_code)
+        except Exception as e:
+            QMessageBox.critical(self, core.APP_NAME, f"Bundle failed: {e}")
+            return
+        mb = float(idx.get("bundle_size", 0)) / (1024 * 1024)
+        QMessageBox.information(self, core.APP_NAME, f"Bundle published: {len(idx.get('cases') or [])} case(s), {mb:.1f} MB.\nStudents will sync from the bundle.")
+
     def refresh(self):
         if self.app.mode == "teacher" and self.app.share_root:
             self.info.setText(f"Authenticated TEACHER\nShare root: {self.app.share_root}\nClassroom: {self.app.class_code or '—'}")
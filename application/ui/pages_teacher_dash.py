@@ -1,45 +1,124 @@
 from __future__ import annotations
-import json
-from typing import Any, Dict, List
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+from typing import Optional
+from pathlib import Path
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QComboBox, QTableView, QHeaderView, QAbstractItemView,
+    QFileDialog, QMessageBox
+)
 import lt_share as share
+import lt_analytics as analytics
+import lt_online as online
+import lt_skill as skill
+import lt_consensus as consensus
+import lt_agreement as agreement
+import lt_reeval as reeval
+import lt_profile as profile
 from ui.widgets import btn, h1, muted
+from ui.models import ArrayTableModel, sorted_proxy
 from lt_utils import open_default
+from lt_editor import view_overlays
+
+
+def _f3(v) -> str:
+    return f"{float(v):.3f}"
+
+def _pct(v) -> str:
+    return f"{float(v) * 100:.1f}%"
+
+def _f0(v) -> str:
+    return f"{float(v):.0f}"
+
+def _slope(v) -> str:
+    return f"{float(v):+.4f}"
+
+def _logit(v) -> str:
+    return f"{float(v):+.2f}"
+
 
 class TeacherDashboardPage(QWidget):
     def __init__(self, app):
         super().__init__()
         self.app = app
+        self._tab: Optional[analytics.AttemptTable] = None
+        self._skill: dict = {}
         v = QVBoxLayout(self)
         v.setContentsMargins(44, 34, 44, 34)
         v.setSpacing(12)
 
         v.addWidget(h1("Teacher Dashboard"))
-        v.addWidget(muted("Cohort leaderboard + per-case difficulty from attempts written to the share."))
+        v.addWidget(muted("Cohort leaderboard + per-case difficulty from attempts written to the share. Select a row to drill down."))
+        self.lbl_cohort = QLabel("")
+        v.addWidget(self.lbl_cohort)
+
+        frow = QHBoxLayout(); frow.setSpacing(10)
+        self.ed_filter = QLineEdit()
+        self.ed_filter.setPlaceholderText("Filter by student or case…")
+        self.cb_session = QComboBox()
+        self.cb_session.addItem("All sessions")
+        self.cb_gold = QComboBox()
+        self.cb_gold.addItems(["Scores: as submitted", "Scores: current gold"])
+        frow.addWidget(self.ed_filter, 1); frow.addWidget(self.cb_session); frow.addWidget(self.cb_gold)
+        v.addLayout(frow)
 
-        self.tbl_leader = QTableWidget(0,4)
-        self.tbl_leader.setHorizontalHeaderLabels(["Student","Attempts","Avg Dice","Pass rate"])
-        self.tbl_leader.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.tbl_leader.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.m_leader = ArrayTableModel(
+            ["Student","Attempts","Avg Dice","Median","IQR","Best","First-try pass","Pass rate","Trend/attempt","Ability"],
+            [str, str, _f3, _f3, _f3, _f3, _pct, _pct, _slope, _logit], self)
+        self.px_leader = sorted_proxy(self.m_leader, self)
+        self.tbl_leader = self._make_view(self.px_leader)
 
-        self.tbl_cases = QTableWidget(0,4)
-        self.tbl_cases.setHorizontalHeaderLabels(["Case","Attempts","Avg Dice","Avg mismatch"])
-        self.tbl_cases.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.tbl_cases.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.m_cases = ArrayTableModel(
+            ["Case","Attempts","Avg Dice","Median","IQR","First-try pass","Avg mismatch","Difficulty"],
+            [str, str, _f3, _f3, _f3, _pct, _f0, _logit], self)
+        self.px_cases = sorted_proxy(self.m_cases, self)
+        self.tbl_cases = self._make_view(self.px_cases)
 
-        v.addWidget(QLabel("Leaderboard"))
-        v.addWidget(self.tbl_leader, 1)
-        v.addWidget(QLabel("Case difficulty"))
-        v.addWidget(self.tbl_cases, 1)
+        self.m_detail = ArrayTableModel(["Timestamp","Student","Case","Dice","Mismatch","Passed"], [str, str, str, _f3, _f0, lambda x: "yes" if x else "no"], self)
+        self.px_detail = sorted_proxy(self.m_detail, self)
+        self.tbl_detail = self._make_view(self.px_detail)
+
+        tables = QHBoxLayout(); tables.setSpacing(12)
+        left = QVBoxLayout(); left.addWidget(QLabel("Leaderboard")); left.addWidget(self.tbl_leader, 1)
+        right = QVBoxLayout(); right.addWidget(QLabel("Case difficulty")); right.addWidget(self.tbl_cases, 1)
+        tables.addLayout(left, 1); tables.addLayout(right, 1)
+        v.addLayout(tables, 2)
+        self.lbl_detail = QLabel("Attempt history")
+        v.addWidget(self.lbl_detail)
+        v.addWidget(self.tbl_detail, 1)
 
         row = QHBoxLayout(); row.setSpacing(10)
         self.b_refresh = btn("Refresh","primary")
         self.b_open = btn("Open attempts on share","ghost")
-        row.addWidget(self.b_refresh); row.addWidget(self.b_open); row.addStretch(1)
+        self.b_export = btn("Export summary CSV…","ghost")
+        self.b_refit = btn("Refit ability model","ghost")
+        self.b_heatmap = btn("Case heatmap in ITK-SNAP","ghost")
+        self.b_agree = btn("Case agreement matrix…","ghost")
+        row.addWidget(self.b_refresh); row.addWidget(self.b_open); row.addWidget(self.b_export); row.addWidget(self.b_refit)
+        row.addWidget(self.b_heatmap); row.addWidget(self.b_agree); row.addStretch(1)
         v.addLayout(row)
 
-        self.b_refresh.clicked.connect(self.refresh)
+        self.b_refresh.clicked.connect(lambda: self.refresh())
         self.b_open.clicked.connect(self._open_attempts)
+        self.b_export.clicked.connect(self._export_summary)
+        self.b_refit.clicked.connect(lambda: self._update_skill(force=True))
+        self.b_heatmap.clicked.connect(self._open_heatmap)
+        self.b_agree.clicked.connect(self._export_agreement)
+        self.ed_filter.textChanged.connect(self._apply_filter)
+        self.cb_session.currentIndexChanged.connect(lambda _i: self._fill_tables())
+        self.cb_gold.currentIndexChanged.connect(lambda _i: self.refresh())
+        self.tbl_leader.selectionModel().currentRowChanged.connect(lambda cur, _p: self._drill("user", self.px_leader, cur))
+        self.tbl_cases.selectionModel().currentRowChanged.connect(lambda cur, _p: self._drill("case", self.px_cases, cur))
+
+    def _make_view(self, model) -> QTableView:
+        t = QTableView()
+        t.setModel(model)
+        t.setSortingEnabled(True)
+        t.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        t.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        t.setSelectionBehavior(QAbstractItemView.SelectRows)
+        t.setSelectionMode(QAbstractItemView.SingleSelection)
+        t.verticalHeader().setVisible(False)
+        return t
 
     def _attempts_root(self):
         if not self.app.share_root or not self.app.class_code:
@@ -51,9 +130,92 @@ class TeacherDashboardPage(QWidget):
         if p and p.exists():
             open_default(p)
 
+    def _export_summary(self):
+        root = self._attempts_root()
+        if not root or not root.exists():
+            QMessageBox.information(self, "Export", "No attempts on the share yet.")
+            return
+        fp, _ = QFileDialog.getSaveFileName(self, "Export summary", str(Path.home() / f"{self.app.class_code}_summary.csv"), "CSV (*.csv)")
+        if not fp:
+            return
+        try:
+            n = online.export_summary_csv(online.class_summary(root), Path(fp))
+            self.app.toast(f"Exported {n} summary rows.")
+        except Exception as e:
+            QMessageBox.critical(self, "Export", f"Export failed: {e}")
+
+    def _selected_case(self, title: str) -> Optional[str]:
+        cur = self.tbl_cases.currentIndex()
+        if not cur.isValid() or not self.app.share_root or not self.app.class_code:
+            QMessageBox.information(self, title, "Select a case in the Case difficulty table first.")
+            return None
+        return str(self.m_cases.value(self.px_cases.mapToSource(cur).row(), 0))
+
+    def _open_heatmap(self):
+        """Update the selected case's consensus/FP/FN heatmaps and open them over its T1."""
+        case_id = self._selected_case("Heatmap")
+        if not case_id:
+            return
+        try:
+            r = consensus.build(self.app.share_root, self.app.class_code, case_id)
+        except Exception as e:
+            QMessageBox.critical(self, "Heatmap", f"Could not build heatmap: {e}")
+            return
+        if not r["n"]:
+            QMessageBox.information(self, "Heatmap", "No archived submissions for this case yet.")
+            return
+        case_dir = share.class_dir(self.app.share_root, self.app.class_code) / "cases" / case_id
+        out = r["dir"]
+        view_overlays(case_dir / "t1.nii.gz", case_dir / "gold.nii.gz", [out / name for name in consensus.OUTPUTS.values()])
+        self.app.toast(f"{case_id}: heatmap from {r['n']} students (+{r['added']} / -{r['removed']} updated).")
+
+    def _export_agreement(self):
+        """Pairwise Dice among the selected case's submissions (plus gold), cached per case."""
+        case_id = self._selected_case("Agreement")
+        if not case_id:
+            return
+        try:
+            r = agreement.build(self.app.share_root, self.app.class_code, case_id)
+        except Exception as e:
+            QMessageBox.critical(self, "Agreement", f"Could not compute agreement: {e}")
+            return
+        if len(r["keys"]) < 2:
+            QMessageBox.information(self, "Agreement", "No archived submissions for this case yet.")
+            return
+        fp, _ = QFileDialog.getSaveFileName(self, "Export agreement matrix", str(Path.home() / f"{self.app.class_code}_{case_id}_agreement.csv"), "CSV (*.csv)")
+        if fp:
+            try:
+                agreement.export_csv(r, Path(fp))
+            except Exception as e:
+                QMessageBox.critical(self, "Agreement", f"Export failed: {e}")
+                return
+        self.app.toast(f"{case_id}: {len(r['keys']) - 1} students · mean pairwise Dice {r['mean_pairwise']:.3f} · vs gold {r['mean_vs_gold']:.3f}")
+
+    def _show_cohort(self, root: Path):
+        s = online.class_summary(root)
+        n = int(s.get("n", 0))
+        if not n:
+            self.lbl_cohort.setText("")
+            return
+        d = s.get("dice") or online.acc_new()
+        self.lbl_cohort.setText(
+            f"Cohort: {len(s.get('users') or {})} students · {n} attempts · "
+            f"Dice {float(d['mean']):.3f} ± {online.acc_sd(d):.3f} · pass rate {int(s.get('passed', 0)) / n * 100:.1f}%"
+        )
+
+    def _apply_filter(self, text: str):
+        self.px_leader.setFilterFixedString(text)
+        self.px_cases.setFilterFixedString(text)
+
+    @profile.profiled("dashboard_refresh")
     def refresh(self):
-        self.tbl_leader.setRowCount(0)
-        self.tbl_cases.setRowCount(0)
+        self._tab = None
+        self._skill = {}
+        self.m_leader.clear()
+        self.m_cases.clear()
+        self.m_detail.clear()
+        self.lbl_detail.setText("Attempt history")
+        self.lbl_cohort.setText("")
 
         if self.app.mode != "teacher" or not self.app.share_root or not self.app.class_code:
             return
@@ -61,57 +223,84 @@ class TeacherDashboardPage(QWidget):
         root = self._attempts_root()
         if not root or not root.exists():
             return
+        self._show_cohort(root)
 
-        attempts: List[Dict[str,Any]] = []
-        for user_dir in [p for p in root.iterdir() if p.is_dir()]:
-            for f in user_dir.glob("*.json"):
-                try:
-                    d = json.loads(f.read_text(encoding="utf-8"))
-                    if isinstance(d, dict):
-                        attempts.append(d)
-                except Exception:
-                    pass
-
-        if not attempts:
+        records = analytics.read_class_attempts(root)
+        rescored = 0
+        if self.cb_gold.currentIndex() == 1:
+            records, rescored = reeval.rescore(records, self.app.share_root, self.app.class_code)
+            busy = " · re-evaluation running" if reeval.is_running() else ""
+            self.lbl_cohort.setText(f"{self.lbl_cohort.text()}\nCurrent-gold scores: {rescored} attempt(s) rescored{busy}")
+        tab = analytics.from_records(records)
+        if len(tab) == 0:
             return
+        self._tab = tab
 
-        by_user: Dict[str, List[Dict[str,Any]]] = {}
-        for a in attempts:
-            u = str(a.get("user") or "unknown")
-            by_user.setdefault(u, []).append(a)
-
-        leader = []
-        for u, arr in by_user.items():
-            n = len(arr)
-            avg_d = sum(float(x.get("dice") or 0.0) for x in arr) / max(1, n)
-            pr = sum(1 for x in arr if x.get("passed")) / max(1, n)
-            leader.append((u, n, avg_d, pr))
-        leader.sort(key=lambda x: (x[2], x[1]), reverse=True)
-
-        for u, n, avg_d, pr in leader:
-            r = self.tbl_leader.rowCount(); self.tbl_leader.insertRow(r)
-            self.tbl_leader.setItem(r,0,QTableWidgetItem(u))
-            self.tbl_leader.setItem(r,1,QTableWidgetItem(str(n)))
-            self.tbl_leader.setItem(r,2,QTableWidgetItem(f"{avg_d:.3f}"))
-            self.tbl_leader.setItem(r,3,QTableWidgetItem(f"{pr*100:.1f}%"))
-
-        by_case: Dict[str, List[Dict[str,Any]]] = {}
-        for a in attempts:
-            c = str(a.get("case_id") or "")
-            if c:
-                by_case.setdefault(c, []).append(a)
-
-        cases = []
-        for c, arr in by_case.items():
-            n = len(arr)
-            avg_d = sum(float(x.get("dice") or 0.0) for x in arr) / max(1, n)
-            avg_m = sum(float(x.get("mismatch_voxels") or 0.0) for x in arr) / max(1, n)
-            cases.append((c, n, avg_d, avg_m))
-        cases.sort(key=lambda x: (x[2], -x[1]))
-
-        for c, n, avg_d, avg_m in cases:
-            r = self.tbl_cases.rowCount(); self.tbl_cases.insertRow(r)
-            self.tbl_cases.setItem(r,0,QTableWidgetItem(c))
-            self.tbl_cases.setItem(r,1,QTableWidgetItem(str(n)))
-            self.tbl_cases.setItem(r,2,QTableWidgetItem(f"{avg_d:.3f}"))
-            self.tbl_cases.setItem(r,3,QTableWidgetItem(f"{avg_m:.0f}"))
+        cur = self.cb_session.currentText()
+        self.cb_session.blockSignals(True)
+        self.cb_session.clear()
+        self.cb_session.addItem("All sessions")
+        self.cb_session.addItems([x for x in tab.labels.get("session", []) if x])
+        self.cb_session.setCurrentIndex(max(0, self.cb_session.findText(cur)))
+        self.cb_session.blockSignals(False)
+        self._update_skill()
+
+    def _update_skill(self, force: bool = False):
+        """Rasch ability/difficulty: incremental Elo steps for new attempts, periodic full refit."""
+        root = self._attempts_root()
+        if self._tab is None or not root:
+            return
+        try:
+            if self.cb_gold.currentIndex() == 1:
+                self._skill = skill.to_json(skill.fit_rasch(self._tab))  # not persisted: stored model tracks submitted scores
+            else:
+                self._skill = skill.sync_class(root, self._tab, force=force)
+        except Exception:
+            self._skill = {}
+        self._fill_tables()
+
+    def _session_mask(self):
+        tab = self._tab
+        name = self.cb_session.currentText()
+        if tab is None or self.cb_session.currentIndex() <= 0 or name not in tab.labels.get("session", []):
+            return None
+        return tab.rec["session"] == tab.labels["session"].index(name)
+
+    def _fill_tables(self):
+        tab = self._tab
+        if tab is None:
+            return
+        mask = self._session_mask()
+
+        g = analytics.group_stats(tab, "user", mask)
+        ability = self._skill.get("ability") or {}
+        self.m_leader.set_columns([g["key"], g["n"], g["mean"], g["median"], g["iqr"], g["best"], g["first_pass_rate"], g["pass_rate"], g["slope"],
+                                   [float(ability.get(k, 0.0)) for k in g["key"]]])
+        self.tbl_leader.sortByColumn(2, Qt.DescendingOrder)
+
+        case_mask = mask
+        if "" in tab.labels.get("case", []):
+            has_case = tab.rec["case"] != tab.labels["case"].index("")
+            case_mask = has_case if mask is None else (has_case & mask)
+        g = analytics.group_stats(tab, "case", case_mask)
+        difficulty = self._skill.get("difficulty") or {}
+        self.m_cases.set_columns([g["key"], g["n"], g["mean"], g["median"], g["iqr"], g["first_pass_rate"], g["mean_mismatch"],
+                                  [float(difficulty.get(k, 0.0)) for k in g["key"]]])
+        self.tbl_cases.sortByColumn(2, Qt.AscendingOrder)
+
+    def _drill(self, kind: str, proxy, cur):
+        """Build the attempt-history table for one student/case only when it is selected."""
+        tab = self._tab
+        if tab is None or not cur.isValid():
+            return
+        src = proxy.mapToSource(cur)
+        key = str(proxy.sourceModel().value(src.row(), 0))
+        sel = analytics.select(tab, kind, key)
+        mask = self._session_mask()
+        if mask is not None:
+            sel = sel[mask[sel]]
+        r = tab.rec[sel]
+        users = [tab.labels["user"][i] for i in r["user"]]
+        cases = [tab.labels["case"][i] for i in r["case"]]
+        self.m_detail.set_columns([[analytics.ts_label(t) for t in r["t"]], users, cases, r["dice"], r["mismatch"], r["passed"]])
+        self.lbl_detail.setText(f"Attempt history — {'student' if kind == 'user' else 'case'} {key} ({len(sel)})")